@@ -1,248 +1,176 @@
+import io
+import os
+import time
+
 import streamlit as st
-import pandas as pd
 import numpy as np
 import joblib
-import sklearn 
-from sklearn.ensemble import RandomForestClassifier
+import altair as alt
+
+from artifact import ARTIFACT_PATH, has_artifact, load_artifact, model_version
+from cache import PredictionCache
+from preprocessing import (
+    marital_status_mapping, app_mode_mapping, course_mapping, prev_qual_mapping,
+    nationality_mapping, qualification_mapping, mothers_occupation_mapping,
+    fathers_occupation_mapping, daytime_evening_attendance_mapping, binary_mapping,
+    category_mappings, read_students_compact
+)
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from explain import Explainer
+from batch import score_to_csv_bytes
+from registry import REGISTRY_PATH, RegistryWatcher, has_registry
+from drift import DATA_PATH, MIN_ROWS, DriftMonitor, build_reference
+from whatif import SWEEP_FIELDS, SWEEP_FLAGS, axis_values, sweep, sweep_chart
+from metrics import (
+    MISSING_FIELD_REJECTIONS, MODEL_LOAD_SECONDS, STAGE_SECONDS, PredictionRecorder, textfile_path,
+    watch_cache, write_textfile
+)
+
+# RERUN TIMING (reported at the bottom of the sidebar)
+rerun_started = time.perf_counter()
 
 # STREAMLIT LAYOUT 
 st.set_page_config(page_title="🎓 Student Dropout Prediction", layout="wide")
 
 # LOAD MODEL AND EXPECTED COLUMNS 
-@st.cache_resource
-def load_model_and_columns():
-    model = joblib.load("dropout_retention_model.pkl")
-    model_columns = joblib.load("model_columns.pkl")
+# version only keys the caches below: when the model on disk changes, the
+# next rerun loads it and starts an empty prediction cache
+@st.cache_resource(max_entries=1)
+def load_model_and_columns(version):
+    # memory-mapped artifact if one was exported (python artifact.py export),
+    # otherwise the joblib pickle
+    t0 = time.perf_counter()
+    if has_artifact(ARTIFACT_PATH):
+        engine, header = load_artifact(ARTIFACT_PATH)
+        model, model_columns = engine, header["model_columns"]
+    else:
+        model = joblib.load("dropout_retention_model.pkl")
+        model_columns = joblib.load("model_columns.pkl")
+    load_seconds = time.perf_counter() - t0
+    STAGE_SECONDS.labels("load").observe(load_seconds)
+    MODEL_LOAD_SECONDS.set(load_seconds)
     return model, model_columns
 
-def validate_category(col_name: str, mapped_value: str) -> str:
-    """
-    Jika dummy column f"{col_name}_{mapped_value}" tidak ada di model_columns,
-    maka kembalikan "Other". 
-    Otherwise return mapped_value.
-    """
-    print(f"mapped value : {mapped_value}")
-    dummy_name = f"{col_name}_{mapped_value}"
-    if dummy_name not in model_columns:
-        return "Other"
-    return mapped_value
-
-
-model, model_columns = load_model_and_columns()
-
-
-# REMAPPING ENCODED FEATURE CATEGORIES
-marital_status_mapping = {
-    "1": "Single", "2": "Married", "3": "Widower", "4": "Divorced",
-    "5": "Facto Union", "6": "Legally Separated"
-}
-
-app_mode_mapping = {
-    "1": "1st phase - general contingent",
-    "2": "Ordinance No. 612/93",
-    "5": "1st phase - special contingent (Azores Island)",
-    "7": "Holders of other higher courses",
-    "10": "Ordinance No. 854-B/99",
-    "15": "International student (bachelor)",
-    "16": "1st phase - special contingent (Madeira Island)",
-    "17": "2nd phase - general contingent",
-    "18": "3rd phase - general contingent",
-    "26": "Ordinance No. 533-A/99, item b2 (Different Plan)",
-    "27": "Ordinance No. 533-A/99, item b3 (Other Institution)",
-    "39": "Over 23 years old",
-    "42": "Transfer",
-    "43": "Change of course",
-    "44": "Technological specialization diploma holders",
-    "51": "Change of institution/course",
-    "53": "Short cycle diploma holders",
-    "57": "Change of institution/course (International)"
-}
-
-course_mapping = {
-    "33": "Biofuel Production Technologies",
-    "171": "Animation and Multimedia Design",
-    "8014": "Social Service (evening attendance)",
-    "9003": "Agronomy",
-    "9070": "Communication Design",
-    "9085": "Veterinary Nursing",
-    "9119": "Informatics Engineering",
-    "9130": "Equinculture",
-    "9147": "Management",
-    "9238": "Social Service",
-    "9254": "Tourism",
-    "9500": "Nursing",
-    "9556": "Oral Hygiene",
-    "9670": "Advertising and Marketing Management",
-    "9773": "Journalism and Communication",
-    "9853": "Basic Education",
-    "9991": "Management (evening attendance)"
-}
-
-prev_qual_mapping = {
-    "1": "Secondary education",
-    "2": "Higher education - bachelor's degree",
-    "3": "Higher education - degree",
-    "4": "Higher education - master's",
-    "5": "Higher education - doctorate",
-    "6": "Frequency of higher education",
-    "9": "12th year of schooling - not completed",
-    "10": "11th year of schooling - not completed",
-    "12": "Other - 11th year of schooling",
-    "14": "10th year of schooling",
-    "15": "10th year of schooling - not completed",
-    "19": "Basic education 3rd cycle (9th/10th/11th year) or equiv.",
-    "38": "Basic education 2nd cycle (6th/7th/8th year) or equiv.",
-    "39": "Technological specialization course",
-    "40": "Higher education - degree (1st cycle)",
-    "42": "Professional higher technical course",
-    "43": "Higher education - master (2nd cycle)"
-}
-
-nationality_mapping = {
-    "1": "Portuguese", "2": "German", "6": "Spanish", "11": "Italian",
-    "13": "Dutch", "14": "English", "17": "Lithuanian", "21": "Angolan",
-    "22": "Cape Verdean", "24": "Guinean", "25": "Mozambican",
-    "26": "Santomean", "32": "Turkish", "41": "Brazilian",
-    "62": "Romanian", "100": "Moldova (Republic of)", "101": "Mexican",
-    "103": "Ukrainian", "105": "Russian", "108": "Cuban", "109": "Colombian"
-}
-
-qualification_mapping = {
-    "1": "Secondary Education - 12th Year of Schooling or Eq.",
-    "2": "Higher Education - Bachelor's Degree",
-    "3": "Higher Education - Degree",
-    "4": "Higher Education - Master's",
-    "5": "Higher Education - Doctorate",
-    "6": "Frequency of Higher Education",
-    "9": "12th Year of Schooling - Not Completed",
-    "10": "11th Year of Schooling - Not Completed",
-    "11": "7th Year (Old)",
-    "12": "Other - 11th Year of Schooling",
-    "13": "2nd year complementary high school course",
-    "14": "10th Year of Schooling",
-    "18": "General commerce course",
-    "19": "Basic Education 3rd Cycle (9th/10th/11th Year) or Equiv.",
-    "20": "Complementary High School Course",
-    "22": "Technical-professional course",
-    "25": "Complementary High School Course - not concluded",
-    "26": "7th year of schooling",
-    "27": "2nd cycle of the general high school course",
-    "29": "9th Year of Schooling - Not Completed",
-    "30": "8th year of schooling",
-    "31": "General Course of Administration and Commerce",
-    "33": "Supplementary Accounting and Administration",
-    "34": "Unknown",
-    "35": "Can't read or write",
-    "36": "Can read without having a 4th year of schooling",
-    "37": "Basic education 1st cycle (4th/5th year) or equiv.",
-    "38": "Basic Education 2nd Cycle (6th/7th/8th Year) or Equiv.",
-    "39": "Technological specialization course",
-    "40": "Higher education - degree (1st cycle)",
-    "41": "Specialized higher studies course",
-    "42": "Professional higher technical course",
-    "43": "Higher Education - Master (2nd cycle)",
-    "44": "Higher Education - Doctorate (3rd cycle)"
-}
-
-mothers_occupation_mapping = {
-    "0": "Student",
-    "1": "Legislative/Executive/Director/Manager",
-    "2": "Intellectual & Scientific Activities",
-    "3": "Intermediate Technicians & Professions",
-    "4": "Administrative Staff",
-    "5": "Personal Services/Security/Sellers",
-    "6": "Farmers/Skilled Agriculture",
-    "7": "Skilled Industry/Construction/Crafts",
-    "8": "Machine Operators/Assembly Workers",
-    "9": "Unskilled Workers",
-    "10": "Armed Forces",
-    "90": "Other Situation",
-    "99": "(Blank)",
-    "122": "Health Professionals",
-    "123": "Teachers",
-    "125": "ICT Specialists",
-    "131": "Science/Engineering Techs",
-    "132": "Intermediate Health Technicians",
-    "134": "Legal/Social/Sports/Cultural Techs",
-    "141": "Office Workers/Data Operators",
-    "143": "Accounting/Financial Operators",
-    "144": "Other Admin Support Staff",
-    "151": "Personal Service Workers",
-    "152": "Sellers",
-    "153": "Personal Care Workers",
-    "171": "Skilled Construction (not electricians)",
-    "173": "Printing/Precision/Jewelry/Artisans",
-    "175": "Food/Wood/Clothing Industries",
-    "191": "Cleaning Workers",
-    "192": "Unskilled Agriculture Workers",
-    "193": "Unskilled Construction/Manufacturing",
-    "194": "Meal Prep Assistants"
-}
-
-fathers_occupation_mapping = {
-    "0": "Student",
-    "1": "Legislative/Executive/Director/Manager",
-    "2": "Intellectual & Scientific Activities",
-    "3": "Intermediate Technicians & Professions",
-    "4": "Administrative Staff",
-    "5": "Personal Services/Security/Sellers",
-    "6": "Farmers/Skilled Agriculture",
-    "7": "Skilled Industry/Construction/Crafts",
-    "8": "Machine Operators/Assembly Workers",
-    "9": "Unskilled Workers",
-    "10": "Armed Forces",
-    "90": "Other Situation",
-    "99": "(Blank)",
-    "101": "Armed Forces Officers",
-    "102": "Armed Forces Sergeants",
-    "103": "Other Armed Forces Personnel",
-    "112": "Admin/Commercial Service Directors",
-    "114": "Hotel/Catering/Trade Directors",
-    "121": "Physical Sciences/Engineering Specialists",
-    "122": "Health Professionals",
-    "123": "Teachers",
-    "124": "Finance/Admin/Public Relations",
-    "131": "Science/Engineering Technicians",
-    "132": "Intermediate Health Technicians",
-    "134": "Legal/Social/Sports/Cultural Techs",
-    "135": "ICT Technicians",
-    "141": "Office Workers/Data Operators",
-    "143": "Accounting/Financial Operators",
-    "144": "Other Admin Support Staff",
-    "151": "Personal Service Workers",
-    "152": "Sellers",
-    "153": "Personal Care Workers",
-    "154": "Security Services",
-    "161": "Skilled Agricultural Workers",
-    "163": "Subsistence Farmers/Fishers",
-    "171": "Skilled Construction (not electricians)",
-    "172": "Metalworking Workers",
-    "174": "Electrical Workers",
-    "175": "Food/Wood/Clothing Industries",
-    "181": "Plant/Machine Operators",
-    "182": "Assembly Workers",
-    "183": "Vehicle/Mobile Equipment Operators",
-    "192": "Unskilled Agriculture Workers",
-    "193": "Unskilled Construction/Manufacturing",
-    "194": "Meal Prep Assistants",
-    "195": "Street Vendors/Service Providers"
-}
-
-daytime_evening_attendance_mapping = {
-    "1": "Daytime",
-    "0": "Evening"
-}
-
-binary_mapping = {
-    "Displaced":   {"1": "Yes", "0": "No"},
-    "Educational_special_needs": {"1": "Yes", "0": "No"},
-    "Debtor":      {"1": "Yes", "0": "No"},
-    "Gender":      {"1": "Male", "0": "Female"},
-    "Scholarship_holder": {"1": "Yes", "0": "No"},
-    "International": {"1": "Yes", "0": "No"},
-    "Tuition_fees_up_to_date": {"1": "Fees up to date", "0": "Fees NOT up to date"}
-}
+# with a model registry (python registry.py publish) a new CURRENT version
+# is loaded and warmed up on a background thread and picked up by the next
+# rerun; reruns already in progress finish on the version they started with
+@st.cache_resource
+def load_registry_watcher():
+    return RegistryWatcher(REGISTRY_PATH).start()
 
+@st.cache_resource
+def load_encoder(model_columns):
+    return FeatureEncoder(model_columns)
+
+@st.cache_resource(max_entries=1)
+def load_engine(version, _model):
+    # flattened copy of the forest for low-latency single-row predictions
+    if isinstance(_model, ForestEngine):
+        return _model
+    return ForestEngine.from_sklearn(_model)
+
+@st.cache_resource(max_entries=1)
+def load_prediction_cache(version, _engine):
+    cache = PredictionCache(_engine.predict_proba, version)
+    watch_cache(cache)
+    return cache
+
+@st.cache_resource(max_entries=1)
+def load_explainer(version, _engine, _encoder):
+    return Explainer(_engine, _encoder.schema)
+
+# prediction and "Other" fallback counts for the metrics textfile (see metrics.py)
+@st.cache_resource(max_entries=1)
+def load_metrics_recorder(version, _encoder):
+    return PredictionRecorder(_encoder.schema)
+
+# only written when PREDICTOR_METRICS_TEXTFILE is set
+METRICS_TEXTFILE = textfile_path()
+
+def export_metrics():
+    if METRICS_TEXTFILE:
+        write_textfile(METRICS_TEXTFILE)
+
+# input and score drift of this process's predictions against
+# students_performance.csv (see drift.py); fixed-size, decaying histograms
+@st.cache_resource(max_entries=1)
+def load_drift_monitor(version, _encoder, _engine):
+    if not os.path.exists(DATA_PATH):
+        return None
+    monitor = DriftMonitor(build_reference(_encoder, _engine.predict_proba, list(_engine.classes_).index(1)))
+    monitor.bind()
+    return monitor
+
+
+# STATIC FORM DATA
+# option lists for every selectbox/radio, built once per process instead of
+# on every rerun (cache_resource hands back the same dict, no copy)
+@st.cache_resource
+def load_form_options():
+    return {field: list(mapping) for field, mapping in category_mappings.items()}
+
+# CACHED PREDICTION WORK
+# keyed on the encoded row like the prediction cache, so students that
+# encode identically share one explanation across sessions
+@st.cache_data(max_entries=10_000, show_spinner=False)
+def explain_student(version, x_bytes):
+    X = np.frombuffer(x_bytes, dtype=np.float32).reshape(1, -1)
+    _, bias, contributions = explainer.explain(X)
+    return bias, contributions
+
+@st.cache_data(max_entries=4, show_spinner="Scoring cohort...")
+def score_cohort(version, data, explain):
+    # an uploaded file stays in the uploader across reruns; score it once
+    df_cohort = read_students_compact(io.BytesIO(data))
+    return score_to_csv_bytes(model, encoder, df_cohort, explainer=explainer if explain else None,
+                              on_chunk=drift_monitor.observe_scored if drift_monitor else None)
+
+
+# WHAT-IF PANEL
+# a fragment: changing the sweep reruns only this panel, not the form and
+# prediction above it; the whole grid is scored in one predict_proba call
+@st.fragment
+def whatif_panel(student_row, version):
+    st.subheader("🔀 What-if")
+    fields = st.multiselect(
+        "Vary these fields (every combination is scored)",
+        options=SWEEP_FIELDS,
+        default=["Curricular_units_1st_sem_approved", "Curricular_units_2nd_sem_grade",
+                 "Tuition_fees_up_to_date", "Scholarship_holder"],
+        max_selections=4,
+        key="whatif_fields"
+    )
+    numeric = [f for f in fields if f not in SWEEP_FLAGS]
+    if not fields:
+        return
+    if len(numeric) > 2:
+        st.warning("⚠️ Pick at most two numeric fields; flags can be added freely.")
+        return
+    steps = st.slider("Steps per numeric field", min_value=5, max_value=41, value=16, key="whatif_steps")
+
+    t0 = time.perf_counter()
+    axes = {field: axis_values(field, steps) for field in fields}
+    result = sweep(student_row, axes, encoder, engine.predict_proba, list(engine.classes_).index(1))
+    sweep_ms = (time.perf_counter() - t0) * 1e3
+    st.altair_chart(sweep_chart(result, fields), use_container_width=len(numeric) < 2)
+    st.caption(f"{len(result):,} scenarios scored in {sweep_ms:.0f} ms (model {version}); "
+               "other fields stay as entered")
+
+
+form_options = load_form_options()
+if has_registry(REGISTRY_PATH):
+    bundle = load_registry_watcher().current
+    model_version_on_disk, model, model_columns = bundle.version, bundle.engine, bundle.model_columns
+else:
+    model_version_on_disk = model_version(ARTIFACT_PATH)
+    model, model_columns = load_model_and_columns(model_version_on_disk)
+encoder = load_encoder(model_columns)
+engine = load_engine(model_version_on_disk, model)
+prediction_cache = load_prediction_cache(model_version_on_disk, engine)
+explainer = load_explainer(model_version_on_disk, engine, encoder)
+metrics_recorder = load_metrics_recorder(model_version_on_disk, encoder)
+drift_monitor = load_drift_monitor(model_version_on_disk, encoder, engine)
 
 
 st.title("🎓 Student Dropout Prediction App")
@@ -252,193 +180,198 @@ st.write("Fill in *all* fields below and click **Predict**.  \n"
 
 
 # INPUT WIDGETS 
-with st.expander("Academic & Demographic Info", expanded=True):
-    col1, col2 = st.columns(2)
-
-    with col1:
-        age_at_enrollment = st.number_input(
-            label="Age at enrollment (years)", min_value=0, max_value=100, value=None
-        )
-        st.caption("e.g., 23, 18, etc.")
-    with col2:
-        marital_code = st.selectbox(
-            "Marital status",
-            options=list(marital_status_mapping.keys()),
-            format_func=lambda x: marital_status_mapping[x],
-            index=0
-        )
-
-    col3, col4 = st.columns(2)
-    with col3:
-        application_code = st.selectbox(
-            "Application mode",
-            options=list(app_mode_mapping.keys()),
-            format_func=lambda x: app_mode_mapping[x],
-            index=0
-        )
-    with col4:
-        course_code = st.selectbox(
-            "Course",
-            options=list(course_mapping.keys()),
-            format_func=lambda x: course_mapping[x],
-            index=0
-        )
-
-    col5, col6 = st.columns(2)
-    with col5:
-        prev_qual_code = st.selectbox(
-            "Previous qualification",
-            options=list(prev_qual_mapping.keys()),
-            format_func=lambda x: prev_qual_mapping[x],
-            index=0
-        )
-    with col6:
-        nationality_code = st.selectbox(
-            "Nationality",
-            options=list(nationality_mapping.keys()),
-            format_func=lambda x: nationality_mapping[x],
-            index=0
-        )
-
-    col7, col8 = st.columns(2)
-    with col7:
-        mothers_qual_code = st.selectbox(
-            "Mother's qualification",
-            options=list(qualification_mapping.keys()),
-            format_func=lambda x: qualification_mapping[x],
-            index=0
-        )
-    with col8:
-        fathers_qual_code = st.selectbox(
-            "Father's qualification",
-            options=list(qualification_mapping.keys()),
-            format_func=lambda x: qualification_mapping[x],
-            index=0
-        )
-
-    col9, col10 = st.columns(2)
-    with col9:
-        mothers_occ_code = st.selectbox(
-            "Mother's occupation",
-            options=list(mothers_occupation_mapping.keys()),
-            format_func=lambda x: mothers_occupation_mapping[x],
-            index=0
-        )
-    with col10:
-        fathers_occ_code = st.selectbox(
-            "Father's occupation",
-            options=list(fathers_occupation_mapping.keys()),
-            format_func=lambda x: fathers_occupation_mapping[x],
-            index=0
-        )
-
-    col11, col12 = st.columns(2)
-    with col11:
-        daytime_code = st.radio(
-            "Daytime / evening attendance",
-            options=list(daytime_evening_attendance_mapping.keys()),
-            format_func=lambda x: daytime_evening_attendance_mapping[x],
-            index=0
-        )
-    with col12:
-        displaced_code = st.radio(
-            "Displaced",
-            options=list(binary_mapping["Displaced"].keys()),
-            format_func=lambda x: binary_mapping["Displaced"][x],
-            index=0
-        )
-
-    col13, col14 = st.columns(2)
-    with col13:
-        special_needs_code = st.radio(
-            "Educational special needs",
-            options=list(binary_mapping["Educational_special_needs"].keys()),
-            format_func=lambda x: binary_mapping["Educational_special_needs"][x],
-            index=0
-        )
-    with col14:
-        debtor_code = st.radio(
-            "Debtor",
-            options=list(binary_mapping["Debtor"].keys()),
-            format_func=lambda x: binary_mapping["Debtor"][x],
-            index=0
-        )
-
-    col15, col16 = st.columns(2)
-    with col15:
-        gender_code = st.radio(
-            "Gender",
-            options=list(binary_mapping["Gender"].keys()),
-            format_func=lambda x: binary_mapping["Gender"][x],
-            index=0
-        )
-    with col16:
-        scholarship_code = st.radio(
-            "Scholarship holder",
-            options=list(binary_mapping["Scholarship_holder"].keys()),
-            format_func=lambda x: binary_mapping["Scholarship_holder"][x],
-            index=0
-        )
-
-    col17, col18 = st.columns(2)
-    with col17:
-        international_code = st.radio(
-            "International student",
-            options=list(binary_mapping["International"].keys()),
-            format_func=lambda x: binary_mapping["International"][x],
-            index=0
-        )
-    with col18:
-        tuition_fees_code = st.radio(
-            "Tuition fees up to date",
-            options=list(binary_mapping["Tuition_fees_up_to_date"].keys()),
-            format_func=lambda x: binary_mapping["Tuition_fees_up_to_date"][x],
-            index=0
-        )
-        
-with st.expander("Academic History", expanded=False):
-    app_order       = st.number_input("Application order", min_value=0, step=1, value=None)
-    st.caption("(0 = first choice, 9 = last)")
-    
-    prev_qual_grade = st.number_input("Previous qualification grade", min_value=0.0, max_value=200.0, format="%.2f", value=None)
-    st.caption("(0–200)")
-    
-    admission_grade = st.number_input("Admission grade", min_value=0.0, max_value=200.0, format="%.2f", value=None)
-    st.caption("(0–200)")
-
-with st.expander("Academic Performance", expanded=False):
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        cu1_credit      = st.number_input("1st sem: Units credited", min_value=0, step=1, value=None)
-        cu1_enrolled    = st.number_input("1st sem: Units enrolled", min_value=0, step=1, value=None)
-        cu1_evaluations = st.number_input("1st sem: Units evaluated", min_value=0, step=1, value=None)
-        cu1_approved    = st.number_input("1st sem: Units approved", min_value=0, step=1, value=None)
-        cu1_grade       = st.number_input("1st sem: Avg grade", min_value=0.0, max_value=20.0, format="%.2f", value=None)
-        cu1_without_ev  = st.number_input("1st sem: Units w/o evaluations", min_value=0, step=1, value=None)
-        
-    with col2:
-        cu2_credit      = st.number_input("2nd sem: Units credited", min_value=0, step=1, value=None)
-        cu2_enrolled    = st.number_input("2nd sem: Units enrolled", min_value=0, step=1, value=None)
-        cu2_evaluations = st.number_input("2nd sem: Units evaluated", min_value=0, step=1, value=None)
-        cu2_approved    = st.number_input("2nd sem: Units approved", min_value=0, step=1, value=None)
-        cu2_grade       = st.number_input("2nd sem: Avg grade", min_value=0.0, max_value=20.0, format="%.2f", value=None)
-        cu2_without_ev  = st.number_input("2nd sem: Units w/o evaluations", min_value=0, step=1, value=None)
-
-    
-with st.expander("Others", expanded=False):
-    unemployment_rate = st.number_input("Unemployment rate (%)", min_value=0.0, max_value=100.0, format="%.2f", value=None)
-    st.caption("(e.g., 5.7)")
-    
-    inflation_rate    = st.number_input("Inflation rate (%)", min_value=0.0, max_value=100.0, format="%.2f", value=None)
-    st.caption("(e.g., 2.3)")
-    
-    gdp               = st.number_input("GDP (e.g. in € thousands)", min_value=0.0, format="%.2f", value=None)
-    st.caption("(e.g., 12000.5)")
+# inside a form, changing a field does not rerun the script; only the
+# submit button does
+with st.form("student_form"):
+    with st.expander("Academic & Demographic Info", expanded=True):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            age_at_enrollment = st.number_input(
+                label="Age at enrollment (years)", min_value=0, max_value=100, value=None
+            )
+            st.caption("e.g., 23, 18, etc.")
+        with col2:
+            marital_code = st.selectbox(
+                "Marital status",
+                options=form_options["Marital_status"],
+                format_func=marital_status_mapping.get,
+                index=0
+            )
+
+        col3, col4 = st.columns(2)
+        with col3:
+            application_code = st.selectbox(
+                "Application mode",
+                options=form_options["Application_mode"],
+                format_func=app_mode_mapping.get,
+                index=0
+            )
+        with col4:
+            course_code = st.selectbox(
+                "Course",
+                options=form_options["Course"],
+                format_func=course_mapping.get,
+                index=0
+            )
+
+        col5, col6 = st.columns(2)
+        with col5:
+            prev_qual_code = st.selectbox(
+                "Previous qualification",
+                options=form_options["Previous_qualification"],
+                format_func=prev_qual_mapping.get,
+                index=0
+            )
+        with col6:
+            nationality_code = st.selectbox(
+                "Nationality",
+                options=form_options["Nacionality"],
+                format_func=nationality_mapping.get,
+                index=0
+            )
+
+        col7, col8 = st.columns(2)
+        with col7:
+            mothers_qual_code = st.selectbox(
+                "Mother's qualification",
+                options=form_options["Mothers_qualification"],
+                format_func=qualification_mapping.get,
+                index=0
+            )
+        with col8:
+            fathers_qual_code = st.selectbox(
+                "Father's qualification",
+                options=form_options["Fathers_qualification"],
+                format_func=qualification_mapping.get,
+                index=0
+            )
+
+        col9, col10 = st.columns(2)
+        with col9:
+            mothers_occ_code = st.selectbox(
+                "Mother's occupation",
+                options=form_options["Mothers_occupation"],
+                format_func=mothers_occupation_mapping.get,
+                index=0
+            )
+        with col10:
+            fathers_occ_code = st.selectbox(
+                "Father's occupation",
+                options=form_options["Fathers_occupation"],
+                format_func=fathers_occupation_mapping.get,
+                index=0
+            )
+
+        col11, col12 = st.columns(2)
+        with col11:
+            daytime_code = st.radio(
+                "Daytime / evening attendance",
+                options=form_options["Daytime_evening_attendance"],
+                format_func=daytime_evening_attendance_mapping.get,
+                index=0
+            )
+        with col12:
+            displaced_code = st.radio(
+                "Displaced",
+                options=form_options["Displaced"],
+                format_func=binary_mapping["Displaced"].get,
+                index=0
+            )
+
+        col13, col14 = st.columns(2)
+        with col13:
+            special_needs_code = st.radio(
+                "Educational special needs",
+                options=form_options["Educational_special_needs"],
+                format_func=binary_mapping["Educational_special_needs"].get,
+                index=0
+            )
+        with col14:
+            debtor_code = st.radio(
+                "Debtor",
+                options=form_options["Debtor"],
+                format_func=binary_mapping["Debtor"].get,
+                index=0
+            )
+
+        col15, col16 = st.columns(2)
+        with col15:
+            gender_code = st.radio(
+                "Gender",
+                options=form_options["Gender"],
+                format_func=binary_mapping["Gender"].get,
+                index=0
+            )
+        with col16:
+            scholarship_code = st.radio(
+                "Scholarship holder",
+                options=form_options["Scholarship_holder"],
+                format_func=binary_mapping["Scholarship_holder"].get,
+                index=0
+            )
+
+        col17, col18 = st.columns(2)
+        with col17:
+            international_code = st.radio(
+                "International student",
+                options=form_options["International"],
+                format_func=binary_mapping["International"].get,
+                index=0
+            )
+        with col18:
+            tuition_fees_code = st.radio(
+                "Tuition fees up to date",
+                options=form_options["Tuition_fees_up_to_date"],
+                format_func=binary_mapping["Tuition_fees_up_to_date"].get,
+                index=0
+            )
+
+    with st.expander("Academic History", expanded=False):
+        app_order       = st.number_input("Application order", min_value=0, step=1, value=None)
+        st.caption("(0 = first choice, 9 = last)")
+
+        prev_qual_grade = st.number_input("Previous qualification grade", min_value=0.0, max_value=200.0, format="%.2f", value=None)
+        st.caption("(0–200)")
+
+        admission_grade = st.number_input("Admission grade", min_value=0.0, max_value=200.0, format="%.2f", value=None)
+        st.caption("(0–200)")
+
+    with st.expander("Academic Performance", expanded=False):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            cu1_credit      = st.number_input("1st sem: Units credited", min_value=0, step=1, value=None)
+            cu1_enrolled    = st.number_input("1st sem: Units enrolled", min_value=0, step=1, value=None)
+            cu1_evaluations = st.number_input("1st sem: Units evaluated", min_value=0, step=1, value=None)
+            cu1_approved    = st.number_input("1st sem: Units approved", min_value=0, step=1, value=None)
+            cu1_grade       = st.number_input("1st sem: Avg grade", min_value=0.0, max_value=20.0, format="%.2f", value=None)
+            cu1_without_ev  = st.number_input("1st sem: Units w/o evaluations", min_value=0, step=1, value=None)
+
+        with col2:
+            cu2_credit      = st.number_input("2nd sem: Units credited", min_value=0, step=1, value=None)
+            cu2_enrolled    = st.number_input("2nd sem: Units enrolled", min_value=0, step=1, value=None)
+            cu2_evaluations = st.number_input("2nd sem: Units evaluated", min_value=0, step=1, value=None)
+            cu2_approved    = st.number_input("2nd sem: Units approved", min_value=0, step=1, value=None)
+            cu2_grade       = st.number_input("2nd sem: Avg grade", min_value=0.0, max_value=20.0, format="%.2f", value=None)
+            cu2_without_ev  = st.number_input("2nd sem: Units w/o evaluations", min_value=0, step=1, value=None)
+
+
+    with st.expander("Others", expanded=False):
+        unemployment_rate = st.number_input("Unemployment rate (%)", min_value=0.0, max_value=100.0, format="%.2f", value=None)
+        st.caption("(e.g., 5.7)")
+
+        inflation_rate    = st.number_input("Inflation rate (%)", min_value=0.0, max_value=100.0, format="%.2f", value=None)
+        st.caption("(e.g., 2.3)")
+
+        gdp               = st.number_input("GDP (e.g. in € thousands)", min_value=0.0, format="%.2f", value=None)
+        st.caption("(e.g., 12000.5)")
+
+    submitted = st.form_submit_button("🔍 Predict Dropout")
 
 
 # PREDICTION BUTTON & LOGIC 
-if st.button("🔍 Predict Dropout"):
+if submitted:
     # check if all fields are filled
     missing = []
     # Check age separately
@@ -487,28 +420,30 @@ if st.button("🔍 Predict Dropout"):
             missing.append(var_name)
 
     if missing:
+        MISSING_FIELD_REJECTIONS.inc()
+        export_metrics()
         st.warning("⚠️ Please fill in all fields before predicting. Missing:\n\n- " + "\n- ".join(missing))
     else:
-        # RAW ROW DICTIONARY
+        # RAW ROW DICTIONARY (same column names and codes as students_performance.csv)
         row = {
             "Age_at_enrollment": age_at_enrollment,
-            "Marital status": marital_status_mapping[marital_code],
-            "Application mode": app_mode_mapping[application_code],
-            "Course": course_mapping[course_code],
-            "Previous qualification": prev_qual_mapping[prev_qual_code],
-            "Nacionality": validate_category("Nacionality", nationality_mapping[nationality_code]),
-            "Mother's qualification": qualification_mapping[mothers_qual_code],
-            "Father's qualification": qualification_mapping[fathers_qual_code],
-            "Mother's occupation": mothers_occupation_mapping[mothers_occ_code],
-            "Father's occupation": fathers_occupation_mapping[fathers_occ_code],
-            "Daytime/evening attendance": daytime_evening_attendance_mapping[daytime_code],
-            "Displaced": binary_mapping["Displaced"][displaced_code],
-            "Educational special needs": binary_mapping["Educational_special_needs"][special_needs_code],
-            "Debtor": binary_mapping["Debtor"][debtor_code],
-            "Gender": binary_mapping["Gender"][gender_code],
-            "Scholarship holder": binary_mapping["Scholarship_holder"][scholarship_code],
-            "International": binary_mapping["International"][international_code],
-            "Tuition_fees_up_to_date": binary_mapping["Tuition_fees_up_to_date"][tuition_fees_code],
+            "Marital_status": marital_code,
+            "Application_mode": application_code,
+            "Course": course_code,
+            "Previous_qualification": prev_qual_code,
+            "Nacionality": nationality_code,
+            "Mothers_qualification": mothers_qual_code,
+            "Fathers_qualification": fathers_qual_code,
+            "Mothers_occupation": mothers_occ_code,
+            "Fathers_occupation": fathers_occ_code,
+            "Daytime_evening_attendance": daytime_code,
+            "Displaced": displaced_code,
+            "Educational_special_needs": special_needs_code,
+            "Debtor": debtor_code,
+            "Gender": gender_code,
+            "Scholarship_holder": scholarship_code,
+            "International": international_code,
+            "Tuition_fees_up_to_date": tuition_fees_code,
 
             # Numeric fields:
             "Curricular_units_1st_sem_credited": cu1_credit,
@@ -534,31 +469,108 @@ if st.button("🔍 Predict Dropout"):
             "GDP": gdp
         }
 
-        df_raw = pd.DataFrame([row])
-
-        # create AgeGroup
-        bins = [0, 20, 24, 30, 100]
-        labels = ['<=20', '21-24', '25-30', '31+']
-        df_raw['AgeGroup'] = pd.cut(
-            df_raw['Age_at_enrollment'], bins=bins, labels=labels, right=False
-        )
-
-        # drop unused column
-        df_raw = df_raw.drop(columns=['Age_at_enrollment'])
-
-        # ONE‐HOT ENCODE ALL CATEGORICALS 
-        cat_cols = df_raw.select_dtypes(include=['object', 'category']).columns
-        df_encoded = pd.get_dummies(df_raw, columns=cat_cols)
-
-        # reindex to match columns used during training
-        df_encoded = df_encoded.reindex(columns=model_columns, fill_value=0)
-        
-        # df_encoded.info()
-        
-        # df_encoded.to_excel('one_row_df.xlsx',index=False)
-
-        # PREDICT & DISPLAY
-        pred = model.predict(df_encoded)[0]
+        # ONE-HOT ENCODE straight into the model_columns layout
+        # (AgeGroup binning and "Other" folding happen inside the encoder)
+        with STAGE_SECONDS.labels("encode").time():
+            X = encoder.encode_row(row)
+        coverage = encoder.schema.validate(X)
+
+        # PREDICT & DISPLAY (re-predicting an unchanged student is a cache hit)
+        with STAGE_SECONDS.labels("predict").time():
+            proba = prediction_cache.predict_proba(X)[0]
+        metrics_recorder.record(X)
+        if drift_monitor is not None:
+            drift_monitor.observe_row(row, proba[list(engine.classes_).index(1)])
+        export_metrics()
+        pred = engine.classes_[np.argmax(proba)]
         # target col 'Is_Dropout': 1=Dropout, 0=Not_Dropout
         result_str = "✅ **Not Dropped Out**" if pred == 0 else "❌ **Will Drop Out**"
         st.success(f"Prediction: {result_str}")
+        st.metric("Dropout probability", f"{proba[list(engine.classes_).index(1)]:.0%}")
+        st.caption(f"Model version: {model_version_on_disk}")
+
+        # WHY: per-field contributions from the forest's decision paths
+        bias, contributions = explain_student(model_version_on_disk, X.tobytes())
+        top = contributions.iloc[0].rename("Contribution").rename_axis("Field").reset_index()
+        top = top.reindex(top["Contribution"].abs().sort_values(ascending=False).index).head(10)
+        st.write(f"Top factors (base rate {bias:.0%}; red raises dropout risk, blue lowers it):")
+        st.altair_chart(
+            alt.Chart(top).mark_bar().encode(
+                x=alt.X("Contribution:Q", title="Change in dropout probability"),
+                y=alt.Y("Field:N", sort="-x", title=None),
+                color=alt.condition(alt.datum.Contribution > 0, alt.value("#E15759"), alt.value("#4C72B0"))
+            ),
+            use_container_width=True
+        )
+        if coverage < 1:
+            empty = [f for f, c in encoder.schema.coverage_by_field(X).items() if c == 0]
+            st.warning("⚠️ No model column matched: " + ", ".join(empty))
+        st.caption(f"Feature coverage: {coverage:.0%} of one-hot groups populated")
+
+        whatif_panel(row, model_version_on_disk)
+
+        cache_stats = prediction_cache.stats()
+        st.sidebar.caption(f"Prediction cache: {cache_stats['hits']} hits / "
+                           f"{cache_stats['misses']} misses, {cache_stats['size']} entries "
+                           f"(model {cache_stats['version']})")
+
+
+# BATCH SCORING
+st.header("📂 Batch Scoring")
+st.write("Upload a cohort CSV with the same semicolon-separated columns as "
+         "`students_performance.csv` to score every student at once.")
+
+cohort_file = st.file_uploader("Cohort CSV", type="csv")
+explain_cohort = st.checkbox("Include top reasons and per-field contributions", value=False)
+if cohort_file is not None:
+    try:
+        scored_csv, stats = score_cohort(model_version_on_disk, cohort_file.getvalue(), explain_cohort)
+    except ValueError as err:
+        st.error(f"⚠️ Could not score this file: {err}")
+    else:
+        st.success(f"Scored {stats['rows']:,} students in {stats['seconds']:.2f}s "
+                   f"({stats['rows_per_sec']:,.0f} rows/sec)")
+        st.caption(f"Feature coverage: {stats['coverage']:.1%} of one-hot groups populated")
+        if stats["unknown_code_rows"]:
+            fields = ", ".join(f"{field} ({n:,})" for field, n in sorted(stats["unknown_codes"].items()))
+            st.warning(f"⚠️ {stats['unknown_code_rows']:,} students had a blank or unknown code and were "
+                       f"scored as \"Other\" in: {fields}")
+        st.download_button(
+            "⬇️ Download scored CSV",
+            data=scored_csv,
+            file_name="scored_students.csv",
+            mime="text/csv"
+        )
+
+# INPUT DRIFT
+# recent predictions and scored cohorts vs students_performance.csv; new
+# codes that the model folds into "Other" show up as a rising Other rate
+if drift_monitor is not None:
+    drift_stats = drift_monitor.statistics()
+    flagged = drift_stats[drift_stats["flagged"] != ""]
+    with st.expander(f"📈 Input drift ({len(flagged)} fields flagged)", expanded=not flagged.empty):
+        if not flagged.empty:
+            st.warning("⚠️ Drifted from students_performance.csv: " + ", ".join(
+                f"{field} ({reasons})" for field, reasons in zip(flagged["field"], flagged["flagged"])
+            ))
+        st.dataframe(
+            drift_stats.sort_values("psi", ascending=False).rename(columns={
+                "field": "Field", "students": "Students", "psi": "PSI", "ks": "KS",
+                "other_rate": "Other rate", "reference_other_rate": "Reference Other rate",
+                "flagged": "Flagged",
+            }),
+            column_config={"Students": st.column_config.NumberColumn(format="%.0f"),
+                           "Other rate": st.column_config.NumberColumn(format="%.3f"),
+                           "Reference Other rate": st.column_config.NumberColumn(format="%.3f")},
+            use_container_width=True, hide_index=True,
+        )
+        st.caption(f"About the last {drift_monitor.half_life / np.log(2):,.0f} students weigh in "
+                   f"({drift_monitor.live.rows:,.0f} now); nothing is flagged before {MIN_ROWS:,}")
+
+# RERUN TIMING
+rerun_ms = (time.perf_counter() - rerun_started) * 1e3
+rerun_history = st.session_state.setdefault("rerun_ms", [])
+rerun_history.append(rerun_ms)
+del rerun_history[:-50]
+st.sidebar.caption(f"Rerun: {rerun_ms:.0f} ms (median of last {len(rerun_history)}: "
+                   f"{np.median(rerun_history):.0f} ms)")
@@ -0,0 +1,192 @@
+"""
+Memory-mapped model artifact.
+
+An artifact is a directory holding one raw .npy file per ForestEngine node
+array plus a header.json with model_columns, the category mappings, the
+AgeGroup bins and a content version. A compressed forest stores its node
+arrays in smaller dtypes (float16 thresholds, uint8 leaf values); the header
+records every array's dtype and the value_scale that turns the stored leaf
+values back into class fractions. Opening it with np.load(mmap_mode="r")
+takes milliseconds instead of unpickling a 100-tree forest, and every worker
+process that opens the same artifact shares its pages through the OS page
+cache instead of holding a private copy.
+
+Live processes keep those files mapped, so an export never rewrites them:
+each version is written to a temporary directory, renamed into a
+subdirectory named after its content version, and a CURRENT file naming it
+is replaced atomically (as in registry.py). Readers resolve CURRENT once
+and map that version; the old one stays on disk for whoever still maps it.
+
+    dropout_retention_model/
+        CURRENT            -> "3f2a9c1e07b4"
+        3f2a9c1e07b4/      header.json, <array>.npy ...
+
+    python artifact.py export -o dropout_retention_model
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from engine import ForestEngine
+
+ARTIFACT_PATH = "dropout_retention_model"
+HEADER_FILE = "header.json"
+CURRENT_FILE = "CURRENT"
+FORMAT_VERSION = 2
+# format 1 had no value_scale and is read with a scale of 1
+SUPPORTED_FORMATS = (1, 2)
+
+
+def _content_version(arrays: dict, model_columns) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    digest.update(json.dumps(list(model_columns)).encode())
+    return digest.hexdigest()[:12]
+
+
+def _write_current(path: str, version: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(version + "\n")
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, os.path.join(path, CURRENT_FILE))
+
+
+def export_artifact(engine: ForestEngine, model_columns, path: str = ARTIFACT_PATH,
+                    mappings=None) -> dict:
+    """
+    Write engine's node arrays and the encoding metadata as a new version
+    under path and make it CURRENT. Files of earlier versions are never
+    touched. Returns the header.
+    """
+    # imported here so that loading an artifact never pulls in pandas
+    from preprocessing import age_bins, age_labels, category_mappings
+
+    mappings = category_mappings if mappings is None else mappings
+    arrays = engine.arrays()
+    header = {
+        "format_version": FORMAT_VERSION,
+        "version": _content_version(arrays, model_columns),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n_trees": engine.n_trees,
+        "n_nodes": engine.n_nodes,
+        "value_scale": engine.value_scale,
+        "arrays": {name: {"dtype": str(a.dtype), "shape": list(a.shape)} for name, a in arrays.items()},
+        "model_columns": list(model_columns),
+        "mappings": mappings,
+        "age_bins": age_bins,
+        "age_labels": age_labels,
+    }
+
+    os.makedirs(path, exist_ok=True)
+    target = os.path.join(path, header["version"])
+    # the same content re-exported is already complete on disk: only repoint CURRENT
+    if not os.path.isfile(os.path.join(target, HEADER_FILE)):
+        staging = tempfile.mkdtemp(dir=path, prefix=".export-")
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(staging, HEADER_FILE), "w", encoding="utf-8") as f:
+                json.dump(header, f, indent=1)
+            os.chmod(staging, 0o755)
+            shutil.rmtree(target, ignore_errors=True)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    _write_current(path, header["version"])
+    return header
+
+
+def resolve_artifact(path: str = ARTIFACT_PATH) -> str:
+    """Directory of the version CURRENT names (path itself for a flat, pre-CURRENT export)."""
+    current = os.path.join(path, CURRENT_FILE)
+    if os.path.isfile(current):
+        with open(current) as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def read_header(path: str = ARTIFACT_PATH) -> dict:
+    """Header of the CURRENT version of the artifact at path."""
+    return _read_header(resolve_artifact(path))
+
+
+def _read_header(directory: str) -> dict:
+    with open(os.path.join(directory, HEADER_FILE), encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("format_version") not in SUPPORTED_FORMATS:
+        raise ValueError(f"unsupported artifact format {header.get('format_version')} in {directory}")
+    return header
+
+
+def load_artifact(path: str = ARTIFACT_PATH):
+    """
+    Open the CURRENT version of an artifact read-only and memory-mapped.
+    Returns (engine, header); header["model_columns"] are the training columns.
+    """
+    directory = resolve_artifact(path)
+    header = _read_header(directory)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        # np.asarray drops the memmap subclass but keeps the mapped buffer
+        array = np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+        if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"{name}.npy in {directory} does not match its header")
+        arrays[name] = array
+    return ForestEngine(**arrays, value_scale=header.get("value_scale", 1.0)), header
+
+
+def has_artifact(path: str = ARTIFACT_PATH) -> bool:
+    return bool(path) and os.path.isfile(os.path.join(resolve_artifact(path), HEADER_FILE))
+
+
+_versions = {}
+
+
+def model_version(path: str = ARTIFACT_PATH, model_path: str = "dropout_retention_model.pkl") -> str:
+    """
+    Identifier of the model currently on disk, cheap enough to call per
+    request: the artifact's content version when one is exported (re-read
+    only when CURRENT, or a flat export's header.json, is replaced),
+    otherwise the pickle's size and mtime.
+    """
+    if has_artifact(path):
+        current = os.path.join(path, CURRENT_FILE)
+        marker = current if os.path.isfile(current) else os.path.join(path, HEADER_FILE)
+        stat = os.stat(marker)
+        key = (os.path.abspath(marker), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key not in _versions:
+            _versions[key] = read_header(path)["version"]
+        return _versions[key]
+    stat = os.stat(model_path)
+    return f"pkl-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def main(argv=None):
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export the trained forest as a memory-mapped artifact.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="convert the joblib pickle into an artifact directory")
+    export.add_argument("--model", default="dropout_retention_model.pkl")
+    export.add_argument("--columns", default="model_columns.pkl")
+    export.add_argument("-o", "--output", default=ARTIFACT_PATH)
+    args = parser.parse_args(argv)
+
+    engine = ForestEngine.from_sklearn(joblib.load(args.model))
+    header = export_artifact(engine, joblib.load(args.columns), args.output)
+    print(f"exported {header['n_trees']} trees / {header['n_nodes']} nodes "
+          f"as version {header['version']} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+import argparse
+import io
+import itertools
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from artifact import load_artifact, model_version
+from cache import dedup_predict_proba
+from cube import CohortCube, cube_cells, file_batch_id
+from drift import DriftMonitor, build_reference, format_report
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from explain import Explainer, top_reasons
+from preprocessing import check_columns, iter_students_csv, unknown_codes
+from ranking import DEPTH, RiskQueue, TopRanker, queue_entries
+from store import ScoreStore, row_hashes
+
+MODEL_PATH = "dropout_retention_model.pkl"
+COLUMNS_PATH = "model_columns.pkl"
+CHUNKSIZE = 10_000
+
+# target col 'Is_Dropout': 1=Dropout, 0=Not_Dropout
+PREDICTION_LABELS = {0: "Not_Dropout", 1: "Dropout"}
+
+
+def load_model_and_columns(model_path: str = MODEL_PATH, columns_path: str = COLUMNS_PATH,
+                           artifact_path: str = None):
+    """
+    Plain (non-Streamlit) loader for the trained forest and its columns.
+    With artifact_path the forest is a memory-mapped ForestEngine instead.
+    """
+    if artifact_path:
+        engine, header = load_artifact(artifact_path)
+        return engine, header["model_columns"]
+    model = joblib.load(model_path)
+    model_columns = joblib.load(columns_path)
+    return model, model_columns
+
+
+def _predict_proba(model, model_columns):
+    def predict_proba(rows):
+        # sklearn was fitted on a DataFrame; give it one to avoid the feature-name warning
+        return model.predict_proba(pd.DataFrame(rows, columns=model_columns))
+    return predict_proba
+
+
+def _score_frame(model, predict_proba, df: pd.DataFrame, X: np.ndarray,
+                 explainer: Explainer = None) -> pd.DataFrame:
+    """df with Dropout_probability, Prediction (and explanation) columns for its encoded rows X."""
+    # identical students are scored once per chunk
+    proba = dedup_predict_proba(predict_proba, X)
+    pred = model.classes_[np.argmax(proba, axis=1)]
+
+    scored = df.copy()
+    scored["Dropout_probability"] = proba[:, list(model.classes_).index(1)]
+    scored["Prediction"] = pd.Series(pred, index=scored.index).map(PREDICTION_LABELS)
+    if explainer is not None:
+        _, _, contributions = explainer.explain(X)
+        contributions.index = scored.index
+        scored = pd.concat(
+            [scored, top_reasons(contributions), contributions.add_prefix("Contribution_")], axis=1
+        )
+    return scored
+
+
+def _add_unknown_codes(report: dict, rows: int, per_field: dict) -> None:
+    report["unknown_code_rows"] = report.get("unknown_code_rows", 0) + rows
+    totals = report.setdefault("unknown_codes", {})
+    for field, n in per_field.items():
+        totals[field] = totals.get(field, 0) + n
+
+
+def _count_unknown_codes(report: dict, df: pd.DataFrame) -> None:
+    # rows scored with at least one coded field as "Other", and the count per field
+    unknown = unknown_codes(df)
+    _add_unknown_codes(report, int(unknown.any(axis=1).sum()),
+                       {field: int(n) for field, n in unknown.sum().items() if n})
+
+
+def score_chunks(model, encoder: FeatureEncoder, df: pd.DataFrame, chunksize: int = CHUNKSIZE,
+                 report: dict = None, explainer: Explainer = None):
+    """
+    Encode every row of df in one vectorized pass, then yield scored chunks.
+
+    The encoded batch is validated against the encoder's schema first; pass
+    a dict as report to receive its one-hot coverage and the rows with a
+    blank or unknown code (unknown_code_rows, unknown_codes per field,
+    both summed over every chunk by all the scoring paths). With an explainer,
+    every row also gets its top reasons and one Contribution_<field> column
+    per original field.
+
+    predict_proba is called once per chunk; the hard prediction is the argmax
+    of the probabilities, which is exactly what RandomForestClassifier.predict
+    does, so the forest is only evaluated once.
+    """
+    check_columns(df)
+    X = encoder.encode_batch(df)
+    coverage = encoder.schema.validate(X)
+    if report is not None:
+        report["coverage"] = coverage
+        _count_unknown_codes(report, df)
+    predict_proba = _predict_proba(model, encoder.model_columns)
+
+    for start in range(0, len(df), chunksize):
+        stop = start + chunksize
+        yield _score_frame(model, predict_proba, df.iloc[start:stop], X[start:stop], explainer)
+
+
+def score_stream(model, encoder: FeatureEncoder, chunks, report: dict = None,
+                 explainer: Explainer = None):
+    """
+    Score an iterable of raw DataFrames (e.g. iter_students_csv) one at a
+    time, yielding each scored chunk. Only one chunk and one reused encode
+    buffer are alive at once, so memory stays flat whatever the file size;
+    report["coverage"] is the running one-hot coverage.
+    """
+    predict_proba = _predict_proba(model, encoder.model_columns)
+    buffer = None
+    n_rows = 0
+    covered = 0.0
+    for chunk in chunks:
+        check_columns(chunk)
+        n = len(chunk)
+        if buffer is None or len(buffer) < n:
+            buffer = np.empty((n, encoder.n_features), dtype=np.float32)
+        X = encoder.encode_batch(chunk, out=buffer[:n])
+        covered += encoder.schema.validate(X) * n
+        n_rows += n
+        if report is not None:
+            report["coverage"] = covered / n_rows if n_rows else 1.0
+            _count_unknown_codes(report, chunk)
+        yield _score_frame(model, predict_proba, chunk, X, explainer)
+
+
+def rescore_stream(model, encoder: FeatureEncoder, chunks, store: ScoreStore, id_column: str,
+                   version: str, report: dict = None, changed_only: bool = False, on_chunk=None):
+    """
+    Incremental scoring against store. Each chunk is diffed by id_column,
+    and only students that are new, whose raw feature row hash changed, or
+    that were scored by another model version are encoded, scored and
+    written back to the store; the others reuse their stored score.
+
+    Yields one frame per chunk with id_column, Dropout_probability,
+    Prediction and Rescored (only the rescored rows with changed_only).
+    report gets coverage, the unknown code counts of every row (reused ones
+    included) and rescored/reused counts. on_chunk, if given,
+    is called with every raw chunk plus those score columns.
+    """
+    predict_proba = _predict_proba(model, encoder.model_columns)
+    dropout_idx = list(model.classes_).index(1)
+    report = {} if report is None else report
+    report.update(rescored=0, reused=0)
+    covered = 0.0
+    for chunk in chunks:
+        check_columns(chunk)
+        if id_column not in chunk.columns:
+            raise ValueError("Missing columns: " + id_column)
+        ids = chunk[id_column].astype(str).to_numpy()
+        hashes = row_hashes(chunk)
+        stored = store.lookup(ids)
+        changed = ~((stored["row_hash"] == hashes).fillna(False).to_numpy(dtype=bool)
+                    & (stored["model_version"].to_numpy() == version))
+
+        proba = stored["dropout_probability"].to_numpy(dtype=np.float64)
+        prediction = stored["prediction"].to_numpy(dtype=object)
+        n_changed = int(changed.sum())
+        if n_changed:
+            X = encoder.encode_batch(chunk[changed])
+            covered += encoder.schema.validate(X) * n_changed
+            fresh = dedup_predict_proba(predict_proba, X)
+            proba[changed] = fresh[:, dropout_idx]
+            prediction[changed] = [PREDICTION_LABELS[c] for c in model.classes_[np.argmax(fresh, axis=1)]]
+            store.upsert(ids[changed], hashes[changed], version, proba[changed], prediction[changed])
+
+        report["rescored"] += n_changed
+        report["reused"] += len(chunk) - n_changed
+        report["coverage"] = covered / report["rescored"] if report["rescored"] else 1.0
+        _count_unknown_codes(report, chunk)
+        scores = pd.DataFrame({
+            id_column: chunk[id_column].to_numpy(),
+            "Dropout_probability": proba,
+            "Prediction": prediction,
+            "Rescored": changed,
+        }, index=chunk.index)
+        if on_chunk is not None:
+            on_chunk(chunk.assign(**{col: scores[col] for col in scores.columns if col != id_column}))
+        yield scores[changed] if changed_only else scores
+
+
+# per-process state of a scoring worker, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(model, encoder: FeatureEncoder, explainer: Explainer) -> None:
+    _worker["model"] = model
+    _worker["encoder"] = encoder
+    _worker["explainer"] = explainer
+
+
+def _load_worker(model_path: str, columns_path: str, artifact_path: str, explain: bool) -> None:
+    # without fork a worker loads its own model: the artifact memory-mapped
+    # (shared with the other workers through the page cache), or the pickle
+    model, model_columns = load_model_and_columns(model_path, columns_path, artifact_path)
+    encoder = FeatureEncoder(model_columns)
+    explainer = None
+    if explain:
+        engine = model if isinstance(model, ForestEngine) else ForestEngine.from_sklearn(model)
+        explainer = Explainer(engine, encoder.schema)
+    _init_worker(model, encoder, explainer)
+
+
+def _score_in_worker(chunk: pd.DataFrame):
+    report = {}
+    scored = next(score_stream(_worker["model"], _worker["encoder"], [chunk], report, _worker["explainer"]))
+    return scored, report
+
+
+def score_stream_parallel(model, encoder: FeatureEncoder, chunks, workers: int, report: dict = None,
+                          explainer: Explainer = None, artifact_path: str = None,
+                          model_path: str = MODEL_PATH, columns_path: str = COLUMNS_PATH):
+    """
+    score_stream sharded over a pool of worker processes. Raw chunks are
+    handed out as they are read and the scored chunks are yielded in input
+    order, with at most 2 * workers chunks in flight.
+
+    The workers attach to this process's model rather than loading their
+    own: they are forked with model, encoder and explainer as they are, and
+    since scoring never writes the tree arrays (sklearn's or an artifact's)
+    those pages stay shared. Where fork is not available, each worker loads
+    the artifact at artifact_path memory-mapped, or else the pickle at
+    model_path.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        # fork passes initargs to the workers in memory, without pickling them
+        initializer, initargs = _init_worker, (model, encoder, explainer)
+    else:
+        context = None
+        initializer, initargs = _load_worker, (model_path, columns_path, artifact_path, explainer is not None)
+
+    n_rows = 0
+    covered = 0.0
+    pending = deque()
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=initializer, initargs=initargs) as pool:
+        # None marks the end of the input: drain whatever is still pending
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                pending.append(pool.submit(_score_in_worker, chunk))
+            while pending and (chunk is None or len(pending) >= 2 * workers):
+                scored, chunk_report = pending.popleft().result()
+                n_rows += len(scored)
+                covered += chunk_report["coverage"] * len(scored)
+                if report is not None:
+                    report["coverage"] = covered / n_rows if n_rows else 1.0
+                    _add_unknown_codes(report, chunk_report["unknown_code_rows"], chunk_report["unknown_codes"])
+                yield scored
+
+
+def write_scored(chunks, out, fmt: str = "csv") -> int:
+    """
+    Write scored chunks to out as they arrive: appended to a ;-separated CSV,
+    or as one row group per chunk of a Parquet file. Returns the row count.
+    """
+    n_rows = 0
+    writer = None
+    try:
+        for i, scored in enumerate(chunks):
+            if fmt == "parquet":
+                table = pa.Table.from_pandas(scored, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            else:
+                scored.to_csv(out, sep=";", index=False, header=(i == 0), mode="w" if i == 0 else "a")
+            n_rows += len(scored)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
+
+def _observed(chunks, callback):
+    for chunk in chunks:
+        callback(chunk)
+        yield chunk
+
+
+def _each(*callbacks):
+    callbacks = [cb for cb in callbacks if cb is not None]
+    if not callbacks:
+        return None
+
+    def on_chunk(scored):
+        for callback in callbacks:
+            callback(scored)
+    return on_chunk
+
+
+def queue_ranking(queue: RiskQueue, id_column: str = None, depth: int = DEPTH, incremental: bool = False):
+    """
+    (on_chunk, finish) keeping queue current from scored chunks; call
+    finish() after the last chunk for the ranking's counts. With
+    incremental (rescore_stream chunks) and a queue that already holds a
+    ranking, only the Rescored rows are re-ranked, chunk by chunk.
+    Otherwise every row goes through a TopRanker and finish() swaps the
+    new ranking in.
+    """
+    if incremental and not queue.is_empty():
+        counts = {"removed": 0, "inserted": 0}
+
+        def update(scored):
+            changed = scored[scored["Rescored"]]
+            if len(changed):
+                for key, n in queue.update(queue_entries(changed, id_column), depth).items():
+                    counts[key] += n
+        return update, lambda: counts
+
+    ranker = TopRanker(depth)
+
+    def finish():
+        queue.replace(ranker)
+        return {"ranked": ranker.students.get(("all", "all"), 0), "scopes": len(ranker.ranked())}
+    return lambda scored: ranker.add(queue_entries(scored, id_column)), finish
+
+
+def _stats(n_rows: int, elapsed: float, report: dict) -> dict:
+    return {
+        "rows": n_rows,
+        "seconds": elapsed,
+        "rows_per_sec": n_rows / elapsed if elapsed > 0 else float("inf"),
+        "coverage": report.get("coverage", 1.0),
+        "unknown_code_rows": report.get("unknown_code_rows", 0),
+        "unknown_codes": report.get("unknown_codes", {}),
+    }
+
+
+def score_to_csv(model, encoder: FeatureEncoder, df: pd.DataFrame, out, chunksize: int = CHUNKSIZE,
+                 explainer: Explainer = None, on_chunk=None) -> dict:
+    """
+    Score df and write the result to out (a path or text buffer) chunk by chunk.
+    Returns stats: rows, seconds, rows_per_sec, one-hot coverage and the
+    unknown code counts (unknown_code_rows, unknown_codes per field).
+    on_chunk, if given, is called with every scored chunk before it is written.
+    """
+    t0 = time.perf_counter()
+    report = {}
+    scored = score_chunks(model, encoder, df, chunksize, report, explainer)
+    if on_chunk is not None:
+        scored = _observed(scored, on_chunk)
+    n_rows = write_scored(scored, out)
+    return _stats(n_rows, time.perf_counter() - t0, report)
+
+
+def score_to_csv_bytes(model, encoder: FeatureEncoder, df: pd.DataFrame, chunksize: int = CHUNKSIZE,
+                       explainer: Explainer = None, on_chunk=None):
+    """Same as score_to_csv but returns (csv_bytes, stats) for a download button."""
+    buffer = io.StringIO()
+    stats = score_to_csv(model, encoder, df, buffer, chunksize, explainer, on_chunk)
+    return buffer.getvalue().encode("utf-8"), stats
+
+
+def score_file(model, encoder: FeatureEncoder, input_path, output_path, chunksize: int = CHUNKSIZE,
+               explainer: Explainer = None, fmt: str = None, workers: int = 1,
+               artifact_path: str = None, on_chunk=None, model_path: str = MODEL_PATH,
+               columns_path: str = COLUMNS_PATH) -> dict:
+    """
+    Stream input_path through the model chunksize rows at a time and write
+    CSV or Parquet (fmt, by default from the output extension). Returns the
+    same stats as score_to_csv. on_chunk, if given, is called with every
+    scored chunk before it is written.
+
+    With workers > 1 the chunks are scored by a process pool sharing model
+    (see score_stream_parallel; artifact_path and model_path are only read
+    where workers cannot be forked).
+    """
+    if fmt is None:
+        fmt = "parquet" if str(output_path).endswith(".parquet") else "csv"
+    t0 = time.perf_counter()
+    report = {}
+    chunks = iter_students_csv(input_path, chunksize)
+    if workers > 1:
+        scored = score_stream_parallel(model, encoder, chunks, workers, report, explainer, artifact_path,
+                                       model_path, columns_path)
+    else:
+        scored = score_stream(model, encoder, chunks, report, explainer)
+    if on_chunk is not None:
+        scored = _observed(scored, on_chunk)
+    n_rows = write_scored(scored, output_path, fmt)
+    return _stats(n_rows, time.perf_counter() - t0, report)
+
+
+def rescore_file(model, encoder: FeatureEncoder, input_path, output_path, store_path: str,
+                 id_column: str, version: str, chunksize: int = CHUNKSIZE, fmt: str = None,
+                 changed_only: bool = False, on_chunk=None) -> dict:
+    """
+    score_file against a ScoreStore: only new or changed students are
+    scored, and the output holds the ID and score columns of rescore_stream.
+    Stats also carry the rescored and reused counts.
+    """
+    if fmt is None:
+        fmt = "parquet" if str(output_path).endswith(".parquet") else "csv"
+    t0 = time.perf_counter()
+    report = {}
+    with ScoreStore(store_path) as store:
+        chunks = iter_students_csv(input_path, chunksize)
+        scored = rescore_stream(model, encoder, chunks, store, id_column, version, report, changed_only,
+                                on_chunk)
+        n_rows = write_scored(scored, output_path, fmt)
+    stats = _stats(n_rows, time.perf_counter() - t0, report)
+    stats.update(rescored=report["rescored"], reused=report["reused"])
+    return stats
+
+
+def _report_queue(path: str, counts: dict) -> None:
+    if "ranked" in counts:
+        print(f"ranked {counts['ranked']} students into {counts['scopes']} scopes -> {path}")
+    else:
+        print(f"re-ranked {path}: {counts['removed']} entries removed, {counts['inserted']} inserted")
+
+
+def _report_unknown_codes(stats: dict) -> None:
+    if stats["unknown_code_rows"]:
+        fields = ", ".join(f"{field} {n}" for field, n in sorted(stats["unknown_codes"].items()))
+        print(f"{stats['unknown_code_rows']} rows had a blank or unknown code, scored as Other ({fields})")
+
+
+def _report_drift(monitor: DriftMonitor) -> None:
+    stats = monitor.statistics()
+    flagged = stats.loc[stats["flagged"] != "", "field"].tolist()
+    print(f"drift vs students_performance.csv: {len(flagged)} of {len(stats)} fields flagged"
+          + (f" ({', '.join(flagged)})" if flagged else ""))
+    print(format_report(stats))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score every student in a semicolon-separated cohort CSV."
+    )
+    parser.add_argument("input", help="CSV in the students_performance.csv format")
+    parser.add_argument("-o", "--output", default="scored_students.csv",
+                        help="scored CSV (or .parquet) to write")
+    parser.add_argument("--format", choices=("csv", "parquet"), help="output format (default: from -o)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help="rows read, encoded and scored at a time")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--artifact", help="memory-mapped artifact directory to use instead of the pickle")
+    parser.add_argument("--explain", action="store_true",
+                        help="add top reasons and per-field contributions to every row")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="scoring processes sharing the loaded model (forked, so the pickle's "
+                             "trees are not copied per worker; --artifact is memory-mapped); sklearn "
+                             "scores about 1.3x the artifact's rows per core")
+    parser.add_argument("--store", help="sqlite score store: only rescore new or changed students")
+    parser.add_argument("--id-column", help="student ID column of the input (required with --store)")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="with --store, write only the students that were rescored")
+    parser.add_argument("--cube", help="also add the scored batch to this cohort aggregate cube")
+    parser.add_argument("--batch-id", help="batch id in the cube (default: input name, size and mtime)")
+    parser.add_argument("--queue", help="also rank the scored students into this risk queue (see ranking.py); "
+                                        "with --store only the rescored students are re-ranked")
+    parser.add_argument("--queue-depth", type=int, default=DEPTH,
+                        help="students kept in the queue overall and per Course and AgeGroup")
+    parser.add_argument("--drift", action="store_true",
+                        help="report each field's and the score's drift from students_performance.csv "
+                             "(see drift.py)")
+    args = parser.parse_args(argv)
+    if args.store and not args.id_column:
+        parser.error("--store needs --id-column")
+    if args.store and (args.workers > 1 or args.explain or args.cube):
+        parser.error("--store cannot be combined with --workers, --explain or --cube")
+
+    model, model_columns = load_model_and_columns(args.model, args.columns, args.artifact)
+    encoder = FeatureEncoder(model_columns)
+    explainer = None
+    if args.explain:
+        engine = model if isinstance(model, ForestEngine) else ForestEngine.from_sklearn(model)
+        explainer = Explainer(engine, encoder.schema)
+    queue = RiskQueue(args.queue) if args.queue else None
+    rank_chunk = finish_queue = None
+    if queue is not None:
+        rank_chunk, finish_queue = queue_ranking(queue, args.id_column, args.queue_depth, bool(args.store))
+    monitor = None
+    if args.drift:
+        # plain counts: the report covers the whole file
+        predict_proba = _predict_proba(model, model_columns)
+        monitor = DriftMonitor(build_reference(encoder, predict_proba, list(model.classes_).index(1)),
+                               half_life=None)
+    observe_drift = monitor.observe_scored if monitor is not None else None
+    if args.store:
+        stats = rescore_file(model, encoder, args.input, args.output, args.store, args.id_column,
+                             model_version(args.artifact, args.model), args.chunksize, args.format,
+                             args.changed_only, _each(rank_chunk, observe_drift))
+        print(f"rescored {stats['rescored']} of {stats['rescored'] + stats['reused']} rows "
+              f"in {stats['seconds']:.2f}s ({stats['reused']} unchanged) -> {args.output}")
+        _report_unknown_codes(stats)
+        if queue is not None:
+            _report_queue(args.queue, finish_queue())
+            queue.close()
+        if monitor is not None:
+            _report_drift(monitor)
+        return
+
+    cells = []
+    add_cells = (lambda scored: cells.append(cube_cells(scored))) if args.cube else None
+    on_chunk = _each(add_cells, rank_chunk, observe_drift)
+    stats = score_file(model, encoder, args.input, args.output, args.chunksize, explainer,
+                       args.format, args.workers, args.artifact, on_chunk, args.model, args.columns)
+    print(f"scored {stats['rows']} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec, one-hot coverage {stats['coverage']:.1%}) "
+          f"-> {args.output}")
+    _report_unknown_codes(stats)
+    if args.cube and cells:
+        batch_id = args.batch_id or file_batch_id(args.input)
+        with CohortCube(args.cube) as cube:
+            added = cube.add_cells(pd.concat(cells), batch_id)
+        print(f"{'added' if added else 'skipped (already added)'} batch {batch_id} in {args.cube}")
+    if queue is not None:
+        _report_queue(args.queue, finish_queue())
+        queue.close()
+    if monitor is not None:
+        _report_drift(monitor)
+
+
+if __name__ == "__main__":
+    main()
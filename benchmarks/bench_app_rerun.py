@@ -0,0 +1,84 @@
+"""
+Per-rerun cost of the Streamlit app, measured with streamlit's AppTest.
+
+For every --script, times the first run, a rerun after changing one
+selectbox (what every widget interaction cost before the form) and a
+rerun that predicts for a fully filled student. Pass the previous version
+of app.py to compare before and after:
+
+    git show HEAD~1:app.py > /tmp/app_before.py
+    python -m benchmarks.bench_app_rerun --script /tmp/app_before.py app.py
+
+AppTest polls the script thread, so these wall times include a few ms of
+harness overhead; the app itself reports its in-script rerun time in the
+sidebar. In a browser, widgets inside the form do not rerun at all.
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from preprocessing import course_mapping
+
+COURSE_CODES = list(course_mapping)
+
+
+def _predict_button(at):
+    return next(b for b in at.button if "Predict" in b.label)
+
+
+def fill(at):
+    for ni in at.number_input:
+        ni.set_value(22 if ni.label.startswith("Age") else 1)
+
+
+def time_script(script: str, repeat: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    t0 = time.perf_counter()
+    at = AppTest.from_file(script, default_timeout=120).run()
+    first = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"{script} raised: {at.exception[0].message}")
+
+    widget, predict = np.empty(repeat), np.empty(repeat)
+    course = next(s for s in at.selectbox if s.label == "Course")
+    fill(at)
+    for i in range(repeat):
+        # AppTest wants the raw option (the code), not its formatted label
+        course.set_value(COURSE_CODES[i % len(COURSE_CODES)])
+        t0 = time.perf_counter()
+        at.run()
+        widget[i] = time.perf_counter() - t0
+        course = next(s for s in at.selectbox if s.label == "Course")
+
+        # a different student every time, so the prediction is not a cache hit
+        next(n for n in at.number_input if n.label.startswith("Age")).set_value(18 + i % 40)
+        t0 = time.perf_counter()
+        _predict_button(at).click().run()
+        predict[i] = time.perf_counter() - t0
+        if at.exception:
+            raise RuntimeError(f"{script} raised: {at.exception[0].message}")
+        course = next(s for s in at.selectbox if s.label == "Course")
+    return {"first_run_ms": first * 1e3, "widget_rerun_ms": widget * 1e3, "predict_rerun_ms": predict * 1e3}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--script", nargs="+", default=["app.py"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    warnings.simplefilter("ignore")
+
+    print(f"{'script':<28}{'first run ms':>14}{'widget p50':>12}{'widget p95':>12}"
+          f"{'predict p50':>13}{'predict p95':>13}")
+    for script in args.script:
+        r = time_script(script, args.repeat)
+        print(f"{script:<28}{r['first_run_ms']:>14.0f}"
+              f"{np.percentile(r['widget_rerun_ms'], 50):>12.1f}{np.percentile(r['widget_rerun_ms'], 95):>12.1f}"
+              f"{np.percentile(r['predict_rerun_ms'], 50):>13.1f}{np.percentile(r['predict_rerun_ms'], 95):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure cold start and per-worker memory: joblib pickle vs mmapped artifact.
+
+Each variant runs in a fresh interpreter that loads the model and makes one
+prediction, then reports wall time and its resident memory split into
+private (RssAnon) and file-backed pages (RssFile, shared through the page
+cache between workers that map the same artifact).
+
+    python artifact.py export
+    python -m benchmarks.bench_cold_start
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from artifact import ARTIFACT_PATH
+from batch import COLUMNS_PATH, MODEL_PATH
+
+WORKER = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import numpy as np
+kind, path, columns = sys.argv[1:4]
+if kind == "pickle":
+    import joblib
+    model = joblib.load(path)
+    n_features = len(joblib.load(columns))
+    predict = lambda X: model.predict_proba(X)
+else:
+    from artifact import load_artifact
+    model, header = load_artifact(path)
+    n_features = len(header["model_columns"])
+    predict = model.predict_proba
+loaded = time.perf_counter() - t0
+import warnings
+warnings.simplefilter("ignore")
+predict(np.zeros((1, n_features), dtype=np.float32))
+first = time.perf_counter() - t0
+
+rss = {}
+try:
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                rss[key] = int(value.split()[0]) / 1024
+except OSError:
+    import resource
+    rss["VmRSS"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"load_s": loaded, "first_prediction_s": first, **{k + "_mb": v for k, v in rss.items()}}))
+"""
+
+
+def run(kind: str, path: str, columns: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", WORKER, kind, path, columns],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold start: joblib pickle vs mmapped artifact.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--artifact", default=ARTIFACT_PATH)
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per variant (best is kept)")
+    args = parser.parse_args(argv)
+
+    variants = (("pickle", args.model), ("artifact", args.artifact))
+    print(f"{'variant':<10}{'load s':>9}{'1st pred s':>12}{'RSS MB':>9}{'private MB':>12}{'shared MB':>11}")
+    for kind, path in variants:
+        results = [run(kind, path, args.columns) for _ in range(args.runs)]
+        best = min(results, key=lambda r: r["first_prediction_s"])
+        print(f"{kind:<10}{best['load_s']:>9.3f}{best['first_prediction_s']:>12.3f}"
+              f"{best.get('VmRSS_mb', float('nan')):>9.1f}{best.get('RssAnon_mb', float('nan')):>12.1f}"
+              f"{best.get('RssFile_mb', float('nan')):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
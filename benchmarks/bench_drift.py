@@ -0,0 +1,109 @@
+"""
+Drift monitor overhead, and whether it catches a new category.
+
+Builds the reference from students_performance.csv, then:
+
+    row        DriftMonitor.observe_row per student (the app and service path)
+    chunk      DriftMonitor.observe per --chunksize scored chunk (batch.py --drift)
+    render     REGISTRY.render() with the drift gauges bound
+    stream     --rows synthetic students, chunk by chunk, traced
+
+The stream's peak traced memory is one chunk's temporaries, and the
+monitor's own state is the same few kB before and after it. Finally a
+--shift fraction of the students get a Nacionality code the mappings do
+not know, and the fields the monitor flags are printed.
+
+    python -m benchmarks.bench_drift --rows 1000000 --shift 0.1
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+
+from batch import COLUMNS_PATH, MODEL_PATH
+from benchmarks.bench_engine import sample_rows
+from benchmarks.bench_stream import synthetic_csv
+from drift import DriftMonitor, build_reference
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from metrics import REGISTRY
+from preprocessing import iter_students_csv
+
+UNKNOWN_CODE = 999
+
+
+def state_bytes(monitor: DriftMonitor) -> int:
+    return monitor.live.counts.nbytes + monitor.reference.counts.nbytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--single", type=int, default=5_000, help="students observed one at a time")
+    parser.add_argument("--shift", type=float, default=0.1, help="share of students given an unknown Nacionality")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "students_synthetic"))
+    args = parser.parse_args(argv)
+
+    encoder = FeatureEncoder(joblib.load(args.columns))
+    engine = ForestEngine.from_sklearn(joblib.load(args.model))
+    dropout_idx = list(engine.classes_).index(1)
+    t0 = time.perf_counter()
+    reference = build_reference(encoder, engine.predict_proba, dropout_idx, args.data)
+    reference_ms = (time.perf_counter() - t0) * 1e3
+    monitor = DriftMonitor(reference)
+    monitor.bind()
+    rng = np.random.default_rng(42)
+
+    # the scores only need the right shape here; scoring is benchmarked elsewhere
+    students = sample_rows(args.data, args.single).drop(columns="Status")
+    scores = rng.beta(0.8, 1.6, len(students))
+    records = students.to_dict("records")
+    t0 = time.perf_counter()
+    for row, p in zip(records, scores):
+        monitor.observe_row(row, p)
+    row_us = (time.perf_counter() - t0) / len(records) * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(20):
+        REGISTRY.render()
+        monitor.observe_row(records[0], scores[0])
+    render_ms = (time.perf_counter() - t0) / 20 * 1e3
+
+    path = synthetic_csv(args.workdir, args.rows, args.data)
+    before = state_bytes(monitor)
+    chunk_ms = []
+    tracemalloc.start()
+    for chunk in iter_students_csv(path, args.chunksize):
+        shifted = rng.random(len(chunk)) < args.shift
+        chunk["Nacionality"] = chunk["Nacionality"].astype("float64").mask(shifted, UNKNOWN_CODE)
+        proba = rng.beta(0.8, 1.6, len(chunk))
+        t0 = time.perf_counter()
+        monitor.observe(chunk, proba)
+        chunk_ms.append((time.perf_counter() - t0) * 1e3)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    print(f"reference: {reference.n_bins} bins over {len(reference.fields)} fields, built in {reference_ms:.0f} ms")
+    print(f"row      {row_us:8.1f} us per student ({args.single:,} students)")
+    print(f"chunk    {np.median(chunk_ms):8.2f} ms per {args.chunksize:,} students "
+          f"({args.chunksize / np.median(chunk_ms) * 1e3:,.0f} students/s, traced)")
+    print(f"render   {render_ms:8.2f} ms per /metrics (statistics recomputed after every observation)")
+    print(f"stream   {args.rows:,} students: peak traced {peak:.1f} MB (reading and chunk temporaries), "
+          f"monitor state {before:,} B before and {state_bytes(monitor):,} B after")
+    stats = monitor.statistics()
+    nacionality = stats.set_index("field").loc["Nacionality"]
+    print(f"Nacionality Other rate {nacionality['other_rate']:.3f} vs reference "
+          f"{nacionality['reference_other_rate']:.3f} (psi {nacionality['psi']:.2f}); flagged: "
+          + ", ".join(f"{f} ({r})" for f, r in zip(stats["field"], stats["flagged"]) if r))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare ForestEngine against sklearn's predict_proba.
+
+Reports p50/p99 single-row latency and batch throughput on rows sampled
+from students_performance.csv, checks that both give bit-identical
+probabilities, and times path attribution over the whole batch.
+
+    python -m benchmarks.bench_engine
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch import COLUMNS_PATH, MODEL_PATH
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from preprocessing import read_students_csv
+
+
+def sample_rows(path: str, n: int, seed: int = 42) -> pd.DataFrame:
+    """n raw rows drawn with replacement from a students_performance.csv style file."""
+    df = read_students_csv(path)
+    return df.sample(n=n, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def latency_ms(predict, X: np.ndarray, repeat: int) -> np.ndarray:
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        row = X[i % len(X)][np.newaxis, :]
+        t0 = time.perf_counter()
+        predict(row)
+        timings[i] = time.perf_counter() - t0
+    return timings * 1e3
+
+
+def throughput(predict, X: np.ndarray) -> float:
+    t0 = time.perf_counter()
+    predict(X)
+    return len(X) / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    import joblib
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--repeat", type=int, default=500, help="single-row predictions to time")
+    parser.add_argument("--batch", type=int, default=10_000, help="rows in the throughput batch")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    model_columns = joblib.load(args.columns)
+    t0 = time.perf_counter()
+    engine = ForestEngine.from_sklearn(model)
+    compile_ms = (time.perf_counter() - t0) * 1e3
+
+    X = FeatureEncoder(model_columns).encode_batch(sample_rows(args.data, args.batch))
+
+    def sklearn_proba(rows):
+        # sklearn was fitted on a DataFrame; give it one to avoid the feature-name warning
+        return model.predict_proba(pd.DataFrame(rows, columns=model_columns))
+
+    identical = np.array_equal(sklearn_proba(X), engine.predict_proba(X))
+    print(f"trees: {engine.n_trees}, nodes: {engine.n_nodes}, compile: {compile_ms:.1f} ms")
+    print(f"bit-identical probabilities on {len(X):,} rows: {identical}")
+    print(f"{'path':<10}{'p50 ms':>10}{'p99 ms':>10}{'batch rows/s':>16}")
+    for name, predict in (("sklearn", sklearn_proba), ("engine", engine.predict_proba)):
+        timings = latency_ms(predict, X, args.repeat)
+        rate = throughput(predict, X)
+        print(f"{name:<10}{np.percentile(timings, 50):>10.3f}{np.percentile(timings, 99):>10.3f}{rate:>16,.0f}")
+
+    t0 = time.perf_counter()
+    engine.contributions(X, list(engine.classes_).index(1))
+    print(f"explain {len(X):,} rows (path attribution): {time.perf_counter() - t0:.2f} s")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+In-memory size of the student dataset per representation.
+
+Loads --rows students (sampled from students_performance.csv into a
+synthetic file when --rows is given) as:
+
+    default     read_csv defaults: int64 / float64, Status as Python strings
+    labelled    default + codes mapped to English labels, one string per row
+                (what the notebook and the old training path held)
+    int codes   compact_dtypes: int8/int16 codes, float32 grades
+    compact     read_students_compact: Categorical codes, int8/int16, float32
+    compact labelled  compact + code_labels (categories renamed, codes kept)
+
+and reports deep memory_usage, bytes per student and load time.
+
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_stream import synthetic_csv
+from preprocessing import (
+    category_mappings, code_labels, compact_dtypes, read_students_compact, read_students_csv
+)
+
+
+def labelled(df):
+    return df.assign(**{col: code_labels(df[col], mapping) for col, mapping in category_mappings.items()})
+
+
+REPRESENTATIONS = {
+    "default": lambda path: read_students_csv(path),
+    "labelled": lambda path: labelled(read_students_csv(path)),
+    "int codes": lambda path: read_students_csv(path, dtype=compact_dtypes),
+    "compact": lambda path: read_students_compact(path),
+    "compact labelled": lambda path: labelled(read_students_compact(path)),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--rows", type=int, help="synthetic rows (default: the --data file as is)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "students_synthetic"))
+    args = parser.parse_args(argv)
+
+    path = synthetic_csv(args.workdir, args.rows, args.data) if args.rows else args.data
+
+    print(f"{'representation':<18}{'MB':>10}{'bytes/row':>11}{'vs default':>12}{'load s':>9}")
+    base = None
+    for name, load in REPRESENTATIONS.items():
+        t0 = time.perf_counter()
+        df = load(path)
+        seconds = time.perf_counter() - t0
+        size = df.memory_usage(deep=True).sum()
+        base = base or size
+        print(f"{name:<18}{size / 2**20:>10.1f}{size / len(df):>11.0f}{base / size:>11.1f}x{seconds:>9.2f}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Per-stage latency, throughput and memory of the whole prediction path.
+
+Times every stage separately, on rows sampled from students_performance.csv,
+at each --sizes batch size:
+
+    pandas path (the original app.py): row      raw records -> row dicts of labels -> DataFrame
+                                       cut      pd.cut Age_at_enrollment into AgeGroup
+                                       dummies  pd.get_dummies
+                                       reindex  reindex to model_columns
+                                       forest   sklearn predict_proba
+    current path:                      encoder  FeatureEncoder.encode_row / encode_batch
+                                       engine   ForestEngine.predict_proba
+
+Each stage gets the previous stage's output precomputed, and is reported
+as p50/p95/p99 ms per call, rows/s at the median, and peak traced
+allocation in a separate tracemalloc pass (tracing slows the timed code).
+--json writes the results; --baseline compares p50s against an earlier
+--json file and exits 1 if a stage got slower than --tolerance.
+
+    python -m benchmarks.bench_pipeline --json bench_pipeline.json
+    python -m benchmarks.bench_pipeline --baseline bench_pipeline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from batch import COLUMNS_PATH, MODEL_PATH
+from benchmarks.bench_engine import sample_rows
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from preprocessing import age_bins, age_labels, category_mappings, numeric_columns
+
+SIZES = [1, 32, 1_000, 100_000]
+STAGES = ["row", "cut", "dummies", "reindex", "forest", "encoder", "engine"]
+PATHS = {"row": "pandas", "cut": "pandas", "dummies": "pandas", "reindex": "pandas",
+         "forest": "pandas", "encoder": "current", "engine": "current"}
+# distinct batches cycled through per size, so a size-1 run is not one row repeated
+VARIANTS = 16
+
+
+def build_stages(model, model_columns) -> dict:
+    """stage name -> (function of the previous stage's output, name of that input)."""
+    encoder = FeatureEncoder(model_columns)
+    engine = ForestEngine.from_sklearn(model)
+    known = set(model_columns)
+    # code -> label, or "Other" when the label has no dummy column (the notebook's fold)
+    labels = {
+        field: {code: label if f"{field}_{label}" in known else "Other" for code, label in mapping.items()}
+        for field, mapping in category_mappings.items()
+    }
+    cat_cols = list(category_mappings) + ["AgeGroup"]
+
+    def row(records):
+        rows = []
+        for raw in records:
+            row = {"Age_at_enrollment": raw["Age_at_enrollment"]}
+            for field, mapping in labels.items():
+                row[field] = mapping.get(str(raw[field]), "Other")
+            for col in numeric_columns:
+                row[col] = raw[col]
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def cut(df):
+        df = df.assign(AgeGroup=pd.cut(df["Age_at_enrollment"], bins=age_bins, labels=age_labels, right=False))
+        return df.drop(columns="Age_at_enrollment")
+
+    def dummies(df):
+        return pd.get_dummies(df, columns=cat_cols)
+
+    def reindex(df):
+        return df.reindex(columns=model_columns, fill_value=0)
+
+    def encode(records_frame):
+        records, frame = records_frame
+        if len(frame) == 1:
+            return encoder.encode_row(records[0]).copy()
+        return encoder.encode_batch(frame)
+
+    return {
+        "row": (row, "records"),
+        "cut": (cut, "row"),
+        "dummies": (dummies, "cut"),
+        "reindex": (reindex, "dummies"),
+        "forest": (model.predict_proba, "reindex"),
+        "encoder": (encode, "records_frame"),
+        "engine": (engine.predict_proba, "encoder"),
+    }
+
+
+def stage_inputs(stages: dict, frame: pd.DataFrame) -> dict:
+    """Every stage's output for one batch, starting from the raw frame."""
+    records = frame.to_dict("records")
+    out = {"records": records, "records_frame": (records, frame)}
+    for name in STAGES:
+        fn, source = stages[name]
+        out[name] = fn(out[source])
+    return out
+
+
+def time_stage(fn, inputs: list, repeat: int) -> np.ndarray:
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        x = inputs[i % len(inputs)]
+        t0 = time.perf_counter()
+        fn(x)
+        timings[i] = time.perf_counter() - t0
+    return timings * 1e3
+
+
+def peak_alloc_mb(fn, x) -> float:
+    tracemalloc.start()
+    try:
+        fn(x)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def run(model, model_columns, rows: pd.DataFrame, sizes, max_rows: int, max_repeat: int) -> list:
+    stages = build_stages(model, model_columns)
+    results = []
+    for size in sizes:
+        n_variants = max(1, min(VARIANTS, len(rows) // size))
+        batches = [stage_inputs(stages, rows.iloc[i * size:(i + 1) * size].reset_index(drop=True))
+                   for i in range(n_variants)]
+        repeat = max(5, min(max_repeat, max_rows // size))
+        for name in STAGES:
+            fn, source = stages[name]
+            inputs = [batch[source] for batch in batches]
+            fn(inputs[0])  # warm-up
+            timings = time_stage(fn, inputs, repeat)
+            p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+            results.append({
+                "stage": name, "path": PATHS[name], "batch_size": size, "repeat": repeat,
+                "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                "rows_per_sec": size / (p50 / 1e3),
+                "peak_alloc_mb": peak_alloc_mb(fn, inputs[0]),
+            })
+    return results
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """(stage, batch_size, ratio) for every stage whose p50 grew by more than tolerance."""
+    before = {(r["stage"], r["batch_size"]): r["p50_ms"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        key = (r["stage"], r["batch_size"])
+        if key in before and before[key] > 0:
+            ratio = r["p50_ms"] / before[key]
+            r["baseline_p50_ms"] = before[key]
+            if ratio > 1 + tolerance:
+                regressions.append((*key, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--max-rows", type=int, default=500_000,
+                        help="rows timed per stage and size (caps the repeats of large batches)")
+    parser.add_argument("--repeat", type=int, default=300, help="most calls timed per stage and size")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown vs --baseline")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    model_columns = joblib.load(args.columns)
+    rows = sample_rows(args.data, max(max(args.sizes), VARIANTS * 1_000))
+    results = run(model, model_columns, rows, args.sizes, args.max_rows, args.repeat)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    print(f"{'stage':<10}{'path':<9}{'batch':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}"
+          f"{'rows/s':>14}{'peak MB':>10}{'vs base':>9}")
+    for r in results:
+        vs = f"{r['p50_ms'] / r['baseline_p50_ms']:.2f}x" if "baseline_p50_ms" in r else ""
+        print(f"{r['stage']:<10}{r['path']:<9}{r['batch_size']:>8,}{r['p50_ms']:>11.3f}{r['p95_ms']:>11.3f}"
+              f"{r['p99_ms']:>11.3f}{r['rows_per_sec']:>14,.0f}{r['peak_alloc_mb']:>10.2f}{vs:>9}")
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "sklearn": sklearn.__version__,
+            "cpus": os.cpu_count(), "data": args.data, "model": args.model,
+            "n_trees": len(model.estimators_), "n_features": len(model_columns),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.json}")
+    for stage, size, ratio in regressions:
+        print(f"REGRESSION {stage} at batch {size}: p50 {ratio:.2f}x baseline")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Risk queue ranking at population scale.
+
+Streams --rows synthetic students through iter_students_csv with
+forest-like scores (multiples of 1/--trees, so ties are as common as with
+the real forest, which is benchmarked elsewhere) and times, with the peak
+traced allocation of each step (every step runs twice, the second time
+traced):
+
+    top-k      TopRanker over the chunks, then RiskQueue.replace
+    update     RiskQueue.update after --changed of the students got new scores
+    full sort  every entry held in one frame, sorted, top --depth per scope
+    page       one RiskQueue.page from every scope
+
+then checks the incrementally updated queue against the full sort.
+
+    python -m benchmarks.bench_ranking --rows 1000000 --depth 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_stream import synthetic_csv
+from preprocessing import iter_students_csv
+from ranking import DEPTH, RiskQueue, TopRanker, _ranked, _scope_groups, queue_entries
+
+
+def measured(fn):
+    """(result, seconds, peak traced MB); the peak comes from a second, traced run (tracing slows pandas)."""
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    try:
+        fn()
+        return out, seconds, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def scored_chunks(path: str, scores: np.ndarray, chunksize: int):
+    for chunk in iter_students_csv(path, chunksize):
+        yield chunk.assign(Dropout_probability=scores[chunk.index])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--depth", type=int, default=DEPTH)
+    parser.add_argument("--changed", type=float, default=0.02, help="fraction of students rescored")
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "students_synthetic"))
+    args = parser.parse_args(argv)
+
+    path = synthetic_csv(args.workdir, args.rows, args.data)
+    rng = np.random.default_rng(42)
+    scores = (rng.beta(0.8, 1.6, args.rows) * args.trees).round() / args.trees
+    changed = np.sort(rng.choice(args.rows, int(args.rows * args.changed), replace=False))
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp, RiskQueue(os.path.join(tmp, "queue.sqlite")) as queue:
+        def rank():
+            ranker = TopRanker(args.depth)
+            for scored in scored_chunks(path, scores, args.chunksize):
+                ranker.add(queue_entries(scored))
+            queue.replace(ranker)
+        _, seconds, peak = measured(rank)
+        results.append(("top-k", args.rows, seconds, peak))
+
+        # the changed students' rows as the rescore would hand them over
+        rescored = pd.concat(scored.loc[scored.index.intersection(changed)]
+                             for scored in scored_chunks(path, scores, args.chunksize))
+        scores[changed] = (rng.beta(0.8, 1.6, len(changed)) * args.trees).round() / args.trees
+        rescored["Dropout_probability"] = scores[changed]
+        counts, seconds, peak = measured(lambda: queue.update(queue_entries(rescored), args.depth))
+        results.append(("update", len(changed), seconds, peak))
+
+        def full_sort():
+            entries = pd.concat(queue_entries(scored) for scored in scored_chunks(path, scores, args.chunksize))
+            return {(d, v): _ranked(rows).head(args.depth) for d, v, rows in _scope_groups(entries)}
+        expected, seconds, peak = measured(full_sort)
+        results.append(("full sort", args.rows, seconds, peak))
+
+        scopes = queue.scopes()
+        pages, seconds, peak = measured(lambda: [queue.page(d, v) for d, v in zip(scopes["dimension"],
+                                                                                 scopes["value"])])
+        results.append(("page", len(pages), seconds, peak))
+
+        mismatched = 0
+        for (dimension, value), top in expected.items():
+            queued = queue.page(dimension, value, 1, args.depth)
+            mismatched += not np.array_equal(queued["student_id"], top["student_id"].iloc[:len(queued)])
+
+    print(f"{args.rows:,} students, depth {args.depth:,}, {len(scopes)} scopes")
+    print(f"{'step':<11}{'rows':>11}{'seconds':>10}{'peak MB':>10}")
+    for name, rows, seconds, peak in results:
+        print(f"{name:<11}{rows:>11,}{seconds:>10.2f}{peak:>10.1f}")
+    print(f"update: {counts['removed']} entries removed, {counts['inserted']} inserted; "
+          f"shortest scope {scopes['queued'].min()} of {args.depth}")
+    print(f"queue vs full sort: {'identical' if not mismatched else f'{mismatched} scopes differ'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Nightly re-scoring: full scoring vs the incremental score store.
+
+Builds a synthetic enrolled population with a Student_ID column, seeds a
+score store with it ("yesterday"), then changes the 2nd-semester approved
+units and Debtor flag of --changed of the students ("today") and times
+scoring today's export in full against rescore_file.
+
+    python -m benchmarks.bench_rescore --rows 200000 --changed 0.02
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from batch import COLUMNS_PATH, MODEL_PATH, load_model_and_columns, rescore_file, score_file
+from benchmarks.bench_engine import sample_rows
+from encoder import FeatureEncoder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--changed", type=float, default=0.02, help="fraction of students changed today")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--artifact", help="score with a memory-mapped artifact instead of the pickle")
+    args = parser.parse_args(argv)
+
+    model, model_columns = load_model_and_columns(args.model, args.columns, args.artifact)
+    encoder = FeatureEncoder(model_columns)
+    version = "bench"
+
+    df = sample_rows(args.data, args.rows)
+    df.insert(0, "Student_ID", [f"S{i:07d}" for i in range(len(df))])
+    rng = np.random.default_rng(42)
+    idx = rng.choice(len(df), int(len(df) * args.changed), replace=False)
+    today = df.copy()
+    today.loc[idx, "Curricular_units_2nd_sem_approved"] += 1
+    today.loc[idx, "Debtor"] = 1 - today.loc[idx, "Debtor"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        yesterday_csv, today_csv = os.path.join(tmp, "yesterday.csv"), os.path.join(tmp, "today.csv")
+        df.to_csv(yesterday_csv, sep=";", index=False)
+        today.to_csv(today_csv, sep=";", index=False)
+        store, out = os.path.join(tmp, "scores.sqlite"), os.path.join(tmp, "scored.csv")
+
+        seed = rescore_file(model, encoder, yesterday_csv, out, store, "Student_ID", version)
+        full = score_file(model, encoder, today_csv, out)
+        incremental = rescore_file(model, encoder, today_csv, out, store, "Student_ID", version)
+
+    print(f"{args.rows:,} students, {len(idx):,} changed")
+    print(f"seed store       {seed['seconds']:>7.2f}s")
+    print(f"full rescore     {full['seconds']:>7.2f}s")
+    print(f"incremental      {incremental['seconds']:>7.2f}s  "
+          f"({incremental['rescored']:,} rescored, {incremental['reused']:,} reused)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Streaming vs in-memory batch scoring on large synthetic cohorts.
+
+Synthetic files are students_performance.csv rows drawn with replacement
+(written once, then reused). Every (size, mode) pair runs in a fresh
+interpreter that reports rows/sec and its peak RSS: "stream" is
+batch.score_file (chunked read with compact dtypes, incremental write),
+"memory" reads the whole file and encodes it in one go.
+
+    python -m benchmarks.bench_stream --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from batch import CHUNKSIZE, COLUMNS_PATH, MODEL_PATH
+from preprocessing import read_students_csv
+
+WORKER = r"""
+import json, resource, sys, time
+from batch import load_model_and_columns, score_file, score_to_csv
+from encoder import FeatureEncoder
+from preprocessing import read_students_csv
+mode, path, out, chunksize, model_path, columns_path, artifact = sys.argv[1:8]
+model, model_columns = load_model_and_columns(model_path, columns_path, artifact or None)
+encoder = FeatureEncoder(model_columns)
+if mode == "stream":
+    stats = score_file(model, encoder, path, out, int(chunksize))
+else:
+    t0 = time.perf_counter()
+    df = read_students_csv(path)
+    stats = score_to_csv(model, encoder, df, out, int(chunksize))
+    stats["seconds"] = time.perf_counter() - t0
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"]
+stats["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(stats))
+"""
+
+
+def write_synthetic_csv(path: str, n_rows: int, source: str = "students_performance.csv",
+                        seed: int = 42, block: int = 100_000) -> str:
+    """Write n_rows sampled with replacement from source, in the same ;-separated format."""
+    df = read_students_csv(source)
+    written = 0
+    block_seed = seed
+    while written < n_rows:
+        n = min(block, n_rows - written)
+        rows = df.sample(n=n, replace=True, random_state=block_seed)
+        rows.to_csv(path, sep=";", index=False, header=(written == 0), mode="w" if written == 0 else "a")
+        written += n
+        block_seed += 1
+    return path
+
+
+def synthetic_csv(workdir: str, n_rows: int, source: str = "students_performance.csv") -> str:
+    """Path of a cached synthetic file with n_rows rows, creating it if needed."""
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f"students_{n_rows}.csv")
+    if not os.path.exists(path):
+        write_synthetic_csv(path, n_rows, source)
+    return path
+
+
+def run(mode: str, path: str, out: str, chunksize: int, model: str, columns: str, artifact: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER, mode, path, out, str(chunksize), model, columns, artifact or ""],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", choices=("stream", "memory"), default=["stream", "memory"])
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--artifact", help="score with a memory-mapped artifact instead of the pickle")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "students_synthetic"))
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10}{'mode':>8}{'seconds':>10}{'rows/sec':>11}{'peak RSS MB':>13}")
+    for n_rows in args.sizes:
+        path = synthetic_csv(args.workdir, n_rows, args.data)
+        out = os.path.join(args.workdir, f"scored_{n_rows}.csv")
+        for mode in args.modes:
+            stats = run(mode, path, out, args.chunksize, args.model, args.columns, args.artifact)
+            print(f"{n_rows:>10,}{mode:>8}{stats['seconds']:>10.2f}{stats['rows_per_sec']:>11,.0f}"
+                  f"{stats['peak_rss_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+What-if sweep latency: one batched call vs one prediction per scenario.
+
+For students sampled from students_performance.csv, sweeps --fields
+(every combination, --steps points per numeric field; the defaults give
+1,024 scenarios) and times each stage of whatif.sweep:
+
+    grid      perturbation_grid
+    encode    FeatureEncoder.encode_batch on the whole grid
+    predict   one ForestEngine.predict_proba call (and sklearn's, for reference)
+
+against scoring the same scenarios one encode_row + predict_proba at a
+time, which is what re-clicking Predict in the app amounts to (without
+the rerun).
+
+    python -m benchmarks.bench_whatif --steps 16
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from batch import COLUMNS_PATH, MODEL_PATH
+from benchmarks.bench_engine import sample_rows
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from whatif import axis_values, perturbation_grid
+
+FIELDS = ["Curricular_units_1st_sem_approved", "Curricular_units_2nd_sem_grade",
+          "Tuition_fees_up_to_date", "Scholarship_holder"]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--fields", nargs="+", default=FIELDS)
+    parser.add_argument("--steps", type=int, default=16)
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--one-by-one", type=int, default=3, help="students also scored one scenario at a time")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    model_columns = joblib.load(args.columns)
+    encoder = FeatureEncoder(model_columns)
+    engine = ForestEngine.from_sklearn(model)
+    students = sample_rows(args.data, args.students).drop(columns="Status").to_dict("records")
+    axes = {field: axis_values(field, args.steps) for field in args.fields}
+
+    rows = {"grid": [], "encode": [], "predict": [], "sklearn predict": [], "sweep": [], "one by one": []}
+    for i, raw in enumerate(students):
+        grid, grid_ms = timed(perturbation_grid, raw, axes)
+        X, encode_ms = timed(encoder.encode_batch, grid)
+        batched, predict_ms = timed(engine.predict_proba, X)
+        rows["sklearn predict"].append(timed(model.predict_proba, pd.DataFrame(X, columns=model_columns))[1])
+        rows["grid"].append(grid_ms)
+        rows["encode"].append(encode_ms)
+        rows["predict"].append(predict_ms)
+        rows["sweep"].append(grid_ms + encode_ms + predict_ms)
+        if i < args.one_by_one:
+            records = grid.to_dict("records")
+            single, single_ms = timed(
+                lambda: np.vstack([engine.predict_proba(encoder.encode_row(r).copy()) for r in records])
+            )
+            assert np.allclose(single, batched)
+            rows["one by one"].append(single_ms)
+
+    print(f"{len(grid):,} scenarios per student ({', '.join(args.fields)}), {len(students)} students")
+    print(f"{'stage':<17}{'p50 ms':>10}{'max ms':>10}{'scenarios/s':>14}")
+    for name, timings in rows.items():
+        p50 = np.median(timings)
+        print(f"{name:<17}{p50:>10.1f}{np.max(timings):>10.1f}{len(grid) / (p50 / 1e3):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
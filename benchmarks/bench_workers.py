@@ -0,0 +1,101 @@
+"""
+Batch scoring throughput and worker memory as the process pool grows.
+
+Scores one synthetic cohort (students_performance.csv rows drawn with
+replacement) with batch.score_file, once with the sklearn pickle and once
+with the memory-mapped artifact: serially, then at every --workers count.
+The workers are forked with the model already loaded, so neither is copied
+per worker; the private column is the largest private (not shared) memory
+of any worker during the run, read from /proc. Speedups are over the serial
+run of the same model, and bounded by the cores available (printed first).
+
+    python -m benchmarks.bench_workers --rows 200000 --workers 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+
+from artifact import ARTIFACT_PATH, export_artifact, has_artifact, load_artifact
+from batch import CHUNKSIZE, COLUMNS_PATH, MODEL_PATH, load_model_and_columns, score_file
+from benchmarks.bench_stream import synthetic_csv
+from encoder import FeatureEncoder
+from engine import ForestEngine
+
+
+def private_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return sum(int(fields[key].split()[0]) for key in ("Private_Clean", "Private_Dirty")) / 1024
+
+
+def children() -> list:
+    pids = []
+    for task in os.listdir(f"/proc/{os.getpid()}/task"):
+        with open(f"/proc/{os.getpid()}/task/{task}/children") as f:
+            pids += [int(pid) for pid in f.read().split()]
+    return pids
+
+
+def peak_worker_mb(run) -> tuple:
+    """(run(), largest private memory of a child process seen while it ran)."""
+    peak = 0.0
+    done = threading.Event()
+
+    def poll():
+        nonlocal peak
+        while not done.wait(0.05):
+            for pid in children():
+                try:
+                    peak = max(peak, private_mb(pid))
+                except OSError:
+                    pass
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    try:
+        return run(), peak
+    finally:
+        done.set()
+        poller.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--artifact", default=ARTIFACT_PATH, help="exported from --model if missing")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "students_synthetic"))
+    args = parser.parse_args(argv)
+
+    path = synthetic_csv(args.workdir, args.rows, args.data)
+    out = os.path.join(args.workdir, f"scored_workers_{args.rows}.csv")
+    model, model_columns = load_model_and_columns(args.model, args.columns)
+    encoder = FeatureEncoder(model_columns)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_path = args.artifact
+        if not has_artifact(artifact_path):
+            artifact_path = tmp
+            export_artifact(ForestEngine.from_sklearn(model), model_columns, artifact_path)
+        engine, _ = load_artifact(artifact_path)
+
+        print(f"{os.cpu_count()} cores, {args.rows:,} rows, chunks of {args.chunksize:,}")
+        print(f"{'model':<10}{'workers':>8}{'seconds':>10}{'rows/sec':>11}{'speedup':>9}{'private MB':>12}")
+        for name, scorer, source in (("pickle", model, None), ("artifact", engine, artifact_path)):
+            base = None
+            for workers in [1] + args.workers:
+                stats, peak = peak_worker_mb(lambda: score_file(
+                    scorer, encoder, path, out, args.chunksize, workers=workers, artifact_path=source,
+                    model_path=args.model, columns_path=args.columns))
+                base = base or stats["rows_per_sec"]
+                private = f"{peak:12.1f}" if workers > 1 else f"{'-':>12}"
+                print(f"{name:<10}{workers:>8}{stats['seconds']:>10.2f}{stats['rows_per_sec']:>11,.0f}"
+                      f"{stats['rows_per_sec'] / base:>8.2f}x{private}")
+
+
+if __name__ == "__main__":
+    main()
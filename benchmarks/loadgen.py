@@ -0,0 +1,64 @@
+"""
+Load generator for service.py.
+
+Fires --requests single-student POSTs at /predict with --concurrency in
+flight, using rows sampled from students_performance.csv, and reports
+requests/sec, latency percentiles and the micro-batch sizes the service
+used.
+
+    python service.py &
+    python -m benchmarks.loadgen --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient
+
+from benchmarks.bench_engine import sample_rows
+
+
+async def run(url: str, students: list, concurrency: int):
+    client = AsyncHTTPClient(max_clients=concurrency)
+    latencies, batch_sizes = [], []
+    next_idx = 0
+
+    async def worker():
+        nonlocal next_idx
+        while next_idx < len(students):
+            body = students[next_idx]
+            next_idx += 1
+            t0 = time.perf_counter()
+            response = await client.fetch(url, method="POST", body=body,
+                                          headers={"Content-Type": "application/json"})
+            latencies.append(time.perf_counter() - t0)
+            batch_sizes.append(json.loads(response.body)["batch_size"])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - t0, np.array(latencies) * 1e3, np.array(batch_sizes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the prediction service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/predict")
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    df = sample_rows(args.data, args.requests).drop(columns=["Status"], errors="ignore")
+    students = [json.dumps(record) for record in df.to_dict("records")]
+    elapsed, latencies, batch_sizes = asyncio.run(run(args.url, students, args.concurrency))
+
+    print(f"{len(students)} requests, concurrency {args.concurrency}: "
+          f"{len(students) / elapsed:,.0f} req/s")
+    print(f"latency ms  p50 {np.percentile(latencies, 50):.2f}  "
+          f"p95 {np.percentile(latencies, 95):.2f}  p99 {np.percentile(latencies, 99):.2f}")
+    print(f"micro-batch size  mean {batch_sizes.mean():.1f}  max {batch_sizes.max()}")
+
+
+if __name__ == "__main__":
+    main()
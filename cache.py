@@ -0,0 +1,89 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+
+def unique_rows(X: np.ndarray):
+    """
+    Deduplicate the rows of a 2-D array.
+    Returns (unique, inverse) with unique[inverse] == X.
+    """
+    X = np.ascontiguousarray(X)
+    if len(X) == 0:
+        return X, np.zeros(0, dtype=np.intp)
+    # one opaque bytes value per row, hashed by pandas instead of sorted
+    rows = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+    inverse, uniques = pd.factorize(rows)
+    first = np.empty(len(uniques), dtype=np.intp)
+    first[inverse[::-1]] = np.arange(len(X) - 1, -1, -1)
+    return X[first], inverse
+
+
+def dedup_predict_proba(predict_proba, X: np.ndarray) -> np.ndarray:
+    """Score only the distinct rows of X and broadcast the probabilities back."""
+    unique, inverse = unique_rows(X)
+    if len(unique) == len(X):
+        return predict_proba(X)
+    return predict_proba(unique)[inverse]
+
+
+class PredictionCache:
+    """
+    Size-bounded LRU cache with a TTL in front of predict_proba.
+
+    Keys are a hash of the encoded float32 row, so two students with the
+    same encoded features share an entry. A cache belongs to one model
+    version (recorded in stats()): when the model changes, callers build a
+    new cache for the new version instead of reusing this one.
+    """
+
+    def __init__(self, predict_proba, version=None, maxsize: int = 10_000, ttl: float = 3600):
+        self.predict_proba_uncached = predict_proba
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # cachetools caches are not thread-safe; Streamlit sessions are threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(x: np.ndarray) -> bytes:
+        return hashlib.blake2b(np.ascontiguousarray(x, dtype=np.float32).tobytes(), digest_size=16).digest()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "version": self.version,
+        }
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) == 0:
+            return self.predict_proba_uncached(X)
+        keys = [self.key(x) for x in X]
+        found = {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                proba = self._cache.get(k)
+                if proba is not None:
+                    found[i] = proba
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        missing = [i for i in range(len(keys)) if i not in found]
+        if missing:
+            computed = dedup_predict_proba(self.predict_proba_uncached, X[missing])
+            with self._lock:
+                for i, proba in zip(missing, computed):
+                    self._cache[keys[i]] = proba
+                    found[i] = proba
+
+        return np.stack([found[i] for i in range(len(keys))])
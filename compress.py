@@ -0,0 +1,241 @@
+"""
+Shrink the trained forest to an inference budget.
+
+Three reductions, applied to the flattened ForestEngine:
+
+- tree subset: trees are ranked by their own out-of-bag accuracy and only
+  the best n_trees are kept;
+- depth pruning: every node at max_depth becomes a leaf predicting its
+  class fractions, and the unreachable subtrees are dropped;
+- quantization: thresholds are stored as float16, leaf values as uint8
+  (value_scale = 1/255) and node indices in compact integer dtypes.
+
+Every (n_trees, max_depth) candidate is scored on out-of-bag rows of the
+training split, so the choice never looks at the held-out split; the most
+accurate candidate within the budget (--max-p99-ms single-row latency,
+--max-size-mb artifact size) is exported, and its accuracy/F1 against the
+original forest on the notebook's held-out split is reported.
+
+By default the result goes to its own artifact, next to the live one; pass
+-o dropout_retention_model to make it the version the app and the service
+load (the export adds a version and swaps CURRENT, see artifact.py).
+
+    python compress.py --max-p99-ms 1 --max-size-mb 1
+    python compress.py --max-p99-ms 1 --max-size-mb 1 -o dropout_retention_model
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+from artifact import export_artifact
+from engine import ForestEngine
+
+VALUE_LEVELS = 255
+TREE_COUNTS = (10, 20, 30, 40, 50, 60, 80, 100)
+MAX_DEPTHS = (4, 6, 8, 10, 12, 15, None)
+COMPRESSED_PATH = "dropout_retention_model_compressed"
+
+
+def prune(engine: ForestEngine, trees=None, max_depth: int = None) -> ForestEngine:
+    """Keep only the given trees (indices, in order) cut to max_depth, renumbering the nodes."""
+    trees = np.arange(engine.n_trees) if trees is None else np.asarray(trees)
+    children = engine.children.copy()
+    keep = np.zeros(engine.n_nodes, dtype=bool)
+
+    frontier, depth = engine.roots[trees], 0
+    while frontier.size:
+        keep[frontier] = True
+        if max_depth is not None and depth == max_depth:
+            # cut here: the node becomes a leaf predicting its class fractions
+            children[frontier] = frontier[:, np.newaxis]
+            break
+        frontier = frontier[~engine.is_leaf[frontier]]
+        frontier = children[frontier].reshape(-1)
+        depth += 1
+
+    new_id = np.cumsum(keep) - 1
+    ids = np.flatnonzero(keep)
+    leaf = children[ids, 0] == ids
+    return ForestEngine(
+        feature=np.where(leaf, 0, engine.feature[ids]),
+        threshold=np.where(leaf, -2.0, engine.threshold[ids]),
+        children=new_id[children[ids]],
+        missing_go_to_left=engine.missing_go_to_left[ids],
+        value=engine.value[ids],
+        roots=new_id[engine.roots[trees]],
+        classes=engine.classes_,
+        value_scale=engine.value_scale,
+    )
+
+
+def _smallest_int(max_value: int):
+    for dtype in (np.uint8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.intp
+
+
+def quantize(engine: ForestEngine) -> ForestEngine:
+    """float16 thresholds, uint8 leaf values and compact index dtypes."""
+    value = np.rint(engine.value * engine.value_scale * VALUE_LEVELS).astype(np.int32)
+    # keep every node's fractions summing to exactly 1 after rounding
+    top = np.argmax(value, axis=1)
+    value[np.arange(len(value)), top] += VALUE_LEVELS - value.sum(axis=1)
+
+    threshold = engine.threshold
+    if np.abs(threshold).max() < np.finfo(np.float16).max:
+        threshold = threshold.astype(np.float16)
+    # node ids are doubled during traversal, so no narrower than int32
+    index = np.int32 if 2 * engine.n_nodes < np.iinfo(np.int32).max else np.intp
+    return ForestEngine(
+        feature=engine.feature.astype(_smallest_int(int(engine.feature.max()))),
+        threshold=threshold,
+        children=engine.children.astype(index),
+        missing_go_to_left=engine.missing_go_to_left,
+        value=value.astype(np.uint8),
+        roots=engine.roots.astype(index),
+        classes=engine.classes_,
+        value_scale=1.0 / VALUE_LEVELS,
+    )
+
+
+def artifact_mb(engine: ForestEngine) -> float:
+    return sum(np.asarray(a).nbytes for a in engine.arrays().values()) / 2**20
+
+
+def p99_latency_ms(engine: ForestEngine, X: np.ndarray, repeat: int = 300) -> float:
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        row = X[i % len(X)][np.newaxis, :]
+        t0 = time.perf_counter()
+        engine.predict_proba(row)
+        timings[i] = time.perf_counter() - t0
+    return float(np.percentile(timings, 99) * 1e3)
+
+
+def oob_masks(model, n_samples: int) -> np.ndarray:
+    """(n_trees, n_samples) True where a training row was out of bag for that tree."""
+    mask = np.ones((len(model.estimators_), n_samples), dtype=bool)
+    for t, samples in enumerate(model.estimators_samples_):
+        mask[t, samples] = False
+    return mask
+
+
+def oob_accuracy(engine: ForestEngine, X: np.ndarray, y: np.ndarray, oob: np.ndarray) -> float:
+    """Accuracy over training rows, each voted on only by the trees it was out of bag for."""
+    dropout_idx = list(engine.classes_).index(1)
+    leaves = engine.apply(X)
+    p = engine.value[leaves, dropout_idx] * engine.value_scale
+    votes = oob.sum(axis=0)
+    seen = votes > 0
+    proba = (p * oob).sum(axis=0)[seen] / votes[seen]
+    # binary forest: argmax of the two fractions, ties going to the first class like predict
+    pred = np.where(proba > 0.5, engine.classes_[dropout_idx], engine.classes_[1 - dropout_idx])
+    return float((pred == y[seen]).mean())
+
+
+def rank_trees(engine: ForestEngine, X: np.ndarray, y: np.ndarray, oob: np.ndarray) -> np.ndarray:
+    """Tree indices, best out-of-bag accuracy first."""
+    leaves = engine.apply(X)
+    pred = engine.classes_[np.argmax(engine.value[leaves], axis=2)]
+    correct = ((pred == y) & oob).sum(axis=1) / np.maximum(oob.sum(axis=1), 1)
+    return np.argsort(-correct, kind="stable")
+
+
+def compress(model, X_train, y_train, max_p99_ms: float = None, max_size_mb: float = None,
+             tree_counts=TREE_COUNTS, max_depths=MAX_DEPTHS, quantized: bool = True):
+    """
+    Try every (n_trees, max_depth) candidate and return (engine, candidates)
+    for the most accurate one within budget; candidates is a DataFrame with
+    the out-of-bag accuracy, p99 latency and size of each.
+    """
+    full = ForestEngine.from_sklearn(model)
+    X = np.asarray(X_train, dtype=np.float32)
+    y = np.asarray(y_train)
+    oob = oob_masks(model, len(X))
+    order = rank_trees(full, X, y, oob)
+
+    rows, engines = [], []
+    for n_trees in tree_counts:
+        if n_trees > full.n_trees:
+            continue
+        trees = np.sort(order[:n_trees])
+        for max_depth in max_depths:
+            engine = prune(full, trees, max_depth)
+            if quantized:
+                engine = quantize(engine)
+            rows.append({
+                "n_trees": n_trees,
+                "max_depth": max_depth,
+                "n_nodes": engine.n_nodes,
+                "size_mb": artifact_mb(engine),
+                "p99_ms": p99_latency_ms(engine, X),
+                "oob_accuracy": oob_accuracy(engine, X, y, oob[trees]),
+            })
+            engines.append(engine)
+
+    candidates = pd.DataFrame(rows)
+    ok = np.ones(len(candidates), dtype=bool)
+    if max_p99_ms is not None:
+        ok &= candidates["p99_ms"] <= max_p99_ms
+    if max_size_mb is not None:
+        ok &= candidates["size_mb"] <= max_size_mb
+    if not ok.any():
+        raise ValueError("no candidate meets the latency/size budget")
+    # most accurate, then smallest
+    best = candidates[ok].sort_values(["oob_accuracy", "size_mb"], ascending=[False, True]).index[0]
+    return engines[best], candidates
+
+
+def heldout_report(model, engine: ForestEngine, X_test, y_test) -> dict:
+    X = np.asarray(X_test, dtype=np.float32)
+    before = model.classes_[np.argmax(ForestEngine.from_sklearn(model).predict_proba(X), axis=1)]
+    after = engine.predict(X)
+    return {
+        "accuracy": accuracy_score(y_test, before),
+        "accuracy_compressed": accuracy_score(y_test, after),
+        "f1": f1_score(y_test, before),
+        "f1_compressed": f1_score(y_test, after),
+        "agreement": float((before == after).mean()),
+    }
+
+
+def main(argv=None):
+    from train import load_split
+
+    parser = argparse.ArgumentParser(description="Compress the forest to a latency/size budget.")
+    parser.add_argument("--model", default="dropout_retention_model.pkl")
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--max-p99-ms", type=float, help="single-row p99 latency budget")
+    parser.add_argument("--max-size-mb", type=float, help="artifact size budget")
+    parser.add_argument("--no-quantize", action="store_true", help="keep float64 thresholds and values")
+    parser.add_argument("-o", "--output", default=COMPRESSED_PATH,
+                        help="artifact to export to (the live dropout_retention_model only when named)")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    X_train, X_test, y_train, y_test = load_split(args.data)
+    engine, candidates = compress(model, X_train, y_train, args.max_p99_ms, args.max_size_mb,
+                                  quantized=not args.no_quantize)
+    print(candidates.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    full = ForestEngine.from_sklearn(model)
+    report = heldout_report(model, engine, X_test, y_test)
+    print(f"\n{full.n_trees} trees / {full.n_nodes} nodes / {artifact_mb(full):.2f} MB"
+          f" -> {engine.n_trees} trees / {engine.n_nodes} nodes / {artifact_mb(engine):.2f} MB")
+    print(f"held-out accuracy {report['accuracy']:.4f} -> {report['accuracy_compressed']:.4f} "
+          f"({report['accuracy_compressed'] - report['accuracy']:+.4f}), "
+          f"F1 {report['f1']:.4f} -> {report['f1_compressed']:.4f} "
+          f"({report['f1_compressed'] - report['f1']:+.4f}), "
+          f"agreement {report['agreement']:.2%}")
+
+    header = export_artifact(engine, X_train.columns, args.output)
+    print(f"exported version {header['version']} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
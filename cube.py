@@ -0,0 +1,177 @@
+"""
+Materialized cohort aggregates for the analytics page.
+
+Students are counted into one cell per (tuition, scholarship, age_group,
+course, status) combination, with the sums needed by the dashboard metrics
+(1st-semester approved units, scored students, dropout probability and
+predicted dropouts). There are a few hundred cells whatever the number of
+students, so every chart, and any slice of them, is a groupby over the
+cube instead of a scan of the raw data. Batches are added incrementally
+and at most once per batch id.
+
+    python cube.py add students_performance.csv
+    python cube.py add scored_students.csv --batch-id 2024-06-01
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from preprocessing import age_bins, age_labels, binary_mapping, code_labels, course_mapping, read_students_compact
+
+CUBE_PATH = "cohort_cube.sqlite"
+DIMENSIONS = ["tuition", "scholarship", "age_group", "course", "status"]
+MEASURES = ["students", "approved_1st_sum", "scored", "dropout_probability_sum", "predicted_dropouts"]
+# rows without a Status column (e.g. currently enrolled students) get this status
+UNKNOWN = "Unknown"
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS cube (
+        tuition TEXT, scholarship TEXT, age_group TEXT, course TEXT, status TEXT,
+        students INTEGER NOT NULL,
+        approved_1st_sum REAL NOT NULL,
+        scored INTEGER NOT NULL,
+        dropout_probability_sum REAL NOT NULL,
+        predicted_dropouts INTEGER NOT NULL,
+        PRIMARY KEY (tuition, scholarship, age_group, course, status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS batches (
+        batch_id TEXT PRIMARY KEY,
+        students INTEGER NOT NULL,
+        added_at TEXT NOT NULL
+    )
+    """,
+]
+
+
+def cube_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate raw (optionally scored) rows into cube cells."""
+    def label(col, mapping):
+        return code_labels(df[col], mapping).astype(object).fillna("Other").to_numpy()
+
+    age_group = pd.cut(df["Age_at_enrollment"], bins=age_bins, labels=age_labels, right=False)
+    keys = pd.DataFrame({
+        "tuition": label("Tuition_fees_up_to_date", binary_mapping["Tuition_fees_up_to_date"]),
+        "scholarship": label("Scholarship_holder", binary_mapping["Scholarship_holder"]),
+        "age_group": age_group.astype(object).fillna("Other").to_numpy(),
+        "course": label("Course", course_mapping),
+        "status": df["Status"].astype(object).fillna(UNKNOWN).to_numpy() if "Status" in df.columns else UNKNOWN,
+    })
+    probability = df["Dropout_probability"] if "Dropout_probability" in df.columns else None
+    prediction = df["Prediction"] if "Prediction" in df.columns else None
+    keys["students"] = 1
+    keys["approved_1st_sum"] = df["Curricular_units_1st_sem_approved"].to_numpy(dtype=float)
+    keys["scored"] = 0 if probability is None else probability.notna().to_numpy(dtype=int)
+    keys["dropout_probability_sum"] = 0.0 if probability is None else probability.fillna(0).to_numpy()
+    keys["predicted_dropouts"] = 0 if prediction is None else (prediction == "Dropout").to_numpy(dtype=int)
+    return keys.groupby(DIMENSIONS, as_index=False)[MEASURES].sum()
+
+
+class CohortCube:
+    """sqlite-backed cube; the file changes (and its mtime moves) on every add."""
+
+    def __init__(self, path: str = CUBE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        for statement in _SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def has_batch(self, batch_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM batches WHERE batch_id = ?", (batch_id,)).fetchone() is not None
+
+    def add_cells(self, cells: pd.DataFrame, batch_id: str = None) -> bool:
+        """
+        Add pre-aggregated cells (from one or more cube_cells calls) in one
+        transaction. Returns False, adding nothing, if batch_id was already added.
+        """
+        if batch_id is not None and self.has_batch(batch_id):
+            return False
+        cells = cells.groupby(DIMENSIONS, as_index=False)[MEASURES].sum()
+        updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in MEASURES)
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO cube ({', '.join(DIMENSIONS + MEASURES)}) "
+                f"VALUES ({', '.join('?' * (len(DIMENSIONS) + len(MEASURES)))}) "
+                f"ON CONFLICT ({', '.join(DIMENSIONS)}) DO UPDATE SET {updates}",
+                cells[DIMENSIONS + MEASURES].itertuples(index=False, name=None),
+            )
+            if batch_id is not None:
+                self.conn.execute(
+                    "INSERT INTO batches VALUES (?, ?, ?)",
+                    (batch_id, int(cells["students"].sum()), time.strftime("%Y-%m-%dT%H:%M:%S")),
+                )
+        return True
+
+    def add(self, df: pd.DataFrame, batch_id: str = None) -> bool:
+        return self.add_cells(cube_cells(df), batch_id)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.read_sql_query(f"SELECT {', '.join(DIMENSIONS + MEASURES)} FROM cube", self.conn)
+
+    def batches(self) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT * FROM batches ORDER BY added_at", self.conn)
+
+
+def rollup(cells: pd.DataFrame, by, where: dict = None) -> pd.DataFrame:
+    """
+    Roll the cube up to the dimensions in by, keeping only cells whose
+    dimension values are in where[dim], with the dashboard metrics:
+    dropout_rate (over students with a known status), mean_approved_1st,
+    mean_dropout_probability and predicted_dropout_rate (over scored students).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    for dim, values in (where or {}).items():
+        if values:
+            cells = cells[cells[dim].isin(values)]
+    cells = cells.assign(
+        dropouts=cells["students"].where(cells["status"] == "Dropout", 0),
+        labelled=cells["students"].where(cells["status"] != UNKNOWN, 0),
+    )
+    out = cells.groupby(by, as_index=False)[MEASURES + ["dropouts", "labelled"]].sum()
+    out["dropout_rate"] = out["dropouts"] / out["labelled"].where(out["labelled"] > 0)
+    out["mean_approved_1st"] = out["approved_1st_sum"] / out["students"]
+    out["mean_dropout_probability"] = out["dropout_probability_sum"] / out["scored"].where(out["scored"] > 0)
+    out["predicted_dropout_rate"] = out["predicted_dropouts"] / out["scored"].where(out["scored"] > 0)
+    return out
+
+
+def file_batch_id(path: str) -> str:
+    """Default batch id of a file: its name, size and mtime."""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the cohort aggregate cube.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="add a raw or scored ;-separated CSV to the cube")
+    add.add_argument("input")
+    add.add_argument("--batch-id", help="default: file name, size and mtime")
+    add.add_argument("--cube", default=CUBE_PATH)
+    args = parser.parse_args(argv)
+
+    with CohortCube(args.cube) as cube:
+        batch_id = args.batch_id or file_batch_id(args.input)
+        if cube.add(read_students_compact(args.input), batch_id):
+            print(f"added {args.input} as batch {batch_id} -> {args.cube}")
+        else:
+            print(f"batch {batch_id} is already in {args.cube}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Input and score drift against students_performance.csv.
+
+Every field the model reads and the predicted dropout probability get a
+fixed-size histogram: quantile bins of the reference for numeric fields,
+one bin per code of the field's mapping plus one for unknown codes for
+coded fields, equal-width bins for the probability. All of them live in one
+flat array, so observing a prediction or a scored chunk is one bincount,
+and a DriftMonitor's memory and per-render cost are set by the bin layout,
+never by how many students went through it.
+
+The monitor's counts decay with a half-life in students, so the app and the
+service compare the recent traffic (about half_life / ln 2 students) with
+the reference, not everything since the process started. Per field it
+reports PSI, KS (numeric fields and the score, over the bins) and for
+coded fields the rate of codes that fall back to "Other" (or to no column),
+the folding the notebook applied to the 2000s-era categories. A field is
+flagged once enough students were seen and one of them moves past its
+threshold.
+"""
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from encoder import as_number, code_lookup
+from metrics import DRIFT_ALERT, DRIFT_KS, DRIFT_OTHER_RATE, DRIFT_PSI, DRIFT_ROWS
+from preprocessing import category_dtypes, numeric_columns, read_students_compact
+from train import RANDOM_STATE, TEST_SIZE
+
+DATA_PATH = "students_performance.csv"
+SCORE_FIELD = "Dropout_probability"
+NUMERIC_FIELDS = numeric_columns + ["Age_at_enrollment"]
+NUMERIC_BINS = 20
+SCORE_BINS = 20
+HALF_LIFE = 5_000
+# thresholds: PSI over 0.25 is the usual "major shift"; KS must be both
+# large and significant (alpha 0.001) for the students seen; the fallback
+# rate has to move by 5 points; nothing is flagged before MIN_ROWS students
+PSI_ALERT = 0.25
+KS_ALERT = 0.1
+KS_C_ALPHA = 1.95
+OTHER_RATE_ALERT = 0.05
+MIN_ROWS = 1_000
+_EPS = 1e-4
+
+
+class FieldHistograms:
+    """
+    Histograms of every numeric field, coded field and the score in one flat
+    count array. edges: numeric field -> inner bin edges; codes: coded field
+    -> sorted known codes; fallback: coded field -> codes the encoder folds
+    into "Other" (unknown codes always are).
+    """
+
+    def __init__(self, edges: dict, codes: dict, fallback: dict):
+        self.edges = edges
+        self.codes = codes
+        self.fallback = fallback
+        self.fields = list(edges) + list(codes) + [SCORE_FIELD]
+        sizes = ([NUMERIC_BINS] * len(edges) + [len(c) + 1 for c in codes.values()] + [SCORE_BINS])
+        self.sizes = np.array(sizes, dtype=np.intp)
+        self.starts = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+        self.n_bins = int(self.sizes.sum())
+        self.counts = np.zeros(self.n_bins)
+        self.rows = 0.0
+
+        # numeric edges padded with +inf to NUMERIC_BINS - 1, so every numeric
+        # field is binned by one broadcast comparison
+        self._edges = np.full((len(edges), NUMERIC_BINS - 1), np.inf)
+        for i, field_edges in enumerate(edges.values()):
+            self._edges[i, :len(field_edges)] = field_edges
+        self._numeric_starts = self.starts[:len(edges)]
+        self._codes = {field: np.asarray(c, dtype=np.float64) for field, c in codes.items()}
+        # scalar lookups for one-row observations: plain lists for bisect,
+        # str(code) -> flat bin, looked up with encode_row's code_lookup
+        self._edge_lists = [(field, list(e), start) for (field, e), start in zip(edges.items(), self.starts)]
+        self._code_lists = [
+            (field, {str(code): start + i for i, code in enumerate(c)}, start + len(c))
+            for (field, c), start in zip(codes.items(), self.starts[len(edges):])
+        ]
+        self._fallback_bins = np.zeros(self.n_bins, dtype=bool)
+        for field, start in zip(codes, self.starts[len(edges):]):
+            known = list(codes[field])
+            for code in fallback[field]:
+                self._fallback_bins[start + known.index(code)] = True
+            self._fallback_bins[start + len(known)] = True
+
+    @classmethod
+    def from_reference(cls, df: pd.DataFrame, encoder) -> "FieldHistograms":
+        """Empty histograms with quantile bins of df's numeric fields and the encoder's fallback codes."""
+        quantiles = np.linspace(0, 1, NUMERIC_BINS + 1)[1:-1]
+        edges = {
+            field: np.unique(np.nanquantile(df[field].to_numpy(dtype=np.float64), quantiles))
+            for field in NUMERIC_FIELDS
+        }
+        codes = {field: list(dtype.categories) for field, dtype in category_dtypes.items()}
+        fallback = {
+            field: [code for code in codes[field]
+                    if encoder.code_offsets[field][str(code)] == encoder.default_offsets[field]]
+            for field in codes
+        }
+        return cls(edges, codes, fallback)
+
+    def empty_like(self) -> "FieldHistograms":
+        return FieldHistograms(self.edges, self.codes, self.fallback)
+
+    def _code_bins(self, field: str, values) -> np.ndarray:
+        known = self._codes[field]
+        if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+            # bin each category once; per-row code -1 (missing) -> unknown
+            per_category = self._code_bins(field, values.cat.categories)
+            return np.append(per_category, len(known))[values.cat.codes.to_numpy()]
+        codes = pd.to_numeric(np.asarray(values), errors="coerce").astype(np.float64)
+        pos = np.minimum(np.searchsorted(known, codes), len(known) - 1)
+        return np.where(known[pos] == codes, pos, len(known))
+
+    def bin_indices(self, columns=None, proba=None) -> np.ndarray:
+        """
+        Flat bin of every value: columns is a DataFrame (or a mapping of
+        field -> values) of raw students, proba their dropout probabilities;
+        either may be None. Missing numeric values are left out.
+        """
+        parts = []
+        if columns is not None:
+            values = np.column_stack([np.asarray(columns[f], dtype=np.float64) for f in self.edges])
+            bins = (values[:, :, None] >= self._edges).sum(axis=2) + self._numeric_starts
+            parts.append(bins[~np.isnan(values)])
+            for field, start in zip(self.codes, self.starts[len(self.edges):]):
+                parts.append(self._code_bins(field, columns[field]) + start)
+        if proba is not None:
+            proba = np.asarray(proba, dtype=np.float64)
+            parts.append(np.clip((proba * SCORE_BINS).astype(np.intp), 0, SCORE_BINS - 1) + self.starts[-1])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def row_bins(self, row: dict, probability: float) -> list:
+        """bin_indices for one raw row dict and its probability, without building arrays."""
+        bins = []
+        for field, edges, start in self._edge_lists:
+            value = as_number(row[field])
+            if value == value:
+                bins.append(start + bisect.bisect_right(edges, value))
+        bins += [code_lookup(lookup, row[field], unknown) for field, lookup, unknown in self._code_lists]
+        bins.append(self.starts[-1] + min(max(int(probability * SCORE_BINS), 0), SCORE_BINS - 1))
+        return bins
+
+    def add(self, columns=None, proba=None, decay: float = 1.0) -> None:
+        """Count one batch after scaling the counts so far by decay."""
+        n = len(proba) if proba is not None else len(columns[self.fields[0]])
+        self.add_counts(np.bincount(self.bin_indices(columns, proba), minlength=self.n_bins), n, decay)
+
+    def add_counts(self, counts: np.ndarray, n: int, decay: float = 1.0) -> None:
+        self.counts *= decay
+        self.counts += counts
+        self.rows = self.rows * decay + n
+
+    def proportions(self) -> tuple:
+        """(per-bin share of its field, per-field totals)."""
+        totals = np.add.reduceat(self.counts, self.starts)
+        per_bin = np.repeat(totals, self.sizes)
+        return np.divide(self.counts, per_bin, out=np.zeros_like(self.counts), where=per_bin > 0), totals
+
+
+def build_reference(encoder, predict_proba, class_index: int, path: str = DATA_PATH) -> FieldHistograms:
+    """
+    Reference histograms: every student of path for the fields, and the
+    scores of the notebook's held-out 20% (the training rows score far more
+    confidently than new students would) for the probability.
+    """
+    df = read_students_compact(path)
+    reference = FieldHistograms.from_reference(df, encoder)
+    reference.add(df)
+    _, test_index = train_test_split(df.index, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    held_out = df.loc[test_index]
+    reference.add(proba=predict_proba(encoder.encode_batch(held_out))[:, class_index])
+    return reference
+
+
+class DriftMonitor:
+    """
+    Live histograms against a reference. observe/observe_row/observe_scored
+    are thread-safe; statistics() is recomputed only after new observations.
+    half_life=None keeps plain counts (a batch report over a whole file).
+    """
+
+    def __init__(self, reference: FieldHistograms, half_life: float = HALF_LIFE):
+        self.reference = reference
+        self.live = reference.empty_like()
+        self.half_life = half_life
+        self.observed = 0
+        self._ref_p, self._ref_totals = reference.proportions()
+        self._numeric_or_score = np.zeros(len(reference.fields), dtype=bool)
+        self._numeric_or_score[:len(reference.edges)] = True
+        self._numeric_or_score[-1] = True
+        self._coded = slice(len(reference.edges), len(reference.fields) - 1)
+        self._ref_other = self._other_rate(self._ref_p)
+        self._stats = None
+        self._stats_at = -1
+        self._lock = threading.Lock()
+
+    def observe(self, columns=None, proba=None) -> None:
+        """Count a batch of raw students (DataFrame or field -> values) and/or their dropout probabilities."""
+        # binned outside the lock; only the counts update is serialized
+        counts = np.bincount(self.live.bin_indices(columns, proba), minlength=self.live.n_bins)
+        n = len(proba) if proba is not None else len(columns[self.live.fields[0]])
+        decay = 1.0 if self.half_life is None else 0.5 ** (n / self.half_life)
+        with self._lock:
+            self.live.add_counts(counts, n, decay)
+            self.observed += n
+
+    def observe_row(self, row: dict, probability: float) -> None:
+        """One student as a raw row dict (the app's form, the service's JSON)."""
+        bins = self.live.row_bins(row, probability)
+        decay = 1.0 if self.half_life is None else 0.5 ** (1 / self.half_life)
+        with self._lock:
+            self.live.counts *= decay
+            # one bin per field, so no bin repeats
+            self.live.counts[bins] += 1
+            self.live.rows = self.live.rows * decay + 1
+            self.observed += 1
+
+    def observe_scored(self, scored: pd.DataFrame) -> None:
+        """A scored chunk from batch.py (raw columns plus Dropout_probability); fits on_chunk."""
+        self.observe(scored, scored[SCORE_FIELD].to_numpy())
+
+    def _other_rate(self, p: np.ndarray) -> np.ndarray:
+        other = np.add.reduceat(np.where(self.live._fallback_bins, p, 0), self.live.starts)
+        return other[self._coded]
+
+    def statistics(self) -> pd.DataFrame:
+        """
+        One row per field: students counted (decayed), psi, ks (numeric fields
+        and the score), other_rate and reference_other_rate (coded fields),
+        and flagged, a comma-separated list of what moved past its threshold.
+        """
+        with self._lock:
+            if self._stats_at == self.observed:
+                return self._stats
+            observed = self.observed
+            p, totals = self.live.proportions()
+            rows = self.live.rows
+
+        q, m = self._ref_p, self._ref_totals
+        starts = self.live.starts
+        pc, qc = np.clip(p, _EPS, None), np.clip(q, _EPS, None)
+        psi = np.add.reduceat((pc - qc) * np.log(pc / qc), starts)
+        cdf_gap = np.abs(self._field_cumsum(p) - self._field_cumsum(q))
+        ks = np.where(self._numeric_or_score, np.maximum.reduceat(cdf_gap, starts), np.nan)
+        other = np.full(len(starts), np.nan)
+        other[self._coded] = self._other_rate(p)
+        ref_other = np.full(len(starts), np.nan)
+        ref_other[self._coded] = self._ref_other
+
+        empty = totals == 0
+        psi[empty] = ks[empty] = other[empty] = np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ks_critical = KS_C_ALPHA * np.sqrt((totals + m) / (totals * m))
+        flags = []
+        for i in range(len(starts)):
+            reasons = []
+            if rows >= MIN_ROWS and not empty[i]:
+                if psi[i] >= PSI_ALERT:
+                    reasons.append("psi")
+                if ks[i] >= KS_ALERT and ks[i] > ks_critical[i]:
+                    reasons.append("ks")
+                if abs(other[i] - ref_other[i]) >= OTHER_RATE_ALERT:
+                    reasons.append("other")
+            flags.append(", ".join(reasons))
+
+        stats = pd.DataFrame({
+            "field": self.live.fields, "students": totals, "psi": psi, "ks": ks,
+            "other_rate": other, "reference_other_rate": ref_other, "flagged": flags,
+        })
+        with self._lock:
+            self._stats, self._stats_at = stats, observed
+        return stats
+
+    def _field_cumsum(self, p: np.ndarray) -> np.ndarray:
+        # running share within each field: cumsum over the flat array minus
+        # what the fields before it added up to
+        cumulative = np.cumsum(p)
+        before = np.repeat(cumulative[self.live.starts] - p[self.live.starts], self.live.sizes)
+        return cumulative - before
+
+    def flagged(self) -> pd.DataFrame:
+        stats = self.statistics()
+        return stats[stats["flagged"] != ""]
+
+    def bind(self) -> None:
+        """Make the drift gauges read this monitor (the latest bound one wins)."""
+        DRIFT_ROWS.set_function(lambda: self.live.rows)
+        for i, field in enumerate(self.live.fields):
+            DRIFT_PSI.labels(field).set_function(lambda i=i: self.statistics()["psi"].iat[i])
+            DRIFT_ALERT.labels(field).set_function(lambda i=i: float(self.statistics()["flagged"].iat[i] != ""))
+            if self._numeric_or_score[i]:
+                DRIFT_KS.labels(field).set_function(lambda i=i: self.statistics()["ks"].iat[i])
+            else:
+                DRIFT_OTHER_RATE.labels(field).set_function(lambda i=i: self.statistics()["other_rate"].iat[i])
+
+
+def format_report(stats: pd.DataFrame) -> str:
+    """Flagged fields first, then by PSI: one line per field for the CLI."""
+    order = stats.assign(_flagged=stats["flagged"] != "").sort_values(["_flagged", "psi"], ascending=False)
+    lines = [f"{'field':<46}{'psi':>8}{'ks':>8}{'other':>8}{'ref':>8}  flagged"]
+    for row in order.itertuples():
+        cells = [f"{v:>8.3f}" if not np.isnan(v) else f"{'-':>8}"
+                 for v in (row.psi, row.ks, row.other_rate, row.reference_other_rate)]
+        lines.append(f"{row.field:<46}{''.join(cells)}  {row.flagged}")
+    return "\n".join(lines)
@@ -0,0 +1,230 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import (
+    age_bins, age_labels, category_mappings, encode_frame, numeric_columns,
+    read_students_csv
+)
+from schema import FeatureSchema
+
+
+def as_number(value) -> float:
+    """float(value) for a raw number or numeric string; NaN for None or anything non-numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def code_lookup(table: dict, code, default):
+    """
+    table[str(code)] for a raw code given as an int, a string or an integral
+    float (1, "1", 1.0 and "1.0" are all code 1, as pd.to_numeric reads them
+    in encode_batch); default when it is not a known code.
+    """
+    found = table.get(str(code))
+    if found is not None:
+        return found
+    number = as_number(code)
+    return table.get(str(int(number)), default) if number.is_integer() else default
+
+
+class FeatureEncoder:
+    """
+    One-hot encoder compiled once from model_columns and the code mappings.
+
+    The column layout comes from a FeatureSchema derived from model_columns,
+    and every (field, code) pair is resolved ahead of time to its column
+    offset in it (codes whose label has no dummy column fall back to the
+    field's "Other" column, or to no column at all when the field has none),
+    so encoding is a handful of array writes instead of
+    DataFrame -> get_dummies -> reindex.
+
+    Output is float32: the forest casts its input to float32 before
+    traversing the trees, so this is exactly what the model sees.
+    """
+
+    def __init__(self, model_columns, mappings=None):
+        mappings = category_mappings if mappings is None else mappings
+        self.schema = FeatureSchema(
+            model_columns, list(mappings) + ["AgeGroup"], numeric_columns
+        )
+        self.model_columns = self.schema.columns
+        self.n_features = self.schema.n_features
+
+        self.numeric_fields = list(self.schema.numeric)
+        self.numeric_offsets = self.schema.numeric_offsets
+
+        # field -> {code: offset}, field -> dense lookup table over integer codes
+        self.code_offsets = {}
+        self.default_offsets = {}
+        self.lookup_tables = {}
+        for field, mapping in mappings.items():
+            default = self.schema.other_offset(field)
+            offsets = {
+                code: self.schema.offset(field, label, default) for code, label in mapping.items()
+            }
+            lut = np.full(max(int(code) for code in mapping) + 1, default, dtype=np.intp)
+            for code, offset in offsets.items():
+                lut[int(code)] = offset
+            self.code_offsets[field] = offsets
+            self.default_offsets[field] = default
+            self.lookup_tables[field] = lut
+
+        self.age_bins = np.asarray(age_bins, dtype=np.float64)
+        self.age_offsets = np.array(
+            [self.schema.offset("AgeGroup", label) for label in age_labels], dtype=np.intp
+        )
+
+        self._local = threading.local()
+
+    def _row_buffer(self) -> np.ndarray:
+        # one preallocated row per thread: Streamlit serves sessions from threads
+        buf = getattr(self._local, "row", None)
+        if buf is None:
+            buf = self._local.row = np.zeros((1, self.n_features), dtype=np.float32)
+        return buf
+
+    def _age_offset(self, age) -> int:
+        age = as_number(age)
+        if age != age:
+            return -1
+        # pd.cut(..., right=False): bins[i] <= age < bins[i + 1]
+        pos = int(np.searchsorted(self.age_bins, age, side="right")) - 1
+        if 0 <= pos < len(self.age_offsets):
+            return int(self.age_offsets[pos])
+        return -1
+
+    def encode_row(self, raw) -> np.ndarray:
+        """
+        Encode one student given as a mapping of raw CSV column -> value
+        (codes may be int, str or integral float). Returns a (1, n_features) view of a reused
+        per-thread buffer: consume or copy it before the next encode_row call.
+        """
+        row = self._row_buffer()
+        row.fill(0)
+        out = row[0]
+
+        for field, offset in zip(self.numeric_fields, self.numeric_offsets):
+            out[offset] = raw[field]
+
+        for field, offsets in self.code_offsets.items():
+            offset = code_lookup(offsets, raw[field], self.default_offsets[field])
+            if offset >= 0:
+                out[offset] = 1
+
+        offset = self._age_offset(raw["Age_at_enrollment"])
+        if offset >= 0:
+            out[offset] = 1
+        return row
+
+    def _batch_offsets(self, field, values: pd.Series) -> np.ndarray:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # resolve each category once; per-row category code -1 (missing) -> default
+            per_category = self._batch_offsets(field, pd.Series(values.cat.categories))
+            lut = np.append(per_category, self.default_offsets[field])
+            return lut[values.cat.codes.to_numpy()]
+        codes = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+        lut = self.lookup_tables[field]
+        valid = (codes >= 0) & (codes < len(lut)) & (codes == np.floor(codes))
+        offsets = np.full(len(codes), self.default_offsets[field], dtype=np.intp)
+        offsets[valid] = lut[codes[valid].astype(np.intp)]
+        return offsets
+
+    def encode_batch(self, df: pd.DataFrame, out: np.ndarray = None) -> np.ndarray:
+        """
+        Encode every row of a raw frame into a (len(df), n_features) float32
+        array by scattering ones at precomputed offsets. Pass out to reuse a
+        preallocated array of that shape.
+        """
+        n = len(df)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=np.float32)
+        else:
+            out.fill(0)
+        rows = np.arange(n)
+
+        out[:, self.numeric_offsets] = df[self.numeric_fields].to_numpy(dtype=np.float32)
+
+        for field in self.code_offsets:
+            offsets = self._batch_offsets(field, df[field])
+            hit = offsets >= 0
+            out[rows[hit], offsets[hit]] = 1
+
+        age = df["Age_at_enrollment"].to_numpy(dtype=np.float64)
+        pos = np.searchsorted(self.age_bins, age, side="right") - 1
+        valid = (pos >= 0) & (pos < len(self.age_offsets))
+        offsets = np.full(n, -1, dtype=np.intp)
+        offsets[valid] = self.age_offsets[pos[valid]]
+        hit = offsets >= 0
+        out[rows[hit], offsets[hit]] = 1
+        return out
+
+
+def check_parity(df: pd.DataFrame, model_columns) -> dict:
+    """
+    Compare FeatureEncoder against the pandas path (encode_frame) on every
+    row of df, both row by row and as one batch, and row by row again with
+    every code as a float and the age as a string (as JSON clients and
+    float frames send them).
+    Returns mismatch counts and timings; all counts are 0 when the encoders
+    agree.
+    """
+    encoder = FeatureEncoder(model_columns)
+
+    t0 = time.perf_counter()
+    expected = encode_frame(df, model_columns).to_numpy(dtype=np.float32)
+    pandas_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = encoder.encode_batch(df)
+    batch_seconds = time.perf_counter() - t0
+
+    records = df.to_dict("records")
+    row_mismatches = 0
+    t0 = time.perf_counter()
+    for i, raw in enumerate(records):
+        if not np.array_equal(encoder.encode_row(raw)[0], expected[i]):
+            row_mismatches += 1
+    row_seconds = time.perf_counter() - t0
+
+    float_records = (df.astype({field: "float64" for field in category_mappings})
+                     .astype({"Age_at_enrollment": str}).to_dict("records"))
+    float_row_mismatches = sum(
+        not np.array_equal(encoder.encode_row(raw)[0], expected[i]) for i, raw in enumerate(float_records)
+    )
+
+    return {
+        "rows": len(df),
+        "batch_mismatches": int((batch != expected).any(axis=1).sum()),
+        "row_mismatches": row_mismatches,
+        "float_row_mismatches": float_row_mismatches,
+        "pandas_batch_seconds": pandas_seconds,
+        "encoder_batch_seconds": batch_seconds,
+        "encoder_row_us": row_seconds / max(len(df), 1) * 1e6,
+    }
+
+
+def main(argv=None):
+    import joblib
+
+    parser = argparse.ArgumentParser(
+        description="Check FeatureEncoder against the pandas encoding path on every row of a CSV."
+    )
+    parser.add_argument("input", nargs="?", default="students_performance.csv")
+    parser.add_argument("--columns", default="model_columns.pkl")
+    args = parser.parse_args(argv)
+
+    result = check_parity(read_students_csv(args.input), joblib.load(args.columns))
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    if result["batch_mismatches"] or result["row_mismatches"] or result["float_row_mismatches"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import numpy as np
+
+# sklearn marks leaves with children_left == children_right == -1
+TREE_LEAF = -1
+# from this many rows on, apply routes the batch one tree at a time
+BY_TREE_ROWS = 2048
+# steps between dropping finished rows in a one-tree-at-a-time traversal
+COMPACT_EVERY = 8
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """
+    The largest float32 <= each threshold: for float32 x, x <= threshold
+    exactly when x <= _float32_floor(threshold), so the comparison can stay
+    in float32.
+    """
+    floor = threshold.astype(np.float32)
+    over = floor > threshold
+    floor[over] = np.nextafter(floor[over], np.float32(-np.inf))
+    return floor
+
+
+class ForestEngine:
+    """
+    Array-backed inference for a fitted RandomForestClassifier.
+
+    The node arrays of every tree (feature, threshold, children_left,
+    children_right, missing_go_to_left, value) are concatenated once into
+    flat NumPy arrays with global node ids, and rows are routed through all
+    trees at once with vectorized traversal (large batches one tree at a
+    time, which keeps the working arrays small). There is no per-call input
+    validation or joblib dispatch, which dominates sklearn's cost for small
+    batches.
+
+    predict_proba reproduces RandomForestClassifier.predict_proba bit for
+    bit: X is cast to float32 like sklearn does, per-leaf class fractions are
+    normalized the same way as DecisionTreeClassifier.predict_proba, and the
+    per-tree probabilities are summed in estimator order before dividing by
+    the number of trees.
+
+    A compressed forest (see compress.py) may store value as integers;
+    value * value_scale are then the class fractions.
+    """
+
+    # node arrays, in the order they are stored in a model artifact
+    array_names = ("feature", "threshold", "children", "missing_go_to_left", "value", "roots", "classes")
+
+    def __init__(self, feature, threshold, children, missing_go_to_left, value, roots, classes,
+                 value_scale: float = 1.0):
+        # arrays are only read, never written, so they can be memory-mapped
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.value_scale = value_scale
+        self.n_trees = len(roots)
+        self.n_classes = value.shape[1]
+        self.is_leaf = children[:, 0] == np.arange(len(children))
+        # children of node i at 2*i (left) and 2*i + 1 (right)
+        self._children = children.reshape(-1)
+        # private to each process, unlike the (possibly memory-mapped) node arrays
+        self._threshold32 = _float32_floor(threshold)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "ForestEngine":
+        """Flatten the trees of a fitted RandomForestClassifier."""
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            ids = np.arange(offset, offset + n)
+            leaf = tree.children_left == TREE_LEAF
+
+            # leaves point to themselves so a finished row just stays put
+            lefts.append(np.where(leaf, ids, tree.children_left + offset))
+            rights.append(np.where(leaf, ids, tree.children_right + offset))
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            missing.append(np.asarray(
+                getattr(tree, "missing_go_to_left", np.zeros(n, dtype=np.uint8)), dtype=bool
+            ))
+
+            # same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).astype(np.intp),
+            missing_go_to_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+        )
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def children_left(self) -> np.ndarray:
+        return self.children[:, 0]
+
+    @property
+    def children_right(self) -> np.ndarray:
+        return self.children[:, 1]
+
+    def arrays(self) -> dict:
+        """Node arrays by name, as passed to the constructor."""
+        return {name: getattr(self, "classes_" if name == "classes" else name)
+                for name in self.array_names}
+
+    def _traverse(self, X: np.ndarray, visit=None) -> np.ndarray:
+        """
+        Route every (tree, row) pair to its leaf. Pairs are numbered
+        tree * n_rows + row. If given, visit(pairs, parents, children) is
+        called after every step with the pairs that moved and their nodes
+        before and after the step.
+        """
+        n, n_features = X.shape
+        flat = X.ravel()
+        has_nan = bool(np.isnan(flat).any())
+
+        node = np.repeat(self.roots, n)
+        base = np.tile(np.arange(n) * n_features, self.n_trees)
+
+        # only (tree, row) pairs that have not reached a leaf are advanced;
+        # a pair is written back to node when it lands on its leaf
+        active = np.flatnonzero(~self.is_leaf[node])
+        current, base = node[active], base[active]
+        while active.size:
+            x = flat[base + self.feature[current]]
+            go_right = ~(x <= self.threshold[current])
+            if has_nan:
+                go_right &= ~(np.isnan(x) & self.missing_go_to_left[current])
+            parent, current = current, self._children[2 * current + go_right]
+            if visit is not None:
+                visit(active, parent, current)
+
+            done = self.is_leaf[current]
+            if done.any():
+                node[active[done]] = current[done]
+                keep = ~done
+                active, current, base = active[keep], current[keep], base[keep]
+        return node
+
+    def _traverse_by_tree(self, X: np.ndarray) -> np.ndarray:
+        """
+        _traverse without visit, one tree at a time: every step works on at
+        most n_rows pairs, compares in float32, and leaves (which point to
+        themselves) are only checked for every COMPACT_EVERY steps.
+        """
+        n, n_features = X.shape
+        flat = X.ravel()
+        has_nan = bool(np.isnan(flat).any())
+        leaves = np.empty((self.n_trees, n), dtype=np.intp)
+        rows = np.arange(n) * n_features
+        for tree, root in enumerate(self.roots):
+            node = leaves[tree]
+            active, current, base = np.arange(n), np.full(n, root, dtype=np.intp), rows
+            step = 0
+            while active.size:
+                x = flat[base + self.feature[current]]
+                go_right = x > self._threshold32[current]
+                if has_nan:
+                    go_right |= np.isnan(x) & ~self.missing_go_to_left[current]
+                current = self._children[2 * current + go_right]
+                step += 1
+                if step % COMPACT_EVERY == 0:
+                    done = self.is_leaf[current]
+                    node[active[done]] = current[done]
+                    keep = ~done
+                    active, current, base = active[keep], current[keep], base[keep]
+        return leaves
+
+    def apply(self, X) -> np.ndarray:
+        """Global leaf id reached by every row in every tree, shape (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] >= BY_TREE_ROWS:
+            return self._traverse_by_tree(X)
+        return self._traverse(X).reshape(self.n_trees, X.shape[0])
+
+    def contributions(self, X, class_index: int = -1):
+        """
+        Saabas-style attribution of the class_index probability.
+
+        Walking each tree from root to leaf, the change in the node's class
+        fraction at every split is credited to the split feature; averaging
+        over trees gives (bias, contributions) with
+        bias + contributions[i].sum() == predict_proba(X)[i, class_index]
+        up to float rounding. contributions has shape (n_rows, n_features).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        node_value = self.value[:, class_index] * self.value_scale
+        contrib = np.zeros(n * n_features, dtype=np.float64)
+
+        def visit(pairs, parents, children):
+            # one bincount per depth level instead of a Python loop over paths
+            cells = (pairs % n) * n_features + self.feature[parents]
+            delta = node_value[children] - node_value[parents]
+            np.add(contrib, np.bincount(cells, weights=delta, minlength=contrib.size), out=contrib)
+
+        self._traverse(X, visit)
+        bias = float(node_value[self.roots].mean())
+        return bias, contrib.reshape(n, n_features) / self.n_trees
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[1], self.n_classes), dtype=np.float64)
+        for tree_leaves in leaves:
+            proba += self.value[tree_leaves]
+        if self.value_scale != 1.0:
+            proba *= self.value_scale
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from engine import ForestEngine
+from schema import FeatureSchema
+
+
+class Explainer:
+    """
+    Per-prediction explanations aggregated back to the original fields.
+
+    ForestEngine.contributions credits the dropout probability to the ~90
+    encoded columns; numeric columns are fields on their own and every
+    one-hot group (e.g. all Course_* dummies) is summed into its field, so
+    an explanation reads "Course", "Debtor", "AgeGroup", ...
+    """
+
+    def __init__(self, engine: ForestEngine, schema: FeatureSchema):
+        self.engine = engine
+        self.class_index = list(engine.classes_).index(1)
+        self.fields = list(schema.numeric) + list(schema.groups)
+
+        # (n_features, n_fields) 0/1 matrix: contributions @ aggregate -> per field
+        self.aggregate = np.zeros((schema.n_features, len(self.fields)))
+        for j, field in enumerate(self.fields):
+            if field in schema.numeric:
+                self.aggregate[schema.numeric[field], j] = 1
+            else:
+                self.aggregate[schema.group_offsets[field], j] = 1
+
+    def explain(self, X):
+        """
+        Returns (proba, bias, contributions) where proba is the dropout
+        probability of each row, bias the forest's base rate and
+        contributions a DataFrame with one column per field, so that
+        bias + contributions.sum(axis=1) == proba.
+        """
+        bias, contrib = self.engine.contributions(X, self.class_index)
+        by_field = pd.DataFrame(contrib @ self.aggregate, columns=self.fields)
+        proba = bias + contrib.sum(axis=1)
+        return proba, bias, by_field
+
+
+def top_reasons(contributions: pd.DataFrame, k: int = 3) -> pd.DataFrame:
+    """
+    The k fields that push each row's dropout probability up the most,
+    as Reason_1..k columns of "field (+0.12)" strings.
+    """
+    values = contributions.to_numpy()
+    order = np.argsort(-values, axis=1)[:, :k]
+    fields = np.asarray(contributions.columns)
+    out = {}
+    for r in range(order.shape[1]):
+        idx = order[:, r]
+        picked = values[np.arange(len(values)), idx]
+        out[f"Reason_{r + 1}"] = [f"{f} ({v:+.2f})" for f, v in zip(fields[idx], picked)]
+    return pd.DataFrame(out, index=contributions.index)
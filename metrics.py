@@ -0,0 +1,290 @@
+"""
+In-process predictor metrics in the Prometheus text exposition format.
+
+Counters, gauges and fixed-bucket histograms, thread-safe and about a
+microsecond per update, so they stay on under load. service.py serves
+REGISTRY.render() on GET /metrics; the Streamlit app, which cannot add
+an endpoint, can write it to a file for node_exporter's textfile
+collector with write_textfile(), when PREDICTOR_METRICS_TEXTFILE asks it
+to (see textfile_path).
+"""
+import bisect
+import os
+import resource
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# the app's textfile export is opt-in: PREDICTOR_METRICS_TEXTFILE names the
+# file, or is "1" for METRICS_PATH (outside the repo). Give every server
+# process its own path: processes sharing one file overwrite each other
+TEXTFILE_ENV = "PREDICTOR_METRICS_TEXTFILE"
+METRICS_PATH = os.path.join(tempfile.gettempdir(), "predictor_metrics.prom")
+# seconds: single-row stages sit around 0.02-2 ms, batches and model loads go up to seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The child for one combination of label values, created on first use."""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, self.labelnames, values)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def set_function(self, function) -> None:
+        """Read the value from function() at render time instead (e.g. a cache's hit count)."""
+        self.function = function
+
+    def get(self) -> float:
+        return float(self.function()) if self.function is not None else self.value
+
+    def samples(self, name, labelnames, values):
+        yield name, _format_labels(labelnames, values), self.get()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def set_function(self, function) -> None:
+        self._default.set_function(function)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+    def samples(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield f"{name}_bucket", _format_labels(labelnames, values, [("le", _format_value(bound))]), cumulative
+        yield f"{name}_sum", _format_labels(labelnames, values), total
+        yield f"{name}_count", _format_labels(labelnames, values), cumulative
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+def write_textfile(path: str = METRICS_PATH, registry: "Registry" = None) -> None:
+    """Write the registry to path atomically (the textfile collector may read it at any time)."""
+    registry = registry or REGISTRY
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        f.write(registry.render())
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def textfile_path(environ=os.environ):
+    """Where the app should write its metrics textfile, or None (the default) for nowhere."""
+    value = environ.get(TEXTFILE_ENV, "")
+    if not value:
+        return None
+    return METRICS_PATH if value == "1" else value
+
+
+def resident_memory_bytes() -> float:
+    """Current RSS from /proc, or the peak RSS where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# PREDICTOR METRICS
+# one registry per process: Streamlit sessions and the service's handlers share it
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "predictor_stage_seconds", "Time spent per prediction stage (load, encode, predict).", ["stage"]
+)
+PREDICTIONS = REGISTRY.counter("predictor_predictions_total", "Students scored.")
+OTHER_FALLBACKS = REGISTRY.counter(
+    "predictor_other_fallbacks_total",
+    "Scored students whose code for a field fell back to Other (or to no column).", ["field"]
+)
+MISSING_FIELD_REJECTIONS = REGISTRY.counter(
+    "predictor_missing_field_rejections_total", "Prediction requests rejected for missing fields."
+)
+CACHE_HITS = REGISTRY.counter("predictor_cache_hits_total", "Prediction cache hits.")
+CACHE_MISSES = REGISTRY.counter("predictor_cache_misses_total", "Prediction cache misses.")
+MODEL_LOAD_SECONDS = REGISTRY.gauge("predictor_model_load_seconds", "Time the current model took to load.")
+MODEL_INFO = REGISTRY.gauge("predictor_model_info", "1 for the model version being served.", ["version"])
+MODEL_RELOADS = REGISTRY.counter(
+    "predictor_model_reloads_total", "Registry reloads by result (ok, or error: old model kept).", ["result"]
+)
+DRIFT_ROWS = REGISTRY.gauge("predictor_drift_students", "Students in the drift window (decayed count).")
+DRIFT_PSI = REGISTRY.gauge(
+    "predictor_drift_psi", "Population stability index of a field (or the score) vs the reference.", ["field"]
+)
+DRIFT_KS = REGISTRY.gauge(
+    "predictor_drift_ks", "Binned KS distance of a numeric field (or the score) vs the reference.", ["field"]
+)
+DRIFT_OTHER_RATE = REGISTRY.gauge(
+    "predictor_drift_other_rate", "Share of recent students whose code for a field falls back to Other.", ["field"]
+)
+DRIFT_ALERT = REGISTRY.gauge("predictor_drift_alert", "1 while a field's drift is past a threshold.", ["field"])
+RESIDENT_MEMORY = REGISTRY.gauge("process_resident_memory_bytes", "Resident memory of the process.")
+RESIDENT_MEMORY.set_function(resident_memory_bytes)
+
+
+def watch_cache(cache) -> None:
+    """Report the hit/miss counts of a PredictionCache."""
+    CACHE_HITS.set_function(lambda: cache.hits)
+    CACHE_MISSES.set_function(lambda: cache.misses)
+
+
+class PredictionRecorder:
+    """
+    Counts scored batches and their per-field Other fallbacks for one
+    FeatureSchema. Fallbacks are summed into an array and read by the
+    counters at render time, so recording a batch is one matmul and an add.
+    """
+
+    def __init__(self, schema, bind: bool = True):
+        self.schema = schema
+        self.fallbacks = np.zeros(len(schema.groups), dtype=np.int64)
+        self._lock = threading.Lock()
+        if bind:
+            self.bind()
+
+    def bind(self) -> None:
+        """Make the fallback counters read this recorder (the latest bound one wins)."""
+        for j, field in enumerate(self.schema.groups):
+            OTHER_FALLBACKS.labels(field).set_function(lambda j=j: self.fallbacks[j])
+
+    def record(self, X: np.ndarray) -> None:
+        counts = self.schema.fallback_counts(X)
+        with self._lock:
+            self.fallbacks += counts
+        PREDICTIONS.inc(len(X))
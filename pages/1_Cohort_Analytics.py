@@ -0,0 +1,100 @@
+import os
+import time
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from cube import CUBE_PATH, DIMENSIONS, CohortCube, rollup
+
+# STREAMLIT LAYOUT
+st.set_page_config(page_title="📊 Cohort Analytics", layout="wide")
+
+# LOAD CUBE
+# the cube is a few hundred cells; mtime keys the cache so a batch added by
+# batch.py --cube / cube.py add shows up on the next rerun
+@st.cache_data(max_entries=1)
+def load_cube(path, mtime_ns):
+    with CohortCube(path) as cube:
+        return cube.frame(), cube.batches()
+
+
+st.title("📊 Cohort Analytics")
+
+if not os.path.exists(CUBE_PATH):
+    st.info("No cohort cube yet. Build it with  \n"
+            "`python cube.py add students_performance.csv`  \n"
+            "and add scored batches with `python batch.py <export.csv> --cube cohort_cube.sqlite`.")
+    st.stop()
+
+cells, batches = load_cube(CUBE_PATH, os.stat(CUBE_PATH).st_mtime_ns)
+
+# FILTERS
+st.sidebar.header("Slice")
+where = {}
+for dim in DIMENSIONS:
+    where[dim] = st.sidebar.multiselect(dim.replace("_", " ").capitalize(), sorted(cells[dim].unique()))
+
+t0 = time.perf_counter()
+by_tuition = rollup(cells, "tuition", where)
+by_status = rollup(
+    cells.assign(status_group=cells["status"].replace({"Graduate": "Not_Dropout", "Enrolled": "Not_Dropout"})),
+    "status_group", where,
+)
+by_age = rollup(cells, "age_group", where)
+by_scholarship = rollup(cells, "scholarship", where)
+query_ms = (time.perf_counter() - t0) * 1e3
+
+total = rollup(cells.assign(all="all"), "all", where)
+col1, col2, col3 = st.columns(3)
+col1.metric("Students", f"{int(total['students'].sum()):,}")
+col2.metric("Dropout rate", "–" if total.empty or pd.isna(total["dropout_rate"].iloc[0])
+            else f"{total['dropout_rate'].iloc[0]:.1%}")
+col3.metric("Mean predicted dropout probability",
+            "–" if total.empty or pd.isna(total["mean_dropout_probability"].iloc[0])
+            else f"{total['mean_dropout_probability'].iloc[0]:.1%}")
+
+
+def rate_chart(frame, dim, measure="dropout_rate", title=""):
+    return (
+        alt.Chart(frame)
+        .mark_bar()
+        .encode(
+            x=alt.X(f"{dim}:N", title=None, sort="-y"),
+            y=alt.Y(f"{measure}:Q", title=title, axis=alt.Axis(format="%" if "rate" in measure else "")),
+            tooltip=[dim, "students", alt.Tooltip(f"{measure}:Q", format=".3f")],
+        )
+        .properties(height=260)
+    )
+
+
+# DASHBOARD METRICS
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("Dropout rate by tuition status")
+    st.altair_chart(rate_chart(by_tuition, "tuition", title="Dropout rate"), use_container_width=True)
+with col2:
+    st.subheader("1st-semester approved units by status")
+    st.altair_chart(rate_chart(by_status, "status_group", "mean_approved_1st", "Mean approved units"),
+                    use_container_width=True)
+
+col3, col4 = st.columns(2)
+with col3:
+    st.subheader("Dropout rate by age group")
+    st.altair_chart(rate_chart(by_age, "age_group", title="Dropout rate"), use_container_width=True)
+with col4:
+    st.subheader("Dropout rate by scholarship")
+    st.altair_chart(rate_chart(by_scholarship, "scholarship", title="Dropout rate"), use_container_width=True)
+
+# FREE SLICE
+st.header("Custom slice")
+group_by = st.multiselect("Group by", DIMENSIONS, default=["course"])
+if group_by:
+    table = rollup(cells, group_by, where)
+    st.dataframe(
+        table[group_by + ["students", "dropout_rate", "mean_approved_1st",
+                          "mean_dropout_probability", "predicted_dropout_rate"]],
+        use_container_width=True, hide_index=True,
+    )
+
+st.caption(f"Answered from {len(cells)} cube cells in {query_ms:.1f} ms · {len(batches)} batches added")
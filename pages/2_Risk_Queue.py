@@ -0,0 +1,61 @@
+import math
+import os
+import time
+
+import streamlit as st
+
+from ranking import PAGE_SIZE, QUEUE_PATH, RiskQueue
+
+# STREAMLIT LAYOUT
+st.set_page_config(page_title="🚨 Risk Queue", layout="wide")
+
+st.title("🚨 Intervention Queue")
+
+if not os.path.exists(QUEUE_PATH):
+    st.info("No risk queue yet. Rank the enrolled students with  \n"
+            "`python batch.py enrolled.csv -o scored.csv --id-column Student_ID --queue risk_queue.sqlite`  \n"
+            "and keep it current with `--store scores.sqlite` on the nightly export.")
+    st.stop()
+
+# every rerun reads one page straight from the queue's index; nothing
+# bigger than a page is loaded
+t0 = time.perf_counter()
+with RiskQueue(QUEUE_PATH) as queue:
+    scopes = queue.scopes()
+    if scopes.empty:
+        st.info("The risk queue is empty.")
+        st.stop()
+
+    # SCOPE
+    st.sidebar.header("Queue")
+    dimension = st.sidebar.radio(
+        "Rank within", ["all", "course", "age_group"],
+        format_func={"all": "All students", "course": "Course", "age_group": "Age group"}.get,
+    )
+    options = scopes[scopes["dimension"] == dimension]
+    value = "all" if dimension == "all" else st.sidebar.selectbox("Scope", options["value"].tolist())
+    scope = options[options["value"] == value].iloc[0]
+    page_size = st.sidebar.selectbox("Rows per page", [25, PAGE_SIZE, 100, 250], index=1)
+    n_pages = max(1, math.ceil(scope["queued"] / page_size))
+    page = st.sidebar.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1)
+
+    rows = queue.page(dimension, value, page, page_size)
+query_ms = (time.perf_counter() - t0) * 1e3
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Students in scope", f"{int(scope['students']):,}")
+col2.metric("Queued", f"{int(scope['queued']):,}")
+# students left out of the queue all score at or below the cutoff
+col3.metric("Queue cutoff", "none, all queued" if scope["floor"] < 0 else f"{scope['floor']:.0%}")
+
+st.dataframe(
+    rows.rename(columns={
+        "rank": "Rank", "student_id": "Student", "dropout_probability": "Dropout probability",
+        "course": "Course", "age_group": "Age group", "tuition": "Tuition", "scholarship": "Scholarship",
+        "approved_1st": "1st sem approved", "grade_1st": "1st sem grade",
+    }),
+    column_config={"Dropout probability": st.column_config.ProgressColumn(format="%.2f", min_value=0,
+                                                                          max_value=1)},
+    use_container_width=True, hide_index=True,
+)
+st.caption(f"Ranked {scope['ranked_at']} · page {page} of {n_pages} read in {query_ms:.1f} ms")
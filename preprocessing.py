@@ -0,0 +1,421 @@
+import numpy as np
+import pandas as pd
+
+
+# REMAPPING ENCODED FEATURE CATEGORIES
+marital_status_mapping = {
+    "1": "Single", "2": "Married", "3": "Widower", "4": "Divorced",
+    "5": "Facto Union", "6": "Legally Separated"
+}
+
+app_mode_mapping = {
+    "1": "1st phase - general contingent",
+    "2": "Ordinance No. 612/93",
+    "5": "1st phase - special contingent (Azores Island)",
+    "7": "Holders of other higher courses",
+    "10": "Ordinance No. 854-B/99",
+    "15": "International student (bachelor)",
+    "16": "1st phase - special contingent (Madeira Island)",
+    "17": "2nd phase - general contingent",
+    "18": "3rd phase - general contingent",
+    "26": "Ordinance No. 533-A/99, item b2 (Different Plan)",
+    "27": "Ordinance No. 533-A/99, item b3 (Other Institution)",
+    "39": "Over 23 years old",
+    "42": "Transfer",
+    "43": "Change of course",
+    "44": "Technological specialization diploma holders",
+    "51": "Change of institution/course",
+    "53": "Short cycle diploma holders",
+    "57": "Change of institution/course (International)"
+}
+
+course_mapping = {
+    "33": "Biofuel Production Technologies",
+    "171": "Animation and Multimedia Design",
+    "8014": "Social Service (evening attendance)",
+    "9003": "Agronomy",
+    "9070": "Communication Design",
+    "9085": "Veterinary Nursing",
+    "9119": "Informatics Engineering",
+    "9130": "Equinculture",
+    "9147": "Management",
+    "9238": "Social Service",
+    "9254": "Tourism",
+    "9500": "Nursing",
+    "9556": "Oral Hygiene",
+    "9670": "Advertising and Marketing Management",
+    "9773": "Journalism and Communication",
+    "9853": "Basic Education",
+    "9991": "Management (evening attendance)"
+}
+
+prev_qual_mapping = {
+    "1": "Secondary education",
+    "2": "Higher education - bachelor's degree",
+    "3": "Higher education - degree",
+    "4": "Higher education - master's",
+    "5": "Higher education - doctorate",
+    "6": "Frequency of higher education",
+    "9": "12th year of schooling - not completed",
+    "10": "11th year of schooling - not completed",
+    "12": "Other - 11th year of schooling",
+    "14": "10th year of schooling",
+    "15": "10th year of schooling - not completed",
+    "19": "Basic education 3rd cycle (9th/10th/11th year) or equiv.",
+    "38": "Basic education 2nd cycle (6th/7th/8th year) or equiv.",
+    "39": "Technological specialization course",
+    "40": "Higher education - degree (1st cycle)",
+    "42": "Professional higher technical course",
+    "43": "Higher education - master (2nd cycle)"
+}
+
+nationality_mapping = {
+    "1": "Portuguese", "2": "German", "6": "Spanish", "11": "Italian",
+    "13": "Dutch", "14": "English", "17": "Lithuanian", "21": "Angolan",
+    "22": "Cape Verdean", "24": "Guinean", "25": "Mozambican",
+    "26": "Santomean", "32": "Turkish", "41": "Brazilian",
+    "62": "Romanian", "100": "Moldova (Republic of)", "101": "Mexican",
+    "103": "Ukrainian", "105": "Russian", "108": "Cuban", "109": "Colombian"
+}
+
+qualification_mapping = {
+    "1": "Secondary Education - 12th Year of Schooling or Eq.",
+    "2": "Higher Education - Bachelor's Degree",
+    "3": "Higher Education - Degree",
+    "4": "Higher Education - Master's",
+    "5": "Higher Education - Doctorate",
+    "6": "Frequency of Higher Education",
+    "9": "12th Year of Schooling - Not Completed",
+    "10": "11th Year of Schooling - Not Completed",
+    "11": "7th Year (Old)",
+    "12": "Other - 11th Year of Schooling",
+    "13": "2nd year complementary high school course",
+    "14": "10th Year of Schooling",
+    "18": "General commerce course",
+    "19": "Basic Education 3rd Cycle (9th/10th/11th Year) or Equiv.",
+    "20": "Complementary High School Course",
+    "22": "Technical-professional course",
+    "25": "Complementary High School Course - not concluded",
+    "26": "7th year of schooling",
+    "27": "2nd cycle of the general high school course",
+    "29": "9th Year of Schooling - Not Completed",
+    "30": "8th year of schooling",
+    "31": "General Course of Administration and Commerce",
+    "33": "Supplementary Accounting and Administration",
+    "34": "Unknown",
+    "35": "Can't read or write",
+    "36": "Can read without having a 4th year of schooling",
+    "37": "Basic education 1st cycle (4th/5th year) or equiv.",
+    "38": "Basic Education 2nd Cycle (6th/7th/8th Year) or Equiv.",
+    "39": "Technological specialization course",
+    "40": "Higher education - degree (1st cycle)",
+    "41": "Specialized higher studies course",
+    "42": "Professional higher technical course",
+    "43": "Higher Education - Master (2nd cycle)",
+    "44": "Higher Education - Doctorate (3rd cycle)"
+}
+
+mothers_occupation_mapping = {
+    "0": "Student",
+    "1": "Legislative/Executive/Director/Manager",
+    "2": "Intellectual & Scientific Activities",
+    "3": "Intermediate Technicians & Professions",
+    "4": "Administrative Staff",
+    "5": "Personal Services/Security/Sellers",
+    "6": "Farmers/Skilled Agriculture",
+    "7": "Skilled Industry/Construction/Crafts",
+    "8": "Machine Operators/Assembly Workers",
+    "9": "Unskilled Workers",
+    "10": "Armed Forces",
+    "90": "Other Situation",
+    "99": "(Blank)",
+    "122": "Health Professionals",
+    "123": "Teachers",
+    "125": "ICT Specialists",
+    "131": "Science/Engineering Techs",
+    "132": "Intermediate Health Technicians",
+    "134": "Legal/Social/Sports/Cultural Techs",
+    "141": "Office Workers/Data Operators",
+    "143": "Accounting/Financial Operators",
+    "144": "Other Admin Support Staff",
+    "151": "Personal Service Workers",
+    "152": "Sellers",
+    "153": "Personal Care Workers",
+    "171": "Skilled Construction (not electricians)",
+    "173": "Printing/Precision/Jewelry/Artisans",
+    "175": "Food/Wood/Clothing Industries",
+    "191": "Cleaning Workers",
+    "192": "Unskilled Agriculture Workers",
+    "193": "Unskilled Construction/Manufacturing",
+    "194": "Meal Prep Assistants"
+}
+
+fathers_occupation_mapping = {
+    "0": "Student",
+    "1": "Legislative/Executive/Director/Manager",
+    "2": "Intellectual & Scientific Activities",
+    "3": "Intermediate Technicians & Professions",
+    "4": "Administrative Staff",
+    "5": "Personal Services/Security/Sellers",
+    "6": "Farmers/Skilled Agriculture",
+    "7": "Skilled Industry/Construction/Crafts",
+    "8": "Machine Operators/Assembly Workers",
+    "9": "Unskilled Workers",
+    "10": "Armed Forces",
+    "90": "Other Situation",
+    "99": "(Blank)",
+    "101": "Armed Forces Officers",
+    "102": "Armed Forces Sergeants",
+    "103": "Other Armed Forces Personnel",
+    "112": "Admin/Commercial Service Directors",
+    "114": "Hotel/Catering/Trade Directors",
+    "121": "Physical Sciences/Engineering Specialists",
+    "122": "Health Professionals",
+    "123": "Teachers",
+    "124": "Finance/Admin/Public Relations",
+    "131": "Science/Engineering Technicians",
+    "132": "Intermediate Health Technicians",
+    "134": "Legal/Social/Sports/Cultural Techs",
+    "135": "ICT Technicians",
+    "141": "Office Workers/Data Operators",
+    "143": "Accounting/Financial Operators",
+    "144": "Other Admin Support Staff",
+    "151": "Personal Service Workers",
+    "152": "Sellers",
+    "153": "Personal Care Workers",
+    "154": "Security Services",
+    "161": "Skilled Agricultural Workers",
+    "163": "Subsistence Farmers/Fishers",
+    "171": "Skilled Construction (not electricians)",
+    "172": "Metalworking Workers",
+    "174": "Electrical Workers",
+    "175": "Food/Wood/Clothing Industries",
+    "181": "Plant/Machine Operators",
+    "182": "Assembly Workers",
+    "183": "Vehicle/Mobile Equipment Operators",
+    "192": "Unskilled Agriculture Workers",
+    "193": "Unskilled Construction/Manufacturing",
+    "194": "Meal Prep Assistants",
+    "195": "Street Vendors/Service Providers"
+}
+
+daytime_evening_attendance_mapping = {
+    "1": "Daytime",
+    "0": "Evening"
+}
+
+binary_mapping = {
+    "Displaced":   {"1": "Yes", "0": "No"},
+    "Educational_special_needs": {"1": "Yes", "0": "No"},
+    "Debtor":      {"1": "Yes", "0": "No"},
+    "Gender":      {"1": "Male", "0": "Female"},
+    "Scholarship_holder": {"1": "Yes", "0": "No"},
+    "International": {"1": "Yes", "0": "No"},
+    "Tuition_fees_up_to_date": {"1": "Fees up to date", "0": "Fees NOT up to date"}
+}
+
+
+# RAW CSV COLUMN -> CODE MAPPING
+# keys are the column names of students_performance.csv, which are also the
+# prefixes of the one-hot columns in model_columns.pkl
+category_mappings = {
+    "Marital_status": marital_status_mapping,
+    "Application_mode": app_mode_mapping,
+    "Course": course_mapping,
+    "Daytime_evening_attendance": daytime_evening_attendance_mapping,
+    "Previous_qualification": prev_qual_mapping,
+    "Nacionality": nationality_mapping,
+    "Mothers_qualification": qualification_mapping,
+    "Fathers_qualification": qualification_mapping,
+    "Mothers_occupation": mothers_occupation_mapping,
+    "Fathers_occupation": fathers_occupation_mapping,
+    "Displaced": binary_mapping["Displaced"],
+    "Educational_special_needs": binary_mapping["Educational_special_needs"],
+    "Debtor": binary_mapping["Debtor"],
+    "Tuition_fees_up_to_date": binary_mapping["Tuition_fees_up_to_date"],
+    "Gender": binary_mapping["Gender"],
+    "Scholarship_holder": binary_mapping["Scholarship_holder"],
+    "International": binary_mapping["International"],
+}
+
+numeric_columns = [
+    "Application_order", "Previous_qualification_grade", "Admission_grade",
+    "Curricular_units_1st_sem_credited", "Curricular_units_1st_sem_enrolled",
+    "Curricular_units_1st_sem_evaluations", "Curricular_units_1st_sem_approved",
+    "Curricular_units_1st_sem_grade", "Curricular_units_1st_sem_without_evaluations",
+    "Curricular_units_2nd_sem_credited", "Curricular_units_2nd_sem_enrolled",
+    "Curricular_units_2nd_sem_evaluations", "Curricular_units_2nd_sem_approved",
+    "Curricular_units_2nd_sem_grade", "Curricular_units_2nd_sem_without_evaluations",
+    "Unemployment_rate", "Inflation_rate", "GDP"
+]
+
+# AgeGroup bins used in the notebook (right=False)
+age_bins = [0, 20, 24, 30, 100]
+age_labels = ['<=20', '21-24', '25-30', '31+']
+
+required_columns = list(category_mappings) + numeric_columns + ["Age_at_enrollment"]
+
+# COMPACT CSV DTYPES
+# 0/1 flags, small counts and ages fit int8, code lists that go past 127
+# (Course up to 9991) get int16. read_csv wraps integers that overflow the
+# dtype instead of raising (an Age of 300 would read as 44), so these
+# columns are parsed as int64, range-checked and only then downcast
+_int8_columns = [
+    "Marital_status", "Daytime_evening_attendance", "Displaced", "Educational_special_needs",
+    "Debtor", "Tuition_fees_up_to_date", "Gender", "Scholarship_holder", "International",
+    "Application_order", "Age_at_enrollment",
+    "Curricular_units_1st_sem_credited", "Curricular_units_1st_sem_enrolled",
+    "Curricular_units_1st_sem_evaluations", "Curricular_units_1st_sem_approved",
+    "Curricular_units_1st_sem_without_evaluations",
+    "Curricular_units_2nd_sem_credited", "Curricular_units_2nd_sem_enrolled",
+    "Curricular_units_2nd_sem_evaluations", "Curricular_units_2nd_sem_approved",
+    "Curricular_units_2nd_sem_without_evaluations",
+]
+_int16_columns = [
+    "Application_mode", "Course", "Previous_qualification", "Nacionality",
+    "Mothers_qualification", "Fathers_qualification", "Mothers_occupation", "Fathers_occupation",
+]
+_float32_columns = [
+    "Previous_qualification_grade", "Admission_grade", "Curricular_units_1st_sem_grade",
+    "Curricular_units_2nd_sem_grade", "Unemployment_rate", "Inflation_rate", "GDP",
+]
+compact_dtypes = {
+    **{col: "int8" for col in _int8_columns},
+    **{col: "int16" for col in _int16_columns},
+    **{col: "float32" for col in _float32_columns},
+}
+
+# CATEGORICAL CODE DTYPES
+# coded fields parsed straight into Categoricals over the codes of their
+# mapping: one byte per row, and code_labels turns them into labels by
+# renaming the categories instead of building a string per row. A code
+# outside the mapping (or a blank) reads as missing, which the encoder and
+# the cube already treat like an unknown code: "Other"
+category_dtypes = {
+    col: pd.CategoricalDtype(sorted(int(code) for code in mapping))
+    for col, mapping in category_mappings.items()
+}
+compact_category_dtypes = {
+    **compact_dtypes,
+    **category_dtypes,
+    "Status": pd.CategoricalDtype(["Dropout", "Enrolled", "Graduate"]),
+}
+# what read_csv is asked for: the integer columns that are not Categoricals
+# at full width (a code outside its mapping already reads as missing)
+_checked_columns = [col for col in _int8_columns + _int16_columns if col not in category_dtypes]
+_parse_dtypes = {
+    **compact_category_dtypes,
+    **{col: "int64" for col in _checked_columns},
+}
+
+
+def read_students_csv(path_or_buffer, **kwargs) -> pd.DataFrame:
+    """
+    Read a registrar export in the students_performance.csv format
+    (semicolon separated, optionally BOM-prefixed).
+    """
+    return pd.read_csv(path_or_buffer, sep=";", encoding="utf-8-sig", **kwargs)
+
+
+def read_students_compact(path_or_buffer, **kwargs) -> pd.DataFrame:
+    """
+    read_students_csv with compact_category_dtypes: coded fields and Status
+    as Categoricals, counts as int8/int16, grades and indicators as float32
+    (a blank numeric value, or one outside its int8/int16 range, is a
+    ValueError).
+    """
+    return downcast_compact(read_students_csv(path_or_buffer, dtype=_parse_dtypes, **kwargs))
+
+
+def iter_students_csv(path_or_buffer, chunksize: int, **kwargs):
+    """Stream a registrar export as read_students_compact DataFrames of at most chunksize rows."""
+    with read_students_csv(path_or_buffer, dtype=_parse_dtypes, chunksize=chunksize, **kwargs) as reader:
+        for chunk in reader:
+            yield downcast_compact(chunk)
+
+
+def downcast_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrow the int64 columns of a frame read with the compact parse dtypes
+    to compact_dtypes, raising ValueError listing every column with a value
+    the narrow dtype cannot hold.
+    """
+    out_of_range = []
+    for col in _checked_columns:
+        if col not in df.columns:
+            continue
+        info = np.iinfo(compact_dtypes[col])
+        values = df[col].to_numpy()
+        bad = values[(values < info.min) | (values > info.max)]
+        if len(bad):
+            out_of_range.append(f"{col} ({bad[0]})")
+    if out_of_range:
+        raise ValueError("Values out of range: " + ", ".join(out_of_range))
+    return df.astype({col: compact_dtypes[col] for col in _checked_columns if col in df.columns})
+
+
+def code_labels(codes: pd.Series, mapping: dict) -> pd.Series:
+    """
+    Map a coded column to its labels (unknown codes -> NaN). A Categorical
+    of codes keeps its per-row codes and only has its categories renamed.
+    """
+    if isinstance(codes.dtype, pd.CategoricalDtype):
+        return codes.cat.rename_categories(lambda code: mapping[str(code)])
+    return codes.astype(str).map(mapping)
+
+
+def unknown_codes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One boolean column per coded field of df: True where the code is blank
+    or outside its mapping, i.e. where the student is encoded as "Other".
+    """
+    unknown = {}
+    for col, dtype in category_dtypes.items():
+        if col not in df.columns:
+            continue
+        codes = df[col]
+        if isinstance(codes.dtype, pd.CategoricalDtype):
+            unknown[col] = codes.cat.codes.to_numpy() == -1
+        else:
+            unknown[col] = ~pd.to_numeric(codes, errors="coerce").isin(dtype.categories).to_numpy()
+    return pd.DataFrame(unknown, index=df.index)
+
+
+def check_columns(df: pd.DataFrame) -> None:
+    """Raise ValueError listing every required raw column missing from df."""
+    missing = [col for col in required_columns if col not in df.columns]
+    if missing:
+        raise ValueError("Missing columns: " + ", ".join(missing))
+
+
+def prepare_frame(df: pd.DataFrame, model_columns) -> pd.DataFrame:
+    """
+    Turn raw coded rows into the labelled frame the model was trained on:
+    codes are mapped to their English labels, labels without a dummy column
+    in model_columns are folded into "Other" (the notebook's <5% rule), and
+    Age_at_enrollment is binned into AgeGroup.
+    """
+    check_columns(df)
+    known = set(model_columns)
+
+    out = pd.DataFrame(index=df.index)
+    for col in numeric_columns:
+        out[col] = df[col]
+
+    for col, mapping in category_mappings.items():
+        labels = df[col].astype(str).map(mapping)
+        allowed = [label for label in set(mapping.values()) if f"{col}_{label}" in known]
+        out[col] = labels.where(labels.isin(allowed), "Other")
+
+    out["AgeGroup"] = pd.cut(
+        df["Age_at_enrollment"], bins=age_bins, labels=age_labels, right=False
+    )
+    return out
+
+
+def encode_frame(df: pd.DataFrame, model_columns) -> pd.DataFrame:
+    """One-hot encode every row of a raw frame in one pass, aligned to model_columns."""
+    df_prep = prepare_frame(df, model_columns)
+    cat_cols = list(category_mappings) + ["AgeGroup"]
+    df_encoded = pd.get_dummies(df_prep, columns=cat_cols)
+    return df_encoded.reindex(columns=model_columns, fill_value=0)
@@ -0,0 +1,321 @@
+"""
+Risk-ranked intervention queue.
+
+Scored students are ranked by dropout probability (ties by student ID)
+over the whole population and within every Course and every AgeGroup (one
+"scope" per dimension value). Only the top depth students of each scope
+are kept: every scored chunk is merged into the per-scope lists with a
+partial sort (np.partition), so memory is depth x scopes plus one chunk
+whatever the number of students. The lists go to a sqlite queue indexed by
+(dimension, value, probability), which the app pages through with
+LIMIT/OFFSET instead of loading a sorted frame.
+
+Each scope keeps a floor, the last student it kept, so every student of
+the scope left out ranks below the floor.
+After an incremental rescore (batch.py --store --queue) only the changed
+students' entries are deleted and, where they now rank at or above their
+scopes' floor, re-inserted; ranks stay exact, and a scope that lost
+students is only shorter than depth until the next full ranking.
+
+    python batch.py enrolled.csv -o scored.csv --id-column Student_ID --queue risk_queue.sqlite
+    python ranking.py --dimension course --value Nursing --page 1
+"""
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import age_bins, age_labels, binary_mapping, code_labels, course_mapping
+
+QUEUE_PATH = "risk_queue.sqlite"
+DEPTH = 1_000
+PAGE_SIZE = 50
+# the whole population is the single scope ("all", "all"), like the cube page's rollup
+DIMENSIONS = ["all", "course", "age_group"]
+ENTRY_COLUMNS = ["student_id", "dropout_probability", "course", "age_group", "tuition", "scholarship",
+                 "approved_1st", "grade_1st"]
+# a scope with every student retained: anything ranks above it
+NO_FLOOR = (-1.0, "")
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS queue (
+        dimension TEXT NOT NULL, value TEXT NOT NULL, student_id TEXT NOT NULL,
+        dropout_probability REAL NOT NULL,
+        course TEXT, age_group TEXT, tuition TEXT, scholarship TEXT,
+        approved_1st REAL, grade_1st REAL,
+        PRIMARY KEY (dimension, value, student_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS queue_rank ON queue (dimension, value, dropout_probability DESC, student_id)",
+    "CREATE INDEX IF NOT EXISTS queue_student ON queue (student_id)",
+    """
+    CREATE TABLE IF NOT EXISTS scopes (
+        dimension TEXT NOT NULL, value TEXT NOT NULL,
+        floor REAL NOT NULL,
+        floor_id TEXT NOT NULL,
+        students INTEGER NOT NULL,
+        ranked_at TEXT NOT NULL,
+        PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def queue_entries(scored: pd.DataFrame, id_column: str = None) -> pd.DataFrame:
+    """
+    The ENTRY_COLUMNS of scored rows (raw columns plus Dropout_probability).
+    Without id_column a student is identified by its row number in the input.
+    """
+    def label(col, mapping):
+        return code_labels(scored[col], mapping).astype(object).fillna("Other").to_numpy()
+
+    ids = scored[id_column] if id_column else scored.index
+    age_group = pd.cut(scored["Age_at_enrollment"], bins=age_bins, labels=age_labels, right=False)
+    return pd.DataFrame({
+        "student_id": np.asarray(ids).astype(str),
+        "dropout_probability": scored["Dropout_probability"].to_numpy(dtype=np.float64),
+        "course": label("Course", course_mapping),
+        "age_group": age_group.astype(object).fillna("Other").to_numpy(),
+        "tuition": label("Tuition_fees_up_to_date", binary_mapping["Tuition_fees_up_to_date"]),
+        "scholarship": label("Scholarship_holder", binary_mapping["Scholarship_holder"]),
+        "approved_1st": scored["Curricular_units_1st_sem_approved"].to_numpy(dtype=np.float64),
+        "grade_1st": scored["Curricular_units_1st_sem_grade"].to_numpy(dtype=np.float64),
+    })
+
+
+def _ranked(entries: pd.DataFrame, n: int = None) -> pd.DataFrame:
+    """entries riskiest first (probability, then student ID), cut to the first n."""
+    p = entries["dropout_probability"].to_numpy()
+    keep = np.arange(len(p))
+    if n is not None and len(p) > n:
+        # partial sort: only rows scoring at least the n-th highest probability get ordered
+        keep = np.flatnonzero(p >= np.partition(p, len(p) - n)[len(p) - n])
+    order = keep[np.lexsort((entries["student_id"].to_numpy()[keep], -p[keep]))]
+    return entries.iloc[order[:n]]
+
+
+def _above(entries: pd.DataFrame, floor: tuple, inclusive: bool = False) -> np.ndarray:
+    """Mask of the entries that rank before (or at) floor, a (probability, student_id) pair."""
+    probability, student_id = floor
+    p = entries["dropout_probability"].to_numpy()
+    above = p > probability
+    tied = np.flatnonzero(p == probability)
+    # IDs are only compared on ties, the string comparison being the slow part
+    ids = entries["student_id"].to_numpy()[tied]
+    above[tied] = ids <= student_id if inclusive else ids < student_id
+    return above
+
+
+def _scope_groups(entries: pd.DataFrame):
+    """(dimension, value, rows) for every scope the entries fall in."""
+    yield "all", "all", entries
+    for dimension in DIMENSIONS[1:]:
+        for value, rows in entries.groupby(dimension, sort=False):
+            yield dimension, value, rows
+
+
+class TopRanker:
+    """
+    Top depth students per scope over a stream of queue_entries frames.
+    Once a scope is full, rows that cannot beat its last student are
+    dropped before any per-scope work; the rest wait in a per-scope buffer
+    that is merged into the ranking once it holds depth rows, so a scope
+    is re-sorted every depth newcomers rather than every chunk.
+    """
+
+    def __init__(self, depth: int = DEPTH):
+        self.depth = depth
+        self.students = {}
+        self._top = {}
+        self._pending = {}
+
+    def floor(self, scope) -> tuple:
+        """
+        The last student kept in a full scope (NO_FLOOR while every student
+        fits). Until ranked() merges the buffers it can lag behind, which
+        only lets more rows through.
+        """
+        top = self._top.get(scope)
+        if top is None or len(top) < self.depth:
+            return NO_FLOOR
+        return top["dropout_probability"].iat[-1], top["student_id"].iat[-1]
+
+    def _candidates(self, entries: pd.DataFrame) -> pd.DataFrame:
+        """entries scoring at least the floor of one of their scopes (exact ties are settled later)."""
+        p = entries["dropout_probability"].to_numpy()
+        keep = p >= self.floor(("all", "all"))[0]
+        for dimension in DIMENSIONS[1:]:
+            floors = {value: self.floor((dim, value))[0] for dim, value in self._top if dim == dimension}
+            keep |= p >= entries[dimension].map(floors).fillna(NO_FLOOR[0]).to_numpy()
+        return entries[keep]
+
+    def _merge(self, scope) -> None:
+        frames = self._pending.pop(scope, [])
+        if scope in self._top:
+            frames.insert(0, self._top[scope])
+        if frames:
+            self._top[scope] = _ranked(pd.concat(frames, ignore_index=True), self.depth)
+
+    def add(self, entries: pd.DataFrame) -> None:
+        self.students[("all", "all")] = self.students.get(("all", "all"), 0) + len(entries)
+        for dimension in DIMENSIONS[1:]:
+            for value, n in entries[dimension].value_counts(sort=False).items():
+                self.students[(dimension, value)] = self.students.get((dimension, value), 0) + n
+
+        for dimension, value, rows in _scope_groups(self._candidates(entries)):
+            scope = (dimension, value)
+            rows = rows[_above(rows, self.floor(scope))]
+            if rows.empty:
+                continue
+            pending = self._pending.setdefault(scope, [])
+            pending.append(rows)
+            if sum(len(frame) for frame in pending) >= self.depth:
+                self._merge(scope)
+
+    def ranked(self) -> dict:
+        """(dimension, value) -> its top depth students, riskiest first."""
+        for scope in list(self._pending):
+            self._merge(scope)
+        return self._top
+
+
+class RiskQueue:
+    """sqlite-backed per-scope ranking written by TopRanker and kept current by update()."""
+
+    def __init__(self, path: str = QUEUE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM scopes LIMIT 1").fetchone() is None
+
+    def _insert(self, dimension: str, value: str, rows: pd.DataFrame) -> None:
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO queue VALUES ({', '.join('?' * (len(ENTRY_COLUMNS) + 2))})",
+            ((dimension, value, *row) for row in rows[ENTRY_COLUMNS].itertuples(index=False, name=None)),
+        )
+
+    def replace(self, ranker: TopRanker) -> None:
+        """Swap in a full ranking in one transaction."""
+        ranked_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self.conn:
+            self.conn.execute("DELETE FROM queue")
+            self.conn.execute("DELETE FROM scopes")
+            for (dimension, value), rows in ranker.ranked().items():
+                self._insert(dimension, value, rows)
+                self.conn.execute(
+                    "INSERT INTO scopes VALUES (?, ?, ?, ?, ?, ?)",
+                    (dimension, value, *ranker.floor((dimension, value)),
+                     ranker.students[(dimension, value)], ranked_at),
+                )
+        self.conn.execute("PRAGMA optimize")
+
+    def update(self, entries: pd.DataFrame, depth: int = DEPTH) -> dict:
+        """
+        Re-rank the rescored students in entries (queue_entries of the
+        changed rows): their old entries are removed and the new ones kept
+        where they rank at or above the scope's floor. Scopes that grow past
+        depth are trimmed back, raising their floor. Returns removed/inserted
+        counts.
+        """
+        floors = {(d, v): (floor, floor_id) for d, v, floor, floor_id
+                  in self.conn.execute("SELECT dimension, value, floor, floor_id FROM scopes")}
+        counts = {"removed": 0, "inserted": 0}
+        grown = set()
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS changed_ids (student_id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM changed_ids")
+            self.conn.executemany("INSERT OR IGNORE INTO changed_ids VALUES (?)",
+                                  ((i,) for i in entries["student_id"]))
+            counts["removed"] = self.conn.execute(
+                "DELETE FROM queue WHERE student_id IN (SELECT student_id FROM changed_ids)"
+            ).rowcount
+            for dimension, value, rows in _scope_groups(entries):
+                floor = floors.get((dimension, value))
+                if floor is None:
+                    # a scope first seen in this update: no student of it was left out
+                    floor = NO_FLOOR
+                    self.conn.execute(
+                        "INSERT INTO scopes VALUES (?, ?, ?, ?, 0, ?)",
+                        (dimension, value, *floor, time.strftime("%Y-%m-%dT%H:%M:%S")),
+                    )
+                rows = rows[_above(rows, floor, inclusive=True)]
+                if not rows.empty:
+                    self._insert(dimension, value, rows)
+                    counts["inserted"] += len(rows)
+                    grown.add((dimension, value))
+            for dimension, value in grown:
+                self._trim(dimension, value, depth)
+        return counts
+
+    def _trim(self, dimension: str, value: str, depth: int) -> None:
+        ranked = ("SELECT student_id, dropout_probability FROM queue WHERE dimension = ? AND value = ? "
+                  "ORDER BY dropout_probability DESC, student_id LIMIT ? OFFSET ?")
+        if self.conn.execute(ranked, (dimension, value, 1, depth)).fetchone() is None:
+            return
+        self.conn.execute(
+            f"DELETE FROM queue WHERE dimension = ? AND value = ? AND student_id IN (SELECT student_id FROM ({ranked}))",
+            (dimension, value, dimension, value, -1, depth),
+        )
+        # every entry ranks at or above the old floor, so the new last one is the new floor
+        last = self.conn.execute(ranked, (dimension, value, 1, depth - 1)).fetchone()
+        self.conn.execute("UPDATE scopes SET floor = ?, floor_id = ? WHERE dimension = ? AND value = ?",
+                          (last[1], last[0], dimension, value))
+
+    def scopes(self) -> pd.DataFrame:
+        """Every scope with its population at ranking time, queued entries and floor."""
+        return pd.read_sql_query(
+            "SELECT s.dimension, s.value, s.students, COUNT(q.student_id) AS queued, s.floor, s.floor_id, "
+            "s.ranked_at "
+            "FROM scopes s LEFT JOIN queue q ON q.dimension = s.dimension AND q.value = s.value "
+            "GROUP BY s.dimension, s.value ORDER BY s.dimension, s.value",
+            self.conn,
+        )
+
+    def page(self, dimension: str = "all", value: str = "all", page: int = 1,
+             page_size: int = PAGE_SIZE) -> pd.DataFrame:
+        """One page (1-based) of a scope's queue, riskiest first, with a Rank column."""
+        offset = (page - 1) * page_size
+        rows = pd.read_sql_query(
+            f"SELECT {', '.join(ENTRY_COLUMNS)} FROM queue WHERE dimension = ? AND value = ? "
+            "ORDER BY dropout_probability DESC, student_id LIMIT ? OFFSET ?",
+            self.conn, params=(dimension, value, page_size, offset),
+        )
+        rows.insert(0, "rank", range(offset + 1, offset + 1 + len(rows)))
+        return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the risk-ranked intervention queue.")
+    parser.add_argument("--queue", default=QUEUE_PATH)
+    parser.add_argument("--dimension", choices=DIMENSIONS, help="default: list the scopes")
+    parser.add_argument("--value", default="all")
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    with RiskQueue(args.queue) as queue:
+        if args.dimension is None:
+            print(queue.scopes().to_string(index=False))
+        else:
+            print(queue.page(args.dimension, args.value, args.page, args.page_size).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Local model registry with hot reload.
+
+A registry is a directory of immutable, versioned bundles plus a CURRENT
+file naming the active one:
+
+    models/
+        CURRENT                        -> "20240601-101500-3f2a9c1e"
+        20240601-101500-3f2a9c1e/
+            dropout_retention_model.pkl
+            model_columns.pkl
+            manifest.json              version, sha256 of every file, created_at
+
+Bundles are written to a temporary directory and renamed into place, and
+CURRENT is replaced atomically, so readers never see a half-written model.
+RegistryWatcher follows CURRENT with watchdog: a new version is loaded,
+checksum-verified and warmed up with a prediction on a background thread,
+then swapped in with a single reference assignment. Callers that already
+took watcher.current keep using the version they took.
+
+    python registry.py publish --model dropout_retention_model.pkl --columns model_columns.pkl
+    python registry.py list
+    python registry.py activate 20240601-101500-3f2a9c1e
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from metrics import MODEL_INFO, MODEL_LOAD_SECONDS, MODEL_RELOADS, STAGE_SECONDS
+from preprocessing import category_mappings, numeric_columns
+
+REGISTRY_PATH = "models"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+MODEL_FILE = "dropout_retention_model.pkl"
+COLUMNS_FILE = "model_columns.pkl"
+# watchdog may report one CURRENT replace as several events; wait for them to settle
+DEBOUNCE_SECONDS = 0.2
+
+logger = logging.getLogger(__name__)
+
+# opened / closed_no_write are excluded: reading CURRENT must not trigger a reload
+_CHANGE_EVENTS = ("created", "modified", "moved", "closed")
+
+
+class RegistryError(ValueError):
+    """Missing, incomplete or corrupted registry bundle."""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def has_registry(root: str = REGISTRY_PATH) -> bool:
+    return bool(root) and os.path.isfile(os.path.join(root, CURRENT_FILE))
+
+
+def current_version(root: str = REGISTRY_PATH) -> str:
+    with open(os.path.join(root, CURRENT_FILE)) as f:
+        return f.read().strip()
+
+
+def list_versions(root: str = REGISTRY_PATH) -> list:
+    """Manifests of every bundle, oldest first."""
+    manifests = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name, MANIFEST_FILE)
+        if not name.startswith(".") and os.path.isfile(path):
+            with open(path) as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m["created_at"])
+
+
+def publish(model_path: str, columns_path: str, root: str = REGISTRY_PATH, version: str = None,
+            activate: bool = True) -> dict:
+    """Copy a trained model and its columns into a new bundle; returns its manifest."""
+    os.makedirs(root, exist_ok=True)
+    checksum = _sha256(model_path)
+    version = version or f"{time.strftime('%Y%m%d-%H%M%S')}-{checksum[:8]}"
+    target = os.path.join(root, version)
+    if os.path.exists(target):
+        raise RegistryError(f"version {version} already exists in {root}")
+
+    staging = tempfile.mkdtemp(dir=root, prefix=".publish-")
+    try:
+        shutil.copyfile(model_path, os.path.join(staging, MODEL_FILE))
+        shutil.copyfile(columns_path, os.path.join(staging, COLUMNS_FILE))
+        manifest = {
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": {name: _sha256(os.path.join(staging, name)) for name in (MODEL_FILE, COLUMNS_FILE)},
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(staging, 0o755)
+        os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if activate:
+        activate_version(version, root)
+    return manifest
+
+
+def activate_version(version: str, root: str = REGISTRY_PATH) -> None:
+    """Point CURRENT at an existing bundle (also how to roll back)."""
+    if not os.path.isfile(os.path.join(root, version, MANIFEST_FILE)):
+        raise RegistryError(f"no bundle {version} in {root}")
+    _write_atomic(os.path.join(root, CURRENT_FILE), version + "\n")
+
+
+class Bundle:
+    """One loaded model version: the forest, its columns, engine and encoder."""
+
+    def __init__(self, version: str, model, model_columns, manifest: dict = None):
+        self.version = version
+        self.model = model
+        self.model_columns = model_columns
+        self.manifest = manifest or {}
+        self.engine = model if isinstance(model, ForestEngine) else ForestEngine.from_sklearn(model)
+        self.encoder = FeatureEncoder(model_columns)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.engine.predict_proba(X)
+
+
+def load_bundle(root: str = REGISTRY_PATH, version: str = None) -> Bundle:
+    """Load and checksum-verify a bundle (default: the CURRENT one)."""
+    version = version or current_version(root)
+    directory = os.path.join(root, version)
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise RegistryError(f"no bundle {version} in {root}") from None
+    for name, expected in manifest["files"].items():
+        if _sha256(os.path.join(directory, name)) != expected:
+            raise RegistryError(f"checksum mismatch for {name} in bundle {version}")
+    model = joblib.load(os.path.join(directory, MODEL_FILE))
+    model_columns = joblib.load(os.path.join(directory, COLUMNS_FILE))
+    return Bundle(version, model, model_columns, manifest)
+
+
+def warm_up(served) -> None:
+    """
+    Run one prediction through served.encoder and served.predict_proba so
+    the first real request does not pay for first-touch costs; raises
+    RegistryError if the model does not return one probability row.
+    """
+    student = {field: next(iter(mapping)) for field, mapping in category_mappings.items()}
+    student.update({col: 0 for col in numeric_columns}, Age_at_enrollment=20)
+    proba = np.asarray(served.predict_proba(served.encoder.encode_row(student).copy()))
+    if proba.shape[0] != 1 or not np.isclose(proba.sum(), 1):
+        raise RegistryError(f"warm-up prediction returned {proba!r}")
+
+
+class RegistryWatcher(FileSystemEventHandler):
+    """
+    Keeps .current on the registry's CURRENT version. build turns a loaded
+    Bundle into whatever the caller serves (the Bundle itself by default);
+    it must expose encoder and predict_proba for the warm-up. on_swap, if
+    given, is called with it right before it becomes current.
+    """
+
+    def __init__(self, root: str = REGISTRY_PATH, build=None, on_swap=None):
+        self.root = root
+        self.build = build or (lambda bundle: bundle)
+        self.on_swap = on_swap
+        self.current = None
+        self.version = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def start(self):
+        """Load CURRENT synchronously, then follow it in the background."""
+        self.reload()
+        if self.current is None:
+            raise RegistryError(f"could not load {self.root}: {self.last_error}")
+        self._observer = Observer()
+        self._observer.schedule(self, self.root, recursive=False)
+        self._observer.start()
+        self._thread = threading.Thread(target=self._run, name="registry-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+    def on_any_event(self, event):
+        if event.event_type not in _CHANGE_EVENTS:
+            return
+        paths = (getattr(event, "src_path", ""), getattr(event, "dest_path", ""))
+        if any(os.path.basename(path) == CURRENT_FILE for path in paths):
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            time.sleep(DEBOUNCE_SECONDS)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.reload()
+
+    def reload(self) -> bool:
+        """Swap in the CURRENT version if it changed; False (old model kept) on failure."""
+        try:
+            version = current_version(self.root)
+            if version == self.version:
+                return True
+            t0 = time.perf_counter()
+            served = self.build(load_bundle(self.root, version))
+            warm_up(served)
+            load_seconds = time.perf_counter() - t0
+        except Exception as err:
+            self.last_error = f"{type(err).__name__}: {err}"
+            MODEL_RELOADS.labels("error").inc()
+            logger.warning("model registry: keeping %s, reload failed: %s", self.version, self.last_error)
+            return False
+
+        if self.on_swap is not None:
+            self.on_swap(served)
+        previous, self.version, self.current = self.version, version, served
+        self.last_error = None
+        STAGE_SECONDS.labels("load").observe(load_seconds)
+        MODEL_LOAD_SECONDS.set(load_seconds)
+        MODEL_RELOADS.labels("ok").inc()
+        if previous is not None:
+            MODEL_INFO.labels(previous).set(0)
+        MODEL_INFO.labels(version).set(1)
+        logger.info("model registry: serving %s (loaded and warmed up in %.2fs)", version, load_seconds)
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local model registry.")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="add a trained model as a new version")
+    pub.add_argument("--model", default=MODEL_FILE)
+    pub.add_argument("--columns", default=COLUMNS_FILE)
+    pub.add_argument("--version", help="default: timestamp and model checksum")
+    pub.add_argument("--no-activate", action="store_true", help="publish without switching CURRENT")
+    sub.add_parser("list", help="list versions, marking the current one")
+    act = sub.add_parser("activate", help="switch CURRENT to an existing version")
+    act.add_argument("version")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        manifest = publish(args.model, args.columns, args.registry, args.version, not args.no_activate)
+        state = "published" if args.no_activate else "published and activated"
+        print(f"{state} {manifest['version']} in {args.registry}")
+    elif args.command == "activate":
+        activate_version(args.version, args.registry)
+        print(f"{args.registry}: CURRENT -> {args.version}")
+    else:
+        current = current_version(args.registry) if has_registry(args.registry) else None
+        for manifest in list_versions(args.registry):
+            mark = "*" if manifest["version"] == current else " "
+            print(f"{mark} {manifest['version']}  {manifest['created_at']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class SchemaError(ValueError):
+    """Encoded features do not match the layout the model was trained on."""
+
+
+class FeatureSchema:
+    """
+    Field -> one-hot layout derived from model_columns.pkl.
+
+    Every training column is either a numeric feature or a dummy named
+    f"{field}_{category}" for one of the categorical fields. The schema keeps
+    the offset of each, so encoders can write by (field, category) instead
+    of relying on get_dummies producing the right names, and every encoded
+    batch can be checked against it.
+    """
+
+    def __init__(self, model_columns, categorical_fields, numeric_fields):
+        self.columns = list(model_columns)
+        self.n_features = len(self.columns)
+
+        # longest prefix first so e.g. "Mothers_qualification" never
+        # swallows a column of a field that shares its start
+        prefixes = sorted(categorical_fields, key=len, reverse=True)
+        numeric_set = set(numeric_fields)
+
+        self.numeric = {}
+        self.groups = {field: {} for field in categorical_fields}
+        unknown = []
+        for offset, name in enumerate(self.columns):
+            if name in numeric_set:
+                self.numeric[name] = offset
+                continue
+            field = next((p for p in prefixes if name.startswith(p + "_")), None)
+            if field is None:
+                unknown.append(name)
+            else:
+                self.groups[field][name[len(field) + 1:]] = offset
+
+        if unknown:
+            raise SchemaError("model_columns not produced by any known field: " + ", ".join(unknown))
+        empty = [field for field, cats in self.groups.items() if not cats]
+        if empty:
+            raise SchemaError("no one-hot columns in model_columns for: " + ", ".join(empty))
+
+        self.numeric_offsets = np.array(list(self.numeric.values()), dtype=np.intp)
+        self.group_offsets = {
+            field: np.array(list(cats.values()), dtype=np.intp) for field, cats in self.groups.items()
+        }
+        self.onehot_offsets = np.concatenate(list(self.group_offsets.values()))
+        # column j marks field j's dummies other than "Other": X @ mask counts
+        # the real categories set per field in one call
+        self._category_mask = np.zeros((self.n_features, len(self.groups)), dtype=np.float32)
+        for j, (field, cats) in enumerate(self.groups.items()):
+            for category, offset in cats.items():
+                if category != "Other":
+                    self._category_mask[offset, j] = 1
+
+    def offset(self, field: str, category: str, default: int = -1) -> int:
+        """Column offset of the dummy for (field, category), else default."""
+        return self.groups[field].get(category, default)
+
+    def other_offset(self, field: str) -> int:
+        """Offset of the field's "Other" dummy, or -1 when it has none."""
+        return self.offset(field, "Other")
+
+    def validate(self, X: np.ndarray) -> float:
+        """
+        Check an encoded batch against the schema and return its coverage.
+        Raises SchemaError when the shape is wrong, a dummy is not 0/1, or a
+        row has more than one dummy set within a single field.
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise SchemaError(f"expected (n, {self.n_features}) features, got {X.shape}")
+
+        onehot = X[:, self.onehot_offsets]
+        if not np.isin(onehot, (0, 1)).all():
+            raise SchemaError("one-hot columns contain values other than 0/1")
+
+        for field, offsets in self.group_offsets.items():
+            if (X[:, offsets].sum(axis=1) > 1).any():
+                raise SchemaError(f"more than one {field} dummy set in a row")
+        return self.coverage(X)
+
+    def coverage_by_field(self, X: np.ndarray) -> dict:
+        """Fraction of rows that have a dummy set, per one-hot field."""
+        X = np.asarray(X)
+        if len(X) == 0:
+            return {field: 1.0 for field in self.group_offsets}
+        return {
+            field: float((X[:, offsets] != 0).any(axis=1).mean())
+            for field, offsets in self.group_offsets.items()
+        }
+
+    def fallback_counts(self, X: np.ndarray) -> np.ndarray:
+        """
+        Per one-hot field (in group_offsets order), the number of rows that
+        fell back: the field's "Other" dummy is set, or no dummy is set.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        return ((X @ self._category_mask) == 0).sum(axis=0)
+
+    def coverage(self, X: np.ndarray) -> float:
+        """Fraction of expected one-hot groups that got populated, over all rows."""
+        by_field = self.coverage_by_field(X)
+        return float(np.mean(list(by_field.values())))
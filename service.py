@@ -0,0 +1,308 @@
+"""
+Headless JSON prediction service.
+
+POST /predict with one student as a JSON object keyed by the
+students_performance.csv columns (raw codes, as in the CSV), or a JSON list
+of them. Concurrent requests are coalesced into micro-batches of at most
+--max-batch-size rows, waiting at most --max-wait-ms for a batch to fill,
+before a single predict_proba call. GET /metrics returns stage latencies
+and prediction/fallback/cache counters in the Prometheus text format, plus
+the drift of the recent requests' fields and scores from
+students_performance.csv (see drift.py).
+
+With --registry the model comes from a registry directory (see
+registry.py) and is hot-swapped when its CURRENT version changes; a request
+is encoded and scored by the version it started with, and every response
+reports that model_version.
+
+    python service.py --port 8000
+    python service.py --registry models
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.web
+
+from artifact import ARTIFACT_PATH, has_artifact, model_version
+from batch import COLUMNS_PATH, MODEL_PATH, PREDICTION_LABELS, load_model_and_columns
+from cache import PredictionCache
+from drift import DATA_PATH, DriftMonitor, build_reference
+from encoder import FeatureEncoder
+from engine import ForestEngine
+from metrics import (
+    MISSING_FIELD_REJECTIONS, MODEL_INFO, MODEL_LOAD_SECONDS, REGISTRY, STAGE_SECONDS, PredictionRecorder,
+    watch_cache
+)
+from preprocessing import required_columns
+from registry import RegistryWatcher
+
+
+class MicroBatcher:
+    """
+    Collects single rows from concurrent callers and scores them together.
+
+    The first queued row opens a batch; it is flushed once it holds
+    max_batch_size rows or max_wait_ms have passed, whichever comes first.
+    Scoring runs on a single worker thread so the event loop keeps accepting
+    (and batching) requests while the forest is busy.
+    """
+
+    def __init__(self, predict_proba, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.predict_proba = predict_proba
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, x: np.ndarray, predict_proba=None):
+        """
+        Queue one encoded row; resolves to (probabilities, batch size it was
+        scored in). predict_proba overrides the batcher's for this row (the
+        model version the row was encoded for).
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((x, future, predict_proba or self.predict_proba))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # one group unless a model swap happened while the batch was filling
+            groups = {}
+            for x, future, predict_proba in batch:
+                groups.setdefault(predict_proba, []).append((x, future))
+            for predict_proba, group in groups.items():
+                X = np.stack([x for x, _ in group])
+                try:
+                    proba = await loop.run_in_executor(self._executor, predict_proba, X)
+                except Exception as err:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(err)
+                    continue
+                self.batches += 1
+                self.rows += len(group)
+                for (_, future), p in zip(group, proba):
+                    if not future.done():
+                        future.set_result((p, len(group)))
+
+
+class ServedModel:
+    """
+    One model version as the service uses it: its encoder, prediction cache,
+    drift monitor (when the reference CSV at drift_data exists) and a
+    predict_proba that records stage latency and fallback metrics.
+    """
+
+    def __init__(self, engine: ForestEngine, model_columns, version=None, cache_size: int = 10_000,
+                 drift_data: str = DATA_PATH):
+        self.version = version
+        self.encoder = FeatureEncoder(model_columns)
+        self.classes = engine.classes_
+        self.dropout_idx = list(engine.classes_).index(1)
+        self.cache = PredictionCache(engine.predict_proba, version, maxsize=cache_size) if cache_size else None
+        self._scorer = self.cache.predict_proba if self.cache else engine.predict_proba
+        self._recorder = PredictionRecorder(self.encoder.schema, bind=False)
+        self._predict_seconds = STAGE_SECONDS.labels("predict")
+        self.drift = None
+        if drift_data and os.path.exists(drift_data):
+            self.drift = DriftMonitor(build_reference(self.encoder, engine.predict_proba, self.dropout_idx,
+                                                      drift_data))
+
+    def bind_metrics(self) -> None:
+        """Point the cache, fallback and drift metrics at this version (when it goes live)."""
+        if self.cache is not None:
+            watch_cache(self.cache)
+        self._recorder.bind()
+        if self.drift is not None:
+            self.drift.bind()
+
+    def predict_proba(self, X) -> np.ndarray:
+        # runs once per micro-batch on the batcher's thread
+        with self._predict_seconds.time():
+            proba = self._scorer(X)
+        self._recorder.record(X)
+        return proba
+
+
+class StaticModels:
+    """A fixed ServedModel behind the same .current attribute as RegistryWatcher."""
+
+    def __init__(self, served: ServedModel):
+        served.bind_metrics()
+        self.current = served
+
+
+class PredictHandler(tornado.web.RequestHandler):
+    def initialize(self, models, batcher: MicroBatcher):
+        self.models = models
+        self.batcher = batcher
+
+    def _error(self, status: int, body: dict):
+        self.set_status(status)
+        self.finish(body)
+
+    async def post(self):
+        try:
+            payload = json.loads(self.request.body)
+        except ValueError:
+            return self._error(400, {"error": "body is not valid JSON"})
+
+        students = payload if isinstance(payload, list) else [payload]
+        if not students or not all(isinstance(s, dict) for s in students):
+            return self._error(400, {"error": "expected a student object or a list of them"})
+
+        # the version this request started with, even if a swap happens meanwhile
+        served = self.models.current
+        rows = []
+        t0 = time.perf_counter()
+        for i, student in enumerate(students):
+            missing = [col for col in required_columns if student.get(col) is None]
+            if missing:
+                MISSING_FIELD_REJECTIONS.inc()
+                return self._error(400, {"error": "missing fields", "index": i, "missing": missing})
+            try:
+                # encode_row reuses its buffer, so keep a copy for the batch
+                rows.append(served.encoder.encode_row(student)[0].copy())
+            except (TypeError, ValueError) as err:
+                return self._error(400, {"error": f"invalid value: {err}", "index": i})
+        STAGE_SECONDS.labels("encode").observe(time.perf_counter() - t0)
+
+        results = await asyncio.gather(*(self.batcher.submit(x, served.predict_proba) for x in rows))
+        out = []
+        for student, (proba, batch_size) in zip(students, results):
+            if served.drift is not None:
+                served.drift.observe_row(student, proba[served.dropout_idx])
+            out.append({
+                "prediction": PREDICTION_LABELS[int(served.classes[np.argmax(proba)])],
+                "dropout_probability": float(proba[served.dropout_idx]),
+                "batch_size": batch_size,
+                "model_version": served.version,
+            })
+        self.finish({"results": out} if isinstance(payload, list) else out[0])
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def initialize(self, models, batcher: MicroBatcher):
+        self.models = models
+        self.batcher = batcher
+
+    def get(self):
+        served = self.models.current
+        body = {"status": "ok", "model_version": served.version,
+                "batches": self.batcher.batches, "rows": self.batcher.rows}
+        if served.cache is not None:
+            body["cache"] = served.cache.stats()
+        if getattr(self.models, "last_error", None):
+            body["last_reload_error"] = self.models.last_error
+        self.finish(body)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(REGISTRY.render())
+
+
+def make_app(models, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+    """
+    Build the tornado application serving models.current (a StaticModels or
+    a RegistryWatcher); call app.settings["batcher"].start() inside the loop.
+    """
+    batcher = MicroBatcher(None, max_batch_size, max_wait_ms)
+    return tornado.web.Application(
+        [
+            (r"/predict", PredictHandler, {"models": models, "batcher": batcher}),
+            (r"/health", HealthHandler, {"models": models, "batcher": batcher}),
+            (r"/metrics", MetricsHandler),
+        ],
+        batcher=batcher,
+    )
+
+
+def load_models(args):
+    """Models for the service: the registry's CURRENT version, or the fixed files."""
+    if args.registry:
+        return RegistryWatcher(
+            args.registry,
+            lambda bundle: ServedModel(bundle.engine, bundle.model_columns, bundle.version, args.cache_size,
+                                       args.drift_data),
+            on_swap=ServedModel.bind_metrics,
+        ).start()
+
+    artifact = args.artifact if has_artifact(args.artifact) else None
+    t0 = time.perf_counter()
+    model, model_columns = load_model_and_columns(args.model, args.columns, artifact)
+    engine = model if isinstance(model, ForestEngine) else ForestEngine.from_sklearn(model)
+    load_seconds = time.perf_counter() - t0
+    STAGE_SECONDS.labels("load").observe(load_seconds)
+    MODEL_LOAD_SECONDS.set(load_seconds)
+    version = model_version(args.artifact, args.model)
+    MODEL_INFO.labels(version).set(1)
+    return StaticModels(ServedModel(engine, model_columns, version, args.cache_size, args.drift_data))
+
+
+async def serve(args):
+    models = load_models(args)
+    app = make_app(models, args.max_batch_size, args.max_wait_ms)
+    app.settings["batcher"].start()
+    app.listen(args.port, address=args.host)
+    print(f"serving {models.current.version} on http://{args.host}:{args.port}/predict "
+          f"(max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms)")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching JSON prediction service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--cache-size", type=int, default=10_000,
+                        help="prediction cache entries (0 disables the cache)")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH,
+                        help="memory-mapped artifact, used when it exists")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--registry", help="serve the CURRENT version of this model registry "
+                                           "and hot-swap it (instead of --artifact/--model)")
+    parser.add_argument("--drift-data", default=DATA_PATH,
+                        help="reference CSV for the drift metrics ('' turns drift monitoring off)")
+    args = parser.parse_args(argv)
+    # registry reloads and failures on stderr; tornado's per-request access log
+    # (which logs every 4xx at warning) stays off
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("registry").setLevel(logging.INFO)
+    logging.getLogger("tornado.access").disabled = True
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
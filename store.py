@@ -0,0 +1,102 @@
+"""
+Persistent score store for incremental re-scoring.
+
+One sqlite row per student ID holds a content hash of the student's raw
+feature columns, the model version it was scored with and the resulting
+probability/prediction. A nightly export is diffed against it and only
+new or changed students (or everyone, after a model change) go through the
+encoder and the forest; see batch.rescore_stream.
+"""
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import required_columns
+
+STORE_PATH = "scores.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    student_id TEXT PRIMARY KEY,
+    row_hash INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    dropout_probability REAL NOT NULL,
+    prediction TEXT NOT NULL,
+    scored_at TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit content hash of every row's required raw columns. Floats are
+    hashed as float32, and integers and Categorical codes by value, so a
+    file read with read_students_csv or iter_students_csv hashes the same.
+    """
+    cols = df[required_columns]
+    floats = [col for col in required_columns if cols[col].dtype.kind == "f"]
+    if floats:
+        cols = cols.astype({col: np.float32 for col in floats})
+    # sqlite integers are signed
+    return pd.util.hash_pandas_object(cols, index=False).to_numpy().view(np.int64)
+
+
+class ScoreStore:
+    """Last known score of every student, keyed by student ID."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def lookup(self, ids) -> pd.DataFrame:
+        """
+        Stored row_hash, model_version, dropout_probability and prediction
+        for ids, one row per id in the same order (NaN/None when unknown).
+        """
+        ids = [str(i) for i in ids]
+        # a temp table join instead of IN (...): chunks can exceed sqlite's variable limit
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_ids (pos INTEGER, student_id TEXT)")
+        self.conn.execute("DELETE FROM lookup_ids")
+        self.conn.executemany("INSERT INTO lookup_ids VALUES (?, ?)", enumerate(ids))
+        found = pd.read_sql_query(
+            "SELECT l.pos, s.row_hash, s.model_version, s.dropout_probability, s.prediction "
+            "FROM lookup_ids l JOIN scores s ON s.student_id = l.student_id",
+            self.conn, index_col="pos",
+        )
+        # nullable ints: a float64 column could not hold every 64-bit hash exactly
+        found["row_hash"] = found["row_hash"].astype("Int64")
+        return found.reindex(range(len(ids)))
+
+    def upsert(self, ids, hashes, version: str, probabilities, predictions) -> None:
+        """Record fresh scores; a later row for the same id wins."""
+        scored_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows = zip(
+            (str(i) for i in ids), (int(h) for h in hashes), [version] * len(hashes),
+            (float(p) for p in probabilities), predictions, [scored_at] * len(hashes),
+        )
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(student_id) DO UPDATE SET row_hash = excluded.row_hash, "
+                "model_version = excluded.model_version, "
+                "dropout_probability = excluded.dropout_probability, "
+                "prediction = excluded.prediction, scored_at = excluded.scored_at",
+                rows,
+            )
@@ -0,0 +1,201 @@
+"""
+Rebuild dropout_retention_model.pkl and model_columns.pkl from the CSV.
+
+Same steps as BPDS_final_submission_revised.ipynb: Graduate/Enrolled are
+merged into Not_Dropout, codes are mapped to labels, Age_at_enrollment is
+binned into AgeGroup, categories under 5% of a field with more than 10
+categories are folded into "Other", everything is one-hot encoded, and an
+80/20 train_test_split(random_state=42) is used. Without --search the
+notebook's RandomForestClassifier(random_state=42) is refit, which
+reproduces the notebook's artifacts exactly.
+
+With --search a cross-validated grid over n_estimators / max_depth /
+min_samples_leaf runs in a process pool; every config records accuracy,
+F1, fit wall time, model size and single-row latency, and the most
+accurate config within the optional --max-latency-ms / --max-size-mb
+budget is refit and saved.
+
+    python train.py
+    python train.py --search --max-latency-ms 1 --results search_results.csv
+"""
+import argparse
+import itertools
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.model_selection import cross_validate, train_test_split
+
+from engine import ForestEngine
+from preprocessing import age_bins, age_labels, category_mappings, code_labels, read_students_compact
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+RARE_THRESHOLD = 0.05
+RARE_MIN_CATEGORIES = 10
+
+SEARCH_GRID = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [None, 8, 12, 20],
+    "min_samples_leaf": [1, 2, 5],
+}
+
+
+def fold_rare_categories(df: pd.DataFrame, columns, threshold: float = RARE_THRESHOLD,
+                         min_categories: int = RARE_MIN_CATEGORIES) -> pd.DataFrame:
+    """Fold categories under threshold of a field with more than min_categories into "Other"."""
+    for col in columns:
+        if df[col].nunique() > min_categories:
+            value_counts = df[col].value_counts(normalize=True)
+            rare_categories = value_counts[value_counts < threshold].index
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and "Other" not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories("Other")
+            df[col] = df[col].where(~df[col].isin(rare_categories), "Other")
+    return df
+
+
+def build_dataset(df: pd.DataFrame):
+    """
+    Raw students_performance.csv frame -> (X, y) exactly as in the notebook.
+    Works on read_students_csv and read_students_compact frames alike.
+    """
+    df_prep = df.copy()
+    df_prep["Status"] = df_prep["Status"].astype(object).replace(
+        {"Graduate": "Not_Dropout", "Enrolled": "Not_Dropout"}
+    )
+    df_prep["AgeGroup"] = pd.cut(df_prep["Age_at_enrollment"], bins=age_bins, labels=age_labels, right=False)
+    df_prep["Is_Dropout"] = df_prep["Status"].map({"Dropout": 1, "Not_Dropout": 0})
+    df_prep = df_prep.drop(columns=["Status", "Age_at_enrollment"])
+
+    for col, mapping in category_mappings.items():
+        df_prep[col] = code_labels(df_prep[col], mapping)
+
+    cat_cols = df_prep.select_dtypes(include=["object", "category"]).columns
+    df_prep = fold_rare_categories(df_prep, cat_cols)
+    for col in category_mappings:
+        if isinstance(df_prep[col].dtype, pd.CategoricalDtype):
+            # get_dummies gives string labels one column per present label, sorted;
+            # a Categorical gets one per category in category order
+            present = df_prep[col].cat.remove_unused_categories()
+            df_prep[col] = present.cat.reorder_categories(sorted(present.cat.categories))
+
+    df_encoded = pd.get_dummies(df_prep[cat_cols])
+    df_final = pd.concat([df_prep.drop(columns=cat_cols), df_encoded], axis=1)
+    X = df_final.drop(columns=["Is_Dropout"])
+    y = df_final["Is_Dropout"]
+    return X, y
+
+
+def load_split(path: str = "students_performance.csv"):
+    """The notebook's train/test split: (X_train, X_test, y_train, y_test)."""
+    X, y = build_dataset(read_students_compact(path))
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def single_row_latency_ms(model, X: pd.DataFrame, repeat: int = 200) -> float:
+    """p50 latency of one-row predict_proba on the served path (ForestEngine)."""
+    engine = ForestEngine.from_sklearn(model)
+    rows = X.to_numpy(dtype=np.float32)
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        row = rows[i % len(rows)][np.newaxis, :]
+        t0 = time.perf_counter()
+        engine.predict_proba(row)
+        timings[i] = time.perf_counter() - t0
+    return float(np.percentile(timings, 50) * 1e3)
+
+
+def evaluate_config(params: dict, X_train: pd.DataFrame, y_train: pd.Series, cv: int = 5) -> dict:
+    """Cross-validate one config and measure the cost of the model it produces."""
+    model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+    scores = cross_validate(model, X_train, y_train, cv=cv, scoring=("accuracy", "f1"), n_jobs=1)
+
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+    return {
+        **params,
+        "cv_accuracy": float(scores["test_accuracy"].mean()),
+        "cv_f1": float(scores["test_f1"].mean()),
+        "fit_seconds": fit_seconds,
+        "model_mb": len(pickle.dumps(model)) / 2**20,
+        "n_nodes": sum(est.tree_.node_count for est in model.estimators_),
+        "row_latency_ms": single_row_latency_ms(model, X_train),
+    }
+
+
+def _evaluate(args):
+    return evaluate_config(*args)
+
+
+def search(X_train, y_train, grid: dict = None, workers: int = None, cv: int = 5) -> pd.DataFrame:
+    """Evaluate every grid config in a process pool (all cores by default)."""
+    grid = SEARCH_GRID if grid is None else grid
+    configs = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = list(pool.map(_evaluate, [(params, X_train, y_train, cv) for params in configs]))
+    return pd.DataFrame(results).sort_values("cv_accuracy", ascending=False, kind="stable")
+
+
+def select_config(results: pd.DataFrame, max_latency_ms: float = None, max_size_mb: float = None) -> dict:
+    """Most accurate config within the latency / size budget."""
+    ok = results
+    if max_latency_ms is not None:
+        ok = ok[ok["row_latency_ms"] <= max_latency_ms]
+    if max_size_mb is not None:
+        ok = ok[ok["model_mb"] <= max_size_mb]
+    if ok.empty:
+        raise ValueError("no config meets the latency/size budget")
+    best = ok.iloc[0]
+    params = {key: best[key] for key in SEARCH_GRID}
+    # pandas stores the None depth as NaN and ints as floats
+    params["max_depth"] = None if pd.isna(params["max_depth"]) else int(params["max_depth"])
+    params["n_estimators"] = int(params["n_estimators"])
+    params["min_samples_leaf"] = int(params["min_samples_leaf"])
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the dropout model from students_performance.csv.")
+    parser.add_argument("--data", default="students_performance.csv")
+    parser.add_argument("--out-dir", default=".", help="where the .pkl files are written")
+    parser.add_argument("--search", action="store_true", help="run the cross-validated grid search")
+    parser.add_argument("--workers", type=int, help="search processes (default: all cores)")
+    parser.add_argument("--max-latency-ms", type=float, help="single-row p50 budget for --search")
+    parser.add_argument("--max-size-mb", type=float, help="pickled model size budget for --search")
+    parser.add_argument("--results", help="CSV to write the search results to")
+    args = parser.parse_args(argv)
+
+    X_train, X_test, y_train, y_test = load_split(args.data)
+    params = {}
+    if args.search:
+        t0 = time.perf_counter()
+        results = search(X_train, y_train, workers=args.workers)
+        print(f"searched {len(results)} configs in {time.perf_counter() - t0:.1f}s")
+        print(results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        if args.results:
+            results.to_csv(args.results, index=False)
+        params = select_config(results, args.max_latency_ms, args.max_size_mb)
+        print(f"selected: {params}")
+
+    model = RandomForestClassifier(random_state=RANDOM_STATE, **params)
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    print("Classification Report:\n", classification_report(y_test, y_pred))
+    print("Confusion Matrix:\n", confusion_matrix(y_test, y_pred))
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    joblib.dump(X_train.columns.tolist(), os.path.join(args.out_dir, "model_columns.pkl"))
+    joblib.dump(model, os.path.join(args.out_dir, "dropout_retention_model.pkl"))
+    print(f"saved model_columns.pkl and dropout_retention_model.pkl to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
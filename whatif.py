@@ -0,0 +1,107 @@
+"""
+What-if sensitivity sweeps for one student.
+
+A sweep takes a student's raw row, varies a few fields over a grid (every
+combination of their values, the other fields kept as they are), encodes
+the whole grid with one encode_batch and scores it with one predict_proba
+call, so a 1,000-point sweep costs about one batch prediction.
+"""
+import itertools
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from preprocessing import binary_mapping
+
+# numeric fields that can be swept and the range they are swept over
+# (the range observed in students_performance.csv); integer bounds give
+# integer steps
+SWEEP_RANGES = {
+    "Curricular_units_1st_sem_approved": (0, 26),
+    "Curricular_units_2nd_sem_approved": (0, 20),
+    "Curricular_units_1st_sem_grade": (0.0, 20.0),
+    "Curricular_units_2nd_sem_grade": (0.0, 20.0),
+    "Curricular_units_1st_sem_evaluations": (0, 45),
+    "Curricular_units_2nd_sem_evaluations": (0, 33),
+    "Admission_grade": (95.0, 190.0),
+    "Age_at_enrollment": (17, 70),
+}
+# 0/1 flags are swept over both codes
+SWEEP_FLAGS = ["Tuition_fees_up_to_date", "Scholarship_holder", "Debtor", "Displaced", "International"]
+SWEEP_FIELDS = list(SWEEP_RANGES) + SWEEP_FLAGS
+
+
+def axis_values(field: str, steps: int = 21) -> np.ndarray:
+    """The grid of values a field is swept over: both codes of a flag, else steps points of its range."""
+    if field in SWEEP_FLAGS:
+        return np.array([0, 1])
+    low, high = SWEEP_RANGES[field]
+    if isinstance(low, int) and isinstance(high, int):
+        return np.unique(np.linspace(low, high, steps).round().astype(int))
+    return np.linspace(low, high, steps)
+
+
+def perturbation_grid(raw: dict, axes: dict) -> pd.DataFrame:
+    """
+    One raw row per combination of the axes' values (field -> values), with
+    every other field copied from raw.
+    """
+    combos = list(itertools.product(*axes.values()))
+    n = len(combos)
+    grid = pd.DataFrame({col: np.repeat(value, n) for col, value in raw.items() if col not in axes})
+    for field, values in zip(axes, zip(*combos)):
+        grid[field] = np.asarray(values)
+    return grid
+
+
+def sweep(raw: dict, axes: dict, encoder, predict_proba, class_index: int) -> pd.DataFrame:
+    """
+    Score every perturbation of raw over axes in one batch. Returns the
+    axes' columns and Dropout_probability, one row per grid point.
+    """
+    grid = perturbation_grid(raw, axes)
+    proba = predict_proba(encoder.encode_batch(grid))[:, class_index]
+    return grid[list(axes)].assign(Dropout_probability=proba)
+
+
+def sweep_chart(result: pd.DataFrame, fields: list) -> alt.Chart:
+    """
+    Response surface of a sweep over at most two numeric fields (any number
+    of flags): a line per flag combination for one numeric field, a heatmap
+    faceted by flag combination for two, bars when only flags vary.
+    """
+    numeric = [f for f in fields if f not in SWEEP_FLAGS]
+    flags = [f for f in fields if f in SWEEP_FLAGS]
+    if len(numeric) > 2:
+        raise ValueError("a sweep chart shows at most two numeric fields")
+
+    data = result.copy()
+    for flag in flags:
+        data[flag] = data[flag].astype(str).map(binary_mapping[flag])
+    data["Scenario"] = data[flags].apply(
+        lambda row: ", ".join(f"{flag}: {value}" for flag, value in row.items()), axis=1
+    ) if flags else "as entered"
+    probability = alt.Y("Dropout_probability:Q", title="Dropout probability", axis=alt.Axis(format="%"),
+                        scale=alt.Scale(domain=[0, 1]))
+    tooltip = fields + [alt.Tooltip("Dropout_probability:Q", format=".1%")]
+
+    if not numeric:
+        return alt.Chart(data).mark_bar().encode(
+            x=alt.X("Scenario:N", title=None), y=probability, tooltip=tooltip
+        )
+    if len(numeric) == 1:
+        return alt.Chart(data).mark_line(point=True).encode(
+            x=alt.X(f"{numeric[0]}:Q"), y=probability, color=alt.Color("Scenario:N", title=None),
+            tooltip=tooltip,
+        )
+    x, y = numeric
+    heatmap = alt.Chart(data).mark_rect().encode(
+        x=alt.X(f"{x}:O", axis=alt.Axis(format=".3~f")),
+        y=alt.Y(f"{y}:O", sort="descending", axis=alt.Axis(format=".3~f")),
+        color=alt.Color("Dropout_probability:Q", title="Dropout probability",
+                        scale=alt.Scale(scheme="redyellowblue", reverse=True, domain=[0, 1]),
+                        legend=alt.Legend(format="%")),
+        tooltip=tooltip,
+    ).properties(width=260, height=220)
+    return heatmap.facet(facet=alt.Facet("Scenario:N", title=None), columns=2) if flags else heatmap